@@ -45,6 +45,10 @@ from services.image_optimization import normalize_image, calculate_local_statist
 # Initialize optimization services
 import services.image_optimization
 
+# Prebuild the tone curves of the enhancement slider positions
+from filters.tone_curves import warm_curve_cache
+warm_curve_cache()
+
 if __name__ == '__main__':
     # Force garbage collection before starting
     gc.collect()
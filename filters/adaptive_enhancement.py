@@ -11,6 +11,7 @@ from filters.basic_filters import (
     unsharp_mask,
     high_boost_filter
 )
+from filters.median_filter import median_filter
 from filters.advanced_filters import (
     clahe_filter,
     local_contrast_enhancement,
@@ -89,6 +90,14 @@ class AdaptiveContrastEnhancement:
         # Report initial progress
         self.update_progress(0.05)
         
+        # Salt-and-pepper noise is removed at full resolution, before any
+        # downscaling or simplified path, and is not blended back: impulse
+        # pixels have a high local deviation, so a deviation blend would restore them
+        median_denoise = params.get('denoise', True) and params.get('denoise_method', 'bilateral') == 'median'
+        if median_denoise:
+            print("Applying median noise reduction")
+            image = median_filter(image, params.get('median_radius', 3))
+        
         # Performance optimization: Resize large images for faster processing
         original_size = None
         h, w = image.shape[:2]
@@ -263,8 +272,8 @@ class AdaptiveContrastEnhancement:
             
             self.update_progress(0.60)
         
-        # Apply noise reduction if enabled
-        if params.get('denoise', True):
+        # Apply noise reduction if enabled (the median already ran at full resolution)
+        if params.get('denoise', True) and not median_denoise:
             self.update_progress(0.65)
             print("Applying adaptive noise reduction")
             result = self._apply_noise_reduction(result, local_std, params)
@@ -515,6 +524,8 @@ class AdaptiveContrastEnhancement:
             'max_processing_dimension': self.max_processing_dimension,
             'sharpen': True,
             'denoise': True,
+            'denoise_method': 'bilateral',
+            'median_radius': 3,
             'enhance_details': True,
             
             # Adaptive enhancement parameters
@@ -176,3 +176,62 @@ def guided_filter(image, guide=None, radius=8, eps=100):
     
     # OpenCV's guided filter implementation
     return cv2.ximgproc.guidedFilter(guide, image, radius, eps)
+
+def box_guided_filter(guide, src, radius=8, eps=1e-3, subsample=1):
+    """
+    Apply a guided filter built only from box filters (He et al.).
+    Works without the opencv-contrib ximgproc module and supports the
+    subsampled "fast guided filter" variant for large images.
+    
+    Args:
+        guide: Single-channel guidance image (float32 in [0, 1] recommended)
+        src: Single-channel image to filter (same size as guide, or smaller to upsample it)
+        radius: Radius of the box windows in full-resolution pixels
+        eps: Regularization parameter
+        subsample: Factor by which the coefficients are computed at lower resolution
+            (ignored when src is already smaller than the guide)
+        
+    Returns:
+        Filtered float32 image at the resolution of the guide
+    """
+    guide = guide.astype(np.float32)
+    src = src.astype(np.float32)
+    h, w = guide.shape[:2]
+    
+    # Estimate the linear coefficients at reduced resolution if requested
+    if src.shape[:2] != guide.shape[:2]:
+        # Low-resolution input: upsample it with the full-resolution guide
+        small_size = (src.shape[1], src.shape[0])
+        guide_small = cv2.resize(guide, small_size, interpolation=cv2.INTER_AREA)
+        src_small = src
+        radius = max(1, int(round(radius * src.shape[1] / w)))
+    elif subsample > 1:
+        small_size = (max(1, w // subsample), max(1, h // subsample))
+        guide_small = cv2.resize(guide, small_size, interpolation=cv2.INTER_AREA)
+        src_small = cv2.resize(src, small_size, interpolation=cv2.INTER_AREA)
+        radius = max(1, radius // subsample)
+    else:
+        guide_small = guide
+        src_small = src
+    
+    ksize = (2 * radius + 1, 2 * radius + 1)
+    mean_i = cv2.boxFilter(guide_small, -1, ksize, borderType=cv2.BORDER_REFLECT)
+    mean_p = cv2.boxFilter(src_small, -1, ksize, borderType=cv2.BORDER_REFLECT)
+    corr_ip = cv2.boxFilter(guide_small * src_small, -1, ksize, borderType=cv2.BORDER_REFLECT)
+    corr_ii = cv2.boxFilter(guide_small * guide_small, -1, ksize, borderType=cv2.BORDER_REFLECT)
+    
+    var_i = corr_ii - mean_i * mean_i
+    cov_ip = corr_ip - mean_i * mean_p
+    
+    a = cov_ip / (var_i + eps)
+    b = mean_p - a * mean_i
+    
+    mean_a = cv2.boxFilter(a, -1, ksize, borderType=cv2.BORDER_REFLECT)
+    mean_b = cv2.boxFilter(b, -1, ksize, borderType=cv2.BORDER_REFLECT)
+    
+    # Upsample the smooth coefficients and apply them to the full-resolution guide
+    if mean_a.shape[:2] != (h, w):
+        mean_a = cv2.resize(mean_a, (w, h), interpolation=cv2.INTER_LINEAR)
+        mean_b = cv2.resize(mean_b, (w, h), interpolation=cv2.INTER_LINEAR)
+    
+    return mean_a * guide + mean_b
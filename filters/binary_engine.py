@@ -0,0 +1,535 @@
+"""
+Bit-packed binary morphology engine for image processing.
+This module stores binary masks as packed bits, 64 pixels per word, and
+implements erosion, dilation, hit-or-miss, Zhang-Suen thinning and the
+morphological skeleton with word-wide shifts and bitwise operations.
+
+A packed mask is a (rows, words) uint64 array; bit k of word j in a row holds
+pixel 64 * j + k. Bits past the image width are kept at zero.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+WORD_BITS = 64
+
+def words_per_row(width):
+    """Number of 64-bit words needed to hold one row of the given width."""
+    return (width + WORD_BITS - 1) // WORD_BITS
+
+def pack_mask(mask):
+    """
+    Pack a binary mask into 64-bit words.
+
+    Args:
+        mask: 2-D array; non-zero pixels are foreground
+
+    Returns:
+        Packed mask of shape (rows, words) and dtype uint64
+    """
+    rows, width = mask.shape
+    packed_bytes = np.packbits(mask != 0, axis=1, bitorder='little')
+
+    padded = np.zeros((rows, words_per_row(width) * 8), dtype=np.uint8)
+    padded[:, :packed_bytes.shape[1]] = packed_bytes
+
+    return padded.view('<u8').astype(np.uint64, copy=False)
+
+def unpack_mask(words, width):
+    """
+    Unpack a packed mask into a 0/1 uint8 array.
+
+    Args:
+        words: Packed mask
+        width: Image width in pixels
+
+    Returns:
+        uint8 array of shape (rows, width) with values 0 and 1
+    """
+    as_bytes = np.ascontiguousarray(words, dtype='<u8').view(np.uint8)
+    return np.unpackbits(as_bytes, axis=1, count=width, bitorder='little')
+
+def to_binary_image(words, width):
+    """Unpack a packed mask into a 0/255 uint8 image."""
+    return unpack_mask(words, width) * np.uint8(255)
+
+def count_bits(words):
+    """Number of set pixels of a packed mask (SWAR popcount of every word)."""
+    words = words - ((words >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    words = (words & np.uint64(0x3333333333333333)) + ((words >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    words = (words + (words >> np.uint64(4))) & np.uint64(0x0f0f0f0f0f0f0f0f)
+    return int(((words * np.uint64(0x0101010101010101)) >> np.uint64(56)).sum())
+
+@lru_cache(maxsize=128)
+def _bit_range(width, start, stop):
+    """Packed row with the bits [start, stop) set, clipped to the image width."""
+    bits = np.zeros(words_per_row(width) * WORD_BITS, dtype=bool)
+    bits[max(start, 0):min(stop, width)] = True
+    row = np.packbits(bits, bitorder='little').view('<u8').astype(np.uint64)
+    row.setflags(write=False)
+    return row
+
+def valid_bits(width):
+    """Packed row with every pixel of the image width set."""
+    return _bit_range(width, 0, width)
+
+def complement(words, width):
+    """Invert a packed mask, leaving the padding bits at zero."""
+    return np.bitwise_and(np.invert(words), valid_bits(width))
+
+def shift(words, width, dy, dx, fill=0):
+    """
+    Shift a packed mask so that out[y, x] = in[y + dy, x + dx].
+
+    Args:
+        words: Packed mask
+        width: Image width in pixels
+        dy: Row offset of the source pixel
+        dx: Column offset of the source pixel
+        fill: Value (0 or 1) of source pixels outside the image
+
+    Returns:
+        Shifted packed mask
+    """
+    result = _shift_columns(words, width, dx, fill) if dx else words.copy()
+    if dy:
+        result = _shift_rows(result, width, dy, fill)
+    return result
+
+def _shift_columns(words, width, dx, fill, out=None, scratch=None):
+    """
+    Horizontal part of shift(); rows are treated as one long little-endian integer.
+    With out and scratch buffers of the same shape as words, nothing is allocated.
+    """
+    count = words.shape[1]
+    word_shift, bit_shift = divmod(abs(dx), WORD_BITS)
+    result = np.zeros_like(words) if out is None else out
+    if scratch is None:
+        scratch = np.empty_like(words)
+
+    if word_shift >= count:
+        result[:] = 0
+    elif dx > 0:
+        # Pixel x takes pixel x + dx: shift towards lower bit positions
+        source = words[:, word_shift:]
+        np.right_shift(source, np.uint64(bit_shift), out=result[:, :count - word_shift])
+        result[:, count - word_shift:] = 0
+        if bit_shift:
+            carry = scratch[:, :count - word_shift - 1]
+            np.left_shift(source[:, 1:], np.uint64(WORD_BITS - bit_shift), out=carry)
+            result[:, :count - word_shift - 1] |= carry
+    else:
+        # Pixel x takes pixel x - |dx|: shift towards higher bit positions
+        source = words[:, :count - word_shift]
+        np.left_shift(source, np.uint64(bit_shift), out=result[:, word_shift:])
+        result[:, :word_shift] = 0
+        if bit_shift:
+            carry = scratch[:, word_shift + 1:]
+            np.right_shift(source[:, :-1], np.uint64(WORD_BITS - bit_shift), out=carry)
+            result[:, word_shift + 1:] |= carry
+        result &= valid_bits(width)
+
+    if fill:
+        if dx > 0:
+            result |= _bit_range(width, width - dx, width)
+        else:
+            result |= _bit_range(width, 0, -dx)
+
+    return result
+
+def _shift_rows(words, width, dy, fill):
+    """Vertical part of shift()."""
+    rows = words.shape[0]
+    result = np.empty_like(words)
+    result[:] = valid_bits(width) if fill else np.uint64(0)
+
+    if abs(dy) < rows:
+        if dy > 0:
+            result[:rows - dy] = words[dy:]
+        else:
+            result[-dy:] = words[:rows + dy]
+
+    return result
+
+def _kernel_offsets(kernel):
+    """(dy, dx) offsets of the non-zero elements of a kernel with a centered anchor."""
+    kernel = np.asarray(kernel)
+    anchor_y, anchor_x = kernel.shape[0] // 2, kernel.shape[1] // 2
+    ys, xs = np.nonzero(kernel)
+    return [(int(y) - anchor_y, int(x) - anchor_x) for y, x in zip(ys, xs)]
+
+def _combine_shifts(words, width, kernel, fill, combine):
+    """Combine the shifted copies of a mask selected by a kernel; columns are shifted once."""
+    offsets = _kernel_offsets(kernel)
+    result = None
+
+    for dx in sorted(set(dx for _, dx in offsets)):
+        column = _shift_columns(words, width, dx, fill) if dx else words
+        for dy, _ in [offset for offset in offsets if offset[1] == dx]:
+            shifted = _shift_rows(column, width, dy, fill) if dy else column
+            if result is None:
+                result = shifted.copy()
+            else:
+                combine(result, shifted, out=result)
+
+    return result
+
+def erode(words, width, kernel, iterations=1):
+    """
+    Binary erosion of a packed mask.
+    Pixels outside the image are ignored, as in OpenCV's default border.
+
+    Args:
+        words: Packed mask
+        width: Image width in pixels
+        kernel: Structuring element (non-zero elements are used), anchored at its center
+        iterations: Number of times the erosion is applied
+
+    Returns:
+        Eroded packed mask
+    """
+    if not np.any(kernel):
+        return np.broadcast_to(valid_bits(width), words.shape).copy()
+
+    result = words
+    for _ in range(iterations):
+        result = _combine_shifts(result, width, kernel, 1, np.bitwise_and)
+    return result
+
+def dilate(words, width, kernel, iterations=1):
+    """
+    Binary dilation of a packed mask.
+    Pixels outside the image are ignored, as in OpenCV's default border.
+
+    Args:
+        words: Packed mask
+        width: Image width in pixels
+        kernel: Structuring element (non-zero elements are used), anchored at its center
+        iterations: Number of times the dilation is applied
+
+    Returns:
+        Dilated packed mask
+    """
+    if not np.any(kernel):
+        return np.zeros_like(words)
+
+    result = words
+    for _ in range(iterations):
+        result = _combine_shifts(result, width, kernel, 0, np.bitwise_or)
+    return result
+
+def hit_or_miss(words, width, hit_kernel, miss_kernel=None, iterations=1):
+    """
+    Binary hit-or-miss transform of a packed mask.
+    Matches cv2.MORPH_HITMISS: pixels outside the image satisfy both the hit
+    and the miss elements, and iterations repeat each of the two erosions
+    (the mask by the hit element, its complement by the miss element) before
+    they are combined.
+
+    Args:
+        words: Packed mask
+        width: Image width in pixels
+        hit_kernel: Elements that must be foreground
+        miss_kernel: Elements that must be background (default: none)
+        iterations: Number of times each erosion is applied
+
+    Returns:
+        Packed mask of the matching positions
+    """
+    matches = erode(words, width, hit_kernel, iterations)
+    if miss_kernel is not None and np.any(miss_kernel):
+        matches &= erode(complement(words, width), width, miss_kernel, iterations)
+    return matches
+
+def multi_hit_or_miss(words, width, templates):
+    """
+    Single-pass hit-or-miss transform of a packed mask for several templates.
+    The column-shifted foreground and complement planes are computed once and
+    shared by all templates; row offsets are applied in place with slices, so
+    each template element costs one AND. Borders behave as in hit_or_miss().
+
+    Args:
+        words: Packed mask
+        width: Image width in pixels
+        templates: Kernels in OpenCV's MORPH_HITMISS convention
+            (1: foreground, -1: background, 0: don't care), anchored at their center
+
+    Returns:
+        List with the packed mask of the matching positions of each template
+    """
+    rows = words.shape[0]
+    planes = {1: words, -1: None}
+    columns = {}
+
+    def column(sign, dx):
+        if (sign, dx) not in columns:
+            if planes[sign] is None:
+                planes[sign] = complement(words, width)
+            plane = planes[sign]
+            columns[sign, dx] = _shift_columns(plane, width, dx, 1) if dx else plane
+        return columns[sign, dx]
+
+    results = []
+    for template in templates:
+        template = np.asarray(template)
+        anchor_y, anchor_x = template.shape[0] // 2, template.shape[1] // 2
+        matches = np.broadcast_to(valid_bits(width), words.shape).copy()
+
+        for y, x in zip(*np.nonzero(template)):
+            dy, dx = int(y) - anchor_y, int(x) - anchor_x
+            if abs(dy) >= rows:
+                continue  # Every source row is outside the image, which satisfies both sets
+            source = column(1 if template[y, x] > 0 else -1, dx)
+            if dy > 0:
+                matches[:rows - dy] &= source[dy:]
+            elif dy < 0:
+                matches[-dy:] &= source[:rows + dy]
+            else:
+                matches &= source
+
+        results.append(matches)
+
+    return results
+
+def thicken(words, width, templates, max_iterations=None):
+    """
+    Sequential thickening of a packed mask: for each template in turn, the pixels
+    matched by its hit-or-miss transform are added to the mask. Stops as soon as
+    a full pass over the templates adds no pixel.
+
+    All work happens in buffers allocated once: the complement is updated with
+    the added pixels instead of being recomputed, shifted planes are written in
+    place and row offsets are applied with slices.
+
+    Args:
+        words: Packed mask
+        width: Image width in pixels
+        templates: Kernels in OpenCV's MORPH_HITMISS convention
+            (1: foreground, -1: background, 0: don't care), anchored at their center;
+            the center should be in the background set so that matches add pixels.
+            Pixels outside the image are background, so objects do not grow
+            from the image border
+        max_iterations: Maximum number of passes (default: until convergence)
+
+    Returns:
+        (thickened packed mask, number of passes that added pixels)
+    """
+    rows = words.shape[0]
+    result = words.copy()
+    planes = {1: result, -1: complement(words, width)}
+
+    # Elements of every template as (plane, dy, dx)
+    elements = []
+    for template in templates:
+        template = np.asarray(template)
+        anchor_y, anchor_x = template.shape[0] // 2, template.shape[1] // 2
+        elements.append([
+            (1 if template[y, x] > 0 else -1, int(y) - anchor_y, int(x) - anchor_x)
+            for y, x in zip(*np.nonzero(template))
+        ])
+
+    # Preallocated column-shifted planes and scratch buffers
+    columns = {
+        (sign, dx): np.empty_like(words)
+        for template_elements in elements for sign, _, dx in template_elements if dx
+    }
+    matches = np.empty_like(words)
+    scratch = np.empty_like(words)
+
+    iterations_used = 0
+    while max_iterations is None or iterations_used < max_iterations:
+        changed = False
+
+        for template_elements in elements:
+            # The mask changed since the previous template: refresh the shifted planes it needs
+            for sign, dx in set((sign, dx) for sign, _, dx in template_elements if dx):
+                _shift_columns(planes[sign], width, dx, sign < 0, out=columns[sign, dx], scratch=scratch)
+
+            matches[:] = valid_bits(width)
+            for sign, dy, dx in template_elements:
+                source = columns[sign, dx] if dx else planes[sign]
+                dy = max(-rows, min(rows, dy))
+                if dy > 0:
+                    matches[:rows - dy] &= source[dy:]
+                    if sign > 0:
+                        matches[rows - dy:] = 0
+                elif dy < 0:
+                    matches[-dy:] &= source[:rows + dy]
+                    if sign > 0:
+                        matches[:-dy] = 0
+                else:
+                    matches &= source
+
+            # Only background pixels can be added
+            matches &= planes[-1]
+            if matches.any():
+                result |= matches
+                planes[-1] ^= matches
+                changed = True
+
+        if not changed:
+            break
+        iterations_used += 1
+
+    return result, iterations_used
+
+def _seen_once_and_twice(planes):
+    """Bit-sliced flags for 'at least one' and 'at least two' of the planes are set."""
+    once = np.zeros_like(planes[0])
+    twice = np.zeros_like(planes[0])
+    for plane in planes:
+        twice |= once & plane
+        once |= plane
+    return once, twice
+
+def zhang_suen_deletions(words, width, step, interior):
+    """
+    Pixels deleted by one Zhang-Suen sub-iteration, evaluated on all pixels at once.
+    The neighbour count and the 0-1 transition count are computed with
+    bit-sliced logic on the eight shifted neighbour planes.
+
+    Args:
+        words: Packed mask
+        width: Image width in pixels
+        step: 0 for the first sub-iteration, 1 for the second
+        interior: Packed mask of the pixels that may be deleted
+
+    Returns:
+        Packed mask of the pixels to delete
+    """
+    # Neighbours clockwise from the top: P2 (north) through P9 (north-west)
+    p2 = shift(words, width, -1, 0)
+    p3 = shift(words, width, -1, 1)
+    p4 = shift(words, width, 0, 1)
+    p5 = shift(words, width, 1, 1)
+    p6 = shift(words, width, 1, 0)
+    p7 = shift(words, width, 1, -1)
+    p8 = shift(words, width, 0, -1)
+    p9 = shift(words, width, -1, -1)
+    neighbours = [p2, p3, p4, p5, p6, p7, p8, p9]
+
+    # 2 <= B(P1) <= 6: at least two foreground and at least two background neighbours
+    _, two_foreground = _seen_once_and_twice(neighbours)
+    _, two_background = _seen_once_and_twice([np.invert(p) for p in neighbours])
+
+    # A(P1) == 1: exactly one 0-1 transition in the sequence P2..P9, P2
+    transitions = [np.invert(neighbours[k]) & neighbours[(k + 1) % 8] for k in range(8)]
+    one_transition, two_transitions = _seen_once_and_twice(transitions)
+
+    if step == 0:
+        condition = np.invert(p2 & p4 & p6) & np.invert(p4 & p6 & p8)
+    else:
+        condition = np.invert(p2 & p4 & p8) & np.invert(p2 & p6 & p8)
+
+    deletions = words & interior
+    deletions &= two_foreground
+    deletions &= two_background
+    deletions &= one_transition
+    deletions &= np.invert(two_transitions)
+    deletions &= condition
+
+    return deletions
+
+def interior_mask(rows, width):
+    """Packed mask of the pixels that are not on the image border."""
+    words = np.zeros((rows, words_per_row(width)), dtype=np.uint64)
+    if rows > 2:
+        words[1:-1] = _bit_range(width, 1, width - 1)
+    return words
+
+def zhang_suen_thin(words, width, max_iterations=None):
+    """
+    Zhang-Suen thinning of a packed mask. Border pixels are never deleted.
+    A pixel's decision can only change when its neighbourhood does, so each
+    sub-iteration only evaluates the bounding box of the deletions made by the
+    previous two sub-iterations, grown by one row and one word.
+
+    Args:
+        words: Packed mask
+        width: Image width in pixels
+        max_iterations: Maximum number of iterations (default: None, run to convergence)
+
+    Returns:
+        Thinned packed mask
+    """
+    result = words.copy()
+    rows, count = result.shape
+    interior = interior_mask(rows, width)
+
+    # Bounding boxes (first row, end row, first word, end word) of the deletions
+    # of the last two sub-iterations; the whole image is pending at the start
+    recent = [(0, rows, 0, count), (0, rows, 0, count)]
+
+    changing = True
+    iteration = 0
+    while changing and (max_iterations is None or iteration < max_iterations):
+        iteration += 1
+        changing = False
+
+        for step in (0, 1):
+            boxes = [box for box in recent if box is not None]
+            recent.pop(0)
+            if not boxes:
+                recent.append(None)
+                continue
+
+            # Region to evaluate, and a margin of one row and one word for the neighbours
+            row_start = max(min(box[0] for box in boxes) - 1, 0)
+            row_end = min(max(box[1] for box in boxes) + 1, rows)
+            word_start = max(min(box[2] for box in boxes) - 1, 0)
+            word_end = min(max(box[3] for box in boxes) + 1, count)
+
+            top, bottom = max(row_start - 1, 0), min(row_end + 1, rows)
+            left, right = max(word_start - 1, 0), min(word_end + 1, count)
+            region_width = min(width, right * WORD_BITS) - left * WORD_BITS
+
+            # Only the evaluated region may lose pixels, never its margin
+            allowed = np.zeros((bottom - top, right - left), dtype=np.uint64)
+            allowed[row_start - top:row_end - top, word_start - left:word_end - left] = \
+                interior[row_start:row_end, word_start:word_end]
+
+            region = result[top:bottom, left:right]
+            deletions = zhang_suen_deletions(region, region_width, step, allowed)
+
+            deleted_rows = np.flatnonzero(deletions.any(axis=1))
+            if deleted_rows.size == 0:
+                recent.append(None)
+                continue
+
+            deleted_words = np.flatnonzero(deletions.any(axis=0))
+            recent.append((top + deleted_rows[0], top + deleted_rows[-1] + 1,
+                           left + deleted_words[0], left + deleted_words[-1] + 1))
+
+            region &= np.invert(deletions)
+            changing = True
+
+    return result
+
+def skeletonize(words, width, kernel, max_iterations=100):
+    """
+    Lantuejoul skeleton of a packed mask: the union over successive erosions of
+    each erosion minus its opening.
+
+    Args:
+        words: Packed mask
+        width: Image width in pixels
+        kernel: Structuring element
+        max_iterations: Maximum number of erosions
+
+    Returns:
+        Packed skeleton mask
+    """
+    skeleton = np.zeros_like(words)
+    current = words
+
+    for _ in range(max_iterations):
+        eroded = erode(current, width, kernel)
+        opened = dilate(erode(eroded, width, kernel), width, kernel)
+        skeleton |= eroded & np.invert(opened)
+
+        current = eroded
+        if not current.any():
+            break
+
+    return skeleton
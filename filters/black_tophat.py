@@ -7,6 +7,8 @@ import cv2
 import numpy as np
 import gc
 
+from filters.morphology_ops import structuring_element, scale_saturated, morphology_ex
+
 def apply_black_tophat(image, params=None):
     """
     Apply black top-hat morphological operation to an image.
@@ -35,7 +37,7 @@ def apply_black_tophat(image, params=None):
         kernel_size += 1
     
     # Create structuring element
-    kernel = np.ones((kernel_size, kernel_size), np.uint8)
+    kernel = structuring_element('rect', kernel_size)
     
     # Convert image to appropriate type
     if image.dtype != np.uint8:
@@ -43,35 +45,16 @@ def apply_black_tophat(image, params=None):
     
     # Apply black top-hat
     try:
-        # Process color and grayscale images appropriately
-        if len(image.shape) > 2:  # Color image
-            # Process each channel separately for better control
-            channels = cv2.split(image)
-            result_channels = []
-            
-            for channel in channels:
-                # Black top-hat is closing minus original
-                black_tophat = cv2.morphologyEx(channel, cv2.MORPH_BLACKHAT, kernel, iterations=iterations)
-                
-                # Apply strength parameter
-                if strength < 1.0:
-                    black_tophat = cv2.multiply(black_tophat, strength)
-                
-                # Add the top-hat result to the original image for enhancement
-                result_channel = cv2.add(channel, black_tophat)
-                result_channels.append(result_channel)
-            
-            result = cv2.merge(result_channels)
-        else:  # Grayscale image
-            # Black top-hat is closing minus original
-            black_tophat = cv2.morphologyEx(image, cv2.MORPH_BLACKHAT, kernel, iterations=iterations)
-            
-            # Apply strength parameter
-            if strength < 1.0:
-                black_tophat = cv2.multiply(black_tophat, strength)
-            
-            # Add the top-hat result to the original image for enhancement
-            result = cv2.add(image, black_tophat)
+        # Color images are processed in a single call over all channels
+        # Black top-hat is closing minus original
+        black_tophat = morphology_ex(image, cv2.MORPH_BLACKHAT, kernel, iterations=iterations)
+        
+        # Apply strength parameter
+        if strength < 1.0:
+            black_tophat = scale_saturated(black_tophat, strength)
+        
+        # Add the top-hat result to the original image for enhancement
+        result = cv2.add(image, black_tophat)
         
         # Clean up to free memory
         gc.collect()
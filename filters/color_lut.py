@@ -0,0 +1,312 @@
+"""
+3D color lookup tables for image processing.
+This module samples a chain of color-pointwise filters (each output pixel
+depends only on the same input pixel, through HSV, LAB or tone curves) once on
+a lattice of colors, and applies the resulting 3D LUT to whole images with
+trilinear or tetrahedral interpolation. A chain of such filters becomes one
+pass over the image with no color-space conversions. Compiled tables are
+cached, and can be exported as .cube files for other grading tools.
+"""
+
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+from filters.enhancement_filters import (
+    apply_brightness_contrast, apply_exposure, apply_vibrance, apply_shadows_highlights
+)
+
+# Filters whose output pixel depends only on the same input pixel
+COLOR_POINTWISE_FILTERS = {
+    'brightness_contrast': apply_brightness_contrast,
+    'exposure': apply_exposure,
+    'vibrance': apply_vibrance,
+    'shadows_highlights': apply_shadows_highlights
+}
+
+# Default number of lattice nodes per axis (33 or 65 are the usual .cube sizes)
+DEFAULT_LUT_SIZE = 33
+
+# Number of pixels interpolated at once, which bounds the temporary arrays
+CHUNK_PIXELS = 1 << 18
+
+def is_color_pointwise(filter_type):
+    """Whether a filter type can be compiled into a 3D color LUT."""
+    return filter_type in COLOR_POINTWISE_FILTERS
+
+def lattice_nodes(size=DEFAULT_LUT_SIZE):
+    """
+    Channel values of the lattice nodes: evenly spaced from 0 to 255 and rounded,
+    so the filters can be sampled on ordinary uint8 images.
+
+    Args:
+        size: Number of nodes per axis (at least 2)
+
+    Returns:
+        uint8 array of size node values
+    """
+    if size < 2 or size > 256:
+        raise ValueError(f"LUT size must be between 2 and 256, got {size}")
+    return np.rint(np.linspace(0, 255, size)).astype(np.uint8)
+
+def build_color_lut(steps, size=DEFAULT_LUT_SIZE):
+    """
+    Sample a chain of color-pointwise filters on a size^3 lattice of colors.
+    Tables are cached by chain and size, and returned read-only.
+
+    Args:
+        steps: List of (filter_type, params) pairs, all color-pointwise
+        size: Number of lattice nodes per axis
+
+    Returns:
+        (size, size, size, 3) uint8 array; lut[b, g, r] is the BGR output at
+        the node (nodes[b], nodes[g], nodes[r])
+    """
+    return _cached_color_lut(_freeze(steps), size)
+
+@lru_cache(maxsize=32)
+def _cached_color_lut(frozen_steps, size):
+    nodes = lattice_nodes(size)
+
+    # Every node as one pixel of a (size, size * size) BGR image, r varying fastest
+    b, g, r = np.meshgrid(nodes, nodes, nodes, indexing='ij')
+    lattice = np.stack([b, g, r], axis=-1).reshape(size, size * size, 3)
+
+    for filter_type, params in frozen_steps:
+        lattice = COLOR_POINTWISE_FILTERS[filter_type](lattice, dict(params))
+
+    lut = np.ascontiguousarray(lattice, dtype=np.uint8).reshape(size, size, size, 3)
+    lut.setflags(write=False)
+    return lut
+
+def _freeze(steps):
+    """Hashable form of a list of (filter_type, params) pairs."""
+    def freeze_value(value):
+        if isinstance(value, (list, tuple)):
+            return tuple(freeze_value(item) for item in value)
+        return value
+
+    return tuple(
+        (filter_type, tuple(sorted((key, freeze_value(value)) for key, value in (params or {}).items())))
+        for filter_type, params in steps
+    )
+
+# The three output channels of a lattice node are packed in one 64-bit word, in
+# 21-bit lanes, so every interpolation step blends all channels at once
+LANE_BITS = 21
+LANE_SHIFTS = (0, LANE_BITS, 2 * LANE_BITS)
+
+# Interpolation weights are fixed point with this many fractional bits
+WEIGHT_BITS = 8
+
+def _lanes(value):
+    """The same value in every lane of a packed word."""
+    return np.uint64(sum(value << shift for shift in LANE_SHIFTS))
+
+@lru_cache(maxsize=8)
+def _axis_tables(size):
+    """
+    Per-value lower node index and interpolation weight along one axis.
+    Nodes are not exactly evenly spaced, so the weights are measured from the
+    actual node values.
+
+    Returns:
+        (int32 lower node index table, uint16 fixed-point weight table), each with 256 entries
+    """
+    nodes = lattice_nodes(size).astype(np.int32)
+    values = np.arange(256)
+
+    lower = np.clip(np.searchsorted(nodes, values, side='right') - 1, 0, size - 2)
+    weight = (values - nodes[lower]) / (nodes[lower + 1] - nodes[lower])
+
+    return lower.astype(np.int32), np.rint(weight * (1 << WEIGHT_BITS)).astype(np.uint16)
+
+def _pack_lut(lut):
+    """Flat table of lattice nodes with their B, G and R outputs packed in lanes."""
+    table = lut.reshape(-1, 3).astype(np.uint64)
+    return table[:, 0] | (table[:, 1] << np.uint64(LANE_SHIFTS[1])) | (table[:, 2] << np.uint64(LANE_SHIFTS[2]))
+
+def apply_color_lut(image, lut, method='tetrahedral'):
+    """
+    Apply a 3D color LUT to a BGR image.
+
+    Args:
+        image: Input BGR image
+        lut: Table from build_color_lut
+        method: 'tetrahedral' (4 lattice reads per pixel, default) or 'trilinear' (8 reads)
+
+    Returns:
+        Transformed uint8 image
+    """
+    if method not in ('tetrahedral', 'trilinear'):
+        raise ValueError(f"Unknown LUT interpolation: {method}")
+    if len(image.shape) != 3 or image.shape[2] != 3:
+        raise ValueError("3D color LUTs apply to 3-channel BGR images")
+    if image.dtype != np.uint8:
+        image = np.clip(image, 0, 255).astype(np.uint8)
+
+    size = lut.shape[0]
+    lower, weight = _axis_tables(size)
+    table = _pack_lut(lut)
+
+    # Flat index strides of the b, g and r axes, folded into the index tables
+    strides = (size * size, size, 1)
+    index_tables = [lower * stride for stride in strides]
+    interpolate = _tetrahedral if method == 'tetrahedral' else _trilinear
+
+    pixels = image.reshape(-1, 3)
+    result = np.empty_like(pixels)
+
+    for start in range(0, len(pixels), CHUNK_PIXELS):
+        chunk = pixels[start:start + CHUNK_PIXELS]
+        channels = [np.ascontiguousarray(chunk[:, c]) for c in range(3)]
+
+        # Lower lattice node and fixed-point position inside the cell along each axis
+        base = sum(cv2.LUT(channel, index_table).ravel() for channel, index_table in zip(channels, index_tables))
+        base = base.astype(np.intp)
+        weights = [cv2.LUT(channel, weight).ravel() for channel in channels]
+
+        packed, fraction_bits = interpolate(table, base, weights, strides)
+
+        # Round, then unpack the lanes
+        packed += _lanes(1 << (fraction_bits - 1))
+        for c, shift in enumerate(LANE_SHIFTS):
+            result[start:start + CHUNK_PIXELS, c] = (packed >> np.uint64(shift + fraction_bits)) & np.uint64(0xFF)
+
+    return result.reshape(image.shape)
+
+def _trilinear(table, base, weights, strides):
+    """
+    Blend the 8 corners of each pixel's lattice cell, one axis at a time.
+    Between steps the lanes are narrowed to 5 fractional bits, so each
+    weighted sum still fits in its lane.
+
+    Returns:
+        (packed blended values, number of fractional bits)
+    """
+    wb, wg, wr = (w.astype(np.uint64) for w in weights)
+    sb, sg, sr = strides
+    one = np.uint64(1 << WEIGHT_BITS)
+    narrow = _lanes((1 << 13) - 1)
+
+    def blend(low, high, w, shift):
+        value = low * (one - w) + high * w
+        return ((value + _lanes(1 << (shift - 1))) >> np.uint64(shift)) & narrow
+
+    def corner_row(offset):
+        # Blend along r, from 8 to 5 fractional bits
+        return blend(table[base + offset], table[base + offset + sr], wr, WEIGHT_BITS - 5)
+
+    low = blend(corner_row(0), corner_row(sg), wg, WEIGHT_BITS)
+    high = blend(corner_row(sb), corner_row(sb + sg), wg, WEIGHT_BITS)
+    return blend(low, high, wb, WEIGHT_BITS), 5
+
+@lru_cache(maxsize=8)
+def _tetrahedron_tables(size):
+    """
+    Offsets of the two middle corners of each tetrahedron, indexed by the order code
+    (wb >= wg) | (wb >= wr) << 1 | (wg >= wr) << 2 of the pixel's position in its cell.
+
+    Returns:
+        (int32 offset table of the second corner, int32 offset table of the third corner)
+    """
+    sb, sg, sr = size * size, size, 1
+    second = np.zeros(256, np.int32)
+    third = np.zeros(256, np.int32)
+
+    for code in range(8):
+        b_over_g, b_over_r, g_over_r = code & 1, code >> 1 & 1, code >> 2 & 1
+
+        # Axes in decreasing order of position; ties go to b, then g
+        if b_over_g and b_over_r:
+            first, then = sb, (sg if g_over_r else sr)
+        elif g_over_r and not b_over_g:
+            first, then = sg, (sb if b_over_r else sr)
+        else:
+            first, then = sr, (sb if b_over_g else sg)
+
+        second[code] = first
+        third[code] = first + then
+
+    return second, third
+
+def _tetrahedral(table, base, weights, strides):
+    """
+    Blend the 4 corners of the tetrahedron of each pixel's lattice cell: the
+    path from the low corner to the high corner follows the axes in decreasing
+    order of the pixel's position inside the cell.
+
+    Returns:
+        (packed blended values, number of fractional bits)
+    """
+    wb, wg, wr = weights
+    size = strides[1]
+    second, third = _tetrahedron_tables(size)
+
+    # Order of the positions along the three axes, and the matching corners
+    code = (wb >= wg).view(np.uint8) | ((wb >= wr).view(np.uint8) << 1) | ((wg >= wr).view(np.uint8) << 2)
+    second_corner = base + cv2.LUT(code, second).ravel()
+    third_corner = base + cv2.LUT(code, third).ravel()
+    far_corner = base + sum(strides)
+
+    largest = cv2.max(cv2.max(wb, wg), wr).ravel()
+    smallest = cv2.min(cv2.min(wb, wg), wr).ravel()
+    middle = wb + wg + wr - largest - smallest
+
+    value = table[base] * ((1 << WEIGHT_BITS) - largest).astype(np.uint64)
+    value += table[second_corner] * (largest - middle).astype(np.uint64)
+    value += table[third_corner] * (middle - smallest).astype(np.uint64)
+    value += table[far_corner] * smallest.astype(np.uint64)
+    return value, WEIGHT_BITS
+
+def apply_color_chain(image, steps, size=DEFAULT_LUT_SIZE, method='tetrahedral'):
+    """
+    Apply a chain of color-pointwise filters through a (cached) 3D color LUT.
+    Grayscale images run the filters directly, since their luminance curves
+    already are 1D lookups.
+
+    Args:
+        image: Input image
+        steps: List of (filter_type, params) pairs, all color-pointwise
+        size: Number of lattice nodes per axis
+        method: 'tetrahedral' or 'trilinear'
+
+    Returns:
+        Transformed image
+    """
+    if len(image.shape) < 3:
+        for filter_type, params in steps:
+            image = COLOR_POINTWISE_FILTERS[filter_type](image, params)
+        return image
+
+    return apply_color_lut(image, build_color_lut(steps, size), method)
+
+def export_cube(lut, title='Image Processing LUT'):
+    """
+    Serialize a 3D color LUT in the Adobe/Resolve .cube format.
+    Node values are rounded to whole levels, so the file's evenly spaced nodes
+    are off by at most half a level.
+
+    Args:
+        lut: Table from build_color_lut
+        title: Title written in the file header
+
+    Returns:
+        Text of the .cube file
+    """
+    size = lut.shape[0]
+
+    # .cube lists RGB outputs in [0, 1] with red varying fastest, which is
+    # the flat order of the [b, g, r] table
+    rgb = lut.reshape(-1, 3)[:, ::-1] / 255.0
+
+    lines = [
+        f'TITLE "{title}"',
+        f'LUT_3D_SIZE {size}',
+        'DOMAIN_MIN 0.0 0.0 0.0',
+        'DOMAIN_MAX 1.0 1.0 1.0'
+    ]
+    lines.extend(f'{r:.6f} {g:.6f} {b:.6f}' for r, g, b in rgb)
+
+    return '\n'.join(lines) + '\n'
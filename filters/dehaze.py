@@ -0,0 +1,146 @@
+"""
+Dark-channel dehaze filter for image processing.
+This module provides a fast implementation of dark-channel-prior haze removal
+with a constant-time minimum filter and guided-filter transmission refinement.
+"""
+
+import cv2
+import numpy as np
+import gc
+
+from filters.running_extrema import rect_min_filter
+from filters.basic_filters import box_guided_filter
+
+def apply_dehaze(image, params=None):
+    """
+    Remove haze from an image using the dark channel prior.
+    
+    Args:
+        image: Input image
+        params: Dictionary of parameters
+            - strength: Amount of haze removed (0 to 100, default: 95)
+            - patch_size: Size of the dark-channel window in pixels (default: 15)
+            - min_transmission: Lower bound of the transmission map (default: 0.1)
+            - low_res_transmission: Estimate the transmission at reduced resolution (default: True)
+            - transmission_max_dimension: Largest side of the reduced estimate (default: 1024)
+            - guided_radius: Radius of the guided refinement in pixels (default: 4 * patch_size)
+            - guided_eps: Regularization of the guided refinement (default: 0.001)
+    
+    Returns:
+        Dehazed image
+    """
+    if params is None:
+        params = {}
+    
+    # Get parameters with defaults
+    omega = params.get('strength', 95) / 100.0
+    patch_size = params.get('patch_size', 15)
+    min_transmission = params.get('min_transmission', 0.1)
+    low_res = params.get('low_res_transmission', True)
+    max_dimension = params.get('transmission_max_dimension', 1024)
+    guided_radius = params.get('guided_radius', 4 * patch_size)
+    guided_eps = params.get('guided_eps', 1e-3)
+    
+    # Convert image to appropriate type
+    if image.dtype != np.uint8:
+        image = np.clip(image, 0, 255).astype(np.uint8)
+    
+    # Apply dehaze
+    try:
+        h, w = image.shape[:2]
+        
+        # Estimate haze at reduced resolution; the transmission is smooth
+        scale = 1.0
+        if low_res and max(h, w) > max_dimension:
+            scale = max_dimension / max(h, w)
+            small_size = (max(1, int(w * scale)), max(1, int(h * scale)))
+            small = cv2.resize(image, small_size, interpolation=cv2.INTER_AREA)
+        else:
+            small = image
+        
+        patch = max(3, int(round(patch_size * scale)) | 1)
+        
+        # Estimate the atmospheric light and the raw transmission
+        dark = dark_channel(small, patch)
+        atmosphere = estimate_atmospheric_light(small, dark)
+        
+        normalized = small.astype(np.float32) / atmosphere
+        transmission = 1.0 - omega * dark_channel(normalized, patch)
+        
+        # Refine the transmission with a guided filter on the full-resolution luminance
+        if len(image.shape) > 2:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        else:
+            gray = image
+        guide = gray.astype(np.float32) / 255.0
+        transmission = box_guided_filter(guide, transmission, guided_radius, guided_eps)
+        
+        # Recover the scene radiance: J = (I - A) / max(t, t0) + A
+        inv_transmission = 1.0 / np.maximum(transmission, min_transmission)
+        del transmission, guide
+        
+        if len(image.shape) > 2:  # Color image
+            channels = []
+            for channel, light in zip(cv2.split(image), atmosphere):
+                recovered = (channel.astype(np.float32) - light) * inv_transmission + light
+                channels.append(np.clip(recovered, 0, 255).astype(np.uint8))
+            result = cv2.merge(channels)
+        else:  # Grayscale image
+            light = float(atmosphere[0])
+            recovered = (image.astype(np.float32) - light) * inv_transmission + light
+            result = np.clip(recovered, 0, 255).astype(np.uint8)
+        
+        # Clean up to free memory
+        gc.collect()
+        
+        return result
+    except Exception as e:
+        print(f"Error in dehaze: {str(e)}")
+        return image
+
+def dark_channel(image, patch_size):
+    """
+    Compute the dark channel: the minimum over color channels and a square patch.
+    The patch minimum uses a van Herk/Gil-Werman filter, so its cost does not
+    depend on the patch size.
+    
+    Args:
+        image: Input image (uint8 or float32, 1 or 3 channels)
+        patch_size: Size of the square patch
+    
+    Returns:
+        Single-channel dark channel with the input dtype
+    """
+    if len(image.shape) > 2:
+        b, g, r = cv2.split(image)
+        channel_min = cv2.min(cv2.min(b, g), r)
+    else:
+        channel_min = image
+    
+    return rect_min_filter(channel_min, patch_size)
+
+def estimate_atmospheric_light(image, dark, top_fraction=0.001):
+    """
+    Estimate the atmospheric light from the haziest pixels.
+    
+    Args:
+        image: Input image (uint8)
+        dark: Dark channel of the image
+        top_fraction: Fraction of the brightest dark-channel pixels used
+    
+    Returns:
+        Float32 array with one atmospheric light value per channel
+    """
+    flat_dark = dark.reshape(-1)
+    count = max(1, int(flat_dark.size * top_fraction))
+    
+    # Indices of the largest dark-channel values without a full sort
+    indices = np.argpartition(flat_dark, flat_dark.size - count)[-count:]
+    
+    channels = image.shape[2] if len(image.shape) > 2 else 1
+    pixels = image.reshape(-1, channels)[indices].astype(np.float32)
+    
+    # Average the candidates for robustness against single bright pixels
+    atmosphere = np.mean(pixels, axis=0)
+    
+    return np.maximum(atmosphere, 1.0).astype(np.float32)
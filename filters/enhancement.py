@@ -4,8 +4,12 @@ Imports and re-exports enhancement functions from various filter modules
 """
 from filters.enhancement_filters import (
     apply_brightness_contrast, apply_exposure, apply_vibrance,
-    apply_clarity, apply_shadows_highlights
+    apply_clarity, apply_shadows_highlights, apply_hdr_effect
 )
+from filters.retinex import apply_retinex
+from filters.dehaze import apply_dehaze
+from filters.exposure_fusion import apply_exposure_fusion
+from filters.histogram_matching import apply_histogram_matching
 
 # Re-export the functions
 __all__ = [
@@ -13,5 +17,10 @@ __all__ = [
     'apply_exposure',
     'apply_vibrance',
     'apply_clarity',
-    'apply_shadows_highlights'
+    'apply_shadows_highlights',
+    'apply_hdr_effect',
+    'apply_retinex',
+    'apply_dehaze',
+    'apply_exposure_fusion',
+    'apply_histogram_matching'
 ]
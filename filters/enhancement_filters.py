@@ -7,6 +7,12 @@ import cv2
 import numpy as np
 import gc
 from utils.image_utils import normalize_image, clip_and_normalize
+from filters.fast_gaussian import fast_gaussian_blur
+from filters.basic_filters import box_guided_filter
+from filters.tone_curves import (
+    IDENTITY_CURVE, brightness_contrast_curve, exposure_curve, shadows_highlights_curve,
+    shadows_highlights_gray_delta, vibrance_curve, drago_curve
+)
 
 def apply_brightness_contrast(image, params=None):
     """
@@ -24,26 +30,14 @@ def apply_brightness_contrast(image, params=None):
     if params is None:
         params = {}
     
-    # Get parameters with defaults
-    brightness = params.get('brightness', 0)
-    contrast = params.get('contrast', 0)
-    
     # Convert image to appropriate type
     if image.dtype != np.uint8:
         image = np.clip(image, 0, 255).astype(np.uint8)
     
     # Apply brightness and contrast adjustment
     try:
-        # Convert brightness and contrast to alpha-beta values
-        if contrast > 0:
-            alpha = 1 + contrast / 100.0
-        else:
-            alpha = 1 + contrast / 127.0
-        
-        beta = brightness
-        
-        # Process color and grayscale images appropriately
-        result = cv2.convertScaleAbs(image, alpha=alpha, beta=beta)
+        # Scale, offset and saturate through the brightness/contrast tone curve
+        result = cv2.LUT(image, brightness_contrast_curve(params))
         
         # Clean up to free memory
         gc.collect()
@@ -68,31 +62,14 @@ def apply_exposure(image, params=None):
     if params is None:
         params = {}
     
-    # Get parameters with defaults
-    exposure = params.get('exposure', 0)
-    
     # Convert image to appropriate type
     if image.dtype != np.uint8:
         image = np.clip(image, 0, 255).astype(np.uint8)
     
     # Apply exposure adjustment
     try:
-        # Convert exposure to gamma value
-        if exposure > 0:
-            gamma = 1 - exposure / 100.0  # Increase exposure (lower gamma)
-        else:
-            gamma = 1 + abs(exposure) / 50.0  # Decrease exposure (higher gamma)
-        
-        # Create lookup table for gamma correction
-        inv_gamma = 1.0 / gamma
-        table = np.array([((i / 255.0) ** inv_gamma) * 255 for i in range(256)]).astype(np.uint8)
-        
-        # Process color and grayscale images appropriately
-        if len(image.shape) > 2:  # Color image
-            # Apply gamma correction using lookup table
-            result = cv2.LUT(image, table)
-        else:  # Grayscale image
-            result = cv2.LUT(image, table)
+        # Gamma correction through the exposure tone curve
+        result = cv2.LUT(image, exposure_curve(params))
         
         # Clean up to free memory
         gc.collect()
@@ -118,9 +95,6 @@ def apply_vibrance(image, params=None):
     if params is None:
         params = {}
     
-    # Get parameters with defaults
-    vibrance = params.get('vibrance', 50) / 100.0
-    
     # Convert image to appropriate type
     if image.dtype != np.uint8:
         image = np.clip(image, 0, 255).astype(np.uint8)
@@ -129,25 +103,11 @@ def apply_vibrance(image, params=None):
     try:
         # Only works on color images
         if len(image.shape) > 2:  # Color image
-            # Convert to HSV color space
-            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV).astype(np.float32)
-            
-            # Split channels
-            h, s, v = cv2.split(hsv)
-            
-            # Calculate average saturation
-            avg_sat = np.mean(s)
-            
-            # Apply vibrance: increase saturation more for less saturated pixels
-            mask = (255 - s) / 255.0  # Mask is stronger for less saturated pixels
-            s = s + mask * s * vibrance
-            s = np.clip(s, 0, 255)
-            
-            # Merge channels
-            hsv = cv2.merge([h, s, v])
-            
-            # Convert back to BGR
-            result = cv2.cvtColor(hsv.astype(np.uint8), cv2.COLOR_HSV2BGR)
+            # Boost saturation in the uint8 HSV image: less saturated pixels get
+            # more, through a cached table on S only
+            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+            hsv_table = np.dstack([IDENTITY_CURVE, vibrance_curve(params), IDENTITY_CURVE])
+            result = cv2.cvtColor(cv2.LUT(hsv, hsv_table), cv2.COLOR_HSV2BGR)
             
             # Clean up to free memory
             gc.collect()
@@ -168,6 +128,15 @@ def apply_clarity(image, params=None):
         image: Input image
         params: Dictionary of parameters
             - clarity: Clarity adjustment (0 to 100, default: 50)
+            - radius: Standard deviation in pixels of the large-scale base (default: None).
+                When set, the base is computed in constant time per pixel whatever
+                the radius; otherwise a Gaussian of size 20 * clarity + 1 is used
+            - edge_aware: Compute the base with a guided filter to avoid halos
+                around strong edges (default: False, radius mode only)
+            - edge_eps: Guided filter regularization on [0, 1] intensities; lower
+                values preserve weaker edges (default: 0.01)
+            - luminance_only: Add the same local contrast to all channels so colors
+                are not shifted (default: True, radius mode only)
     
     Returns:
         Adjusted image
@@ -177,6 +146,7 @@ def apply_clarity(image, params=None):
     
     # Get parameters with defaults
     clarity = params.get('clarity', 50) / 100.0
+    radius = params.get('radius')
     
     # Convert image to appropriate type
     if image.dtype != np.uint8:
@@ -184,12 +154,15 @@ def apply_clarity(image, params=None):
     
     # Apply clarity adjustment
     try:
-        # Create a blurred version of the image
-        blur_amount = int(10 * clarity) * 2 + 1  # Ensure odd number
-        blurred = cv2.GaussianBlur(image, (blur_amount, blur_amount), 0)
-        
-        # Apply unsharp mask technique for midtone contrast
-        result = cv2.addWeighted(image, 1 + clarity, blurred, -clarity, 0)
+        if radius:
+            result = _large_radius_clarity(image, clarity, radius, params)
+        else:
+            # Create a blurred version of the image
+            blur_amount = int(10 * clarity) * 2 + 1  # Ensure odd number
+            blurred = cv2.GaussianBlur(image, (blur_amount, blur_amount), 0)
+            
+            # Apply unsharp mask technique for midtone contrast
+            result = cv2.addWeighted(image, 1 + clarity, blurred, -clarity, 0)
         
         # Clean up to free memory
         gc.collect()
@@ -199,6 +172,44 @@ def apply_clarity(image, params=None):
         print(f"Error in clarity adjustment: {str(e)}")
         return image
 
+def _large_radius_clarity(image, clarity, radius, params):
+    """
+    Clarity with a large-scale base whose cost does not depend on the radius:
+    a stacked box blur (or a box-filter guided filter when edge-aware), at
+    reduced resolution for large radii.
+    """
+    edge_aware = params.get('edge_aware', False)
+    edge_eps = params.get('edge_eps', 0.01)
+    luminance_only = params.get('luminance_only', True)
+    
+    color = len(image.shape) > 2
+    if color and luminance_only:
+        # Local contrast of the channel mean, added to every channel
+        mean_weights = np.full((1, 3), 1.0 / 3.0, dtype=np.float32)
+        source = cv2.transform(image.astype(np.float32), mean_weights)
+    else:
+        source = image.astype(np.float32)
+    
+    if edge_aware:
+        # Box windows about as wide as the Gaussian, with coefficients computed
+        # at a resolution where the window spans a few pixels
+        window = max(1, int(round(radius)))
+        subsample = max(1, window // 4)
+        if source.ndim > 2:
+            channels = [box_guided_filter(channel / 255.0, channel / 255.0, window, edge_eps, subsample)
+                        for channel in cv2.split(source)]
+            base = cv2.merge(channels) * 255.0
+        else:
+            base = box_guided_filter(source / 255.0, source / 255.0, window, edge_eps, subsample) * 255.0
+    else:
+        base = fast_gaussian_blur(source, radius)
+    
+    detail = (source - base) * clarity
+    if color and luminance_only:
+        detail = cv2.merge([detail, detail, detail])
+    
+    return cv2.add(image, detail, dtype=cv2.CV_8U)
+
 def apply_shadows_highlights(image, params=None):
     """
     Apply shadows and highlights adjustment to an image.
@@ -208,6 +219,10 @@ def apply_shadows_highlights(image, params=None):
         params: Dictionary of parameters
             - shadows: Shadow adjustment (0 to 100, default: 50)
             - highlights: Highlight adjustment (0 to 100, default: 50)
+            - fast_mode: Shift all channels by the adjustment of the pixel's gray
+                level instead of converting to LAB and back (default: False).
+                An approximation: equal shifts change saturation and clip
+                saturated colors, so it is only used when requested
     
     Returns:
         Adjusted image
@@ -216,8 +231,7 @@ def apply_shadows_highlights(image, params=None):
         params = {}
     
     # Get parameters with defaults
-    shadows = params.get('shadows', 50) / 100.0
-    highlights = params.get('highlights', 50) / 100.0
+    fast_mode = params.get('fast_mode', False)
     
     # Convert image to appropriate type
     if image.dtype != np.uint8:
@@ -225,29 +239,28 @@ def apply_shadows_highlights(image, params=None):
     
     # Apply shadows and highlights adjustment
     try:
-        # Convert to LAB color space
+        if fast_mode and len(image.shape) > 2:
+            # Moving along L with a and b fixed is close to adding the same
+            # amount to every channel; the amount only depends on the gray level
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            delta = cv2.LUT(gray, shadows_highlights_gray_delta(params))
+            result = cv2.add(image, cv2.merge([delta, delta, delta]), dtype=cv2.CV_8U)
+            
+            # Clean up to free memory
+            gc.collect()
+            
+            return result
+        
+        # Lighten shadows and darken highlights through the L tone curve
+        curve = shadows_highlights_curve(params)
         if len(image.shape) > 2:  # Color image
+            # One per-channel lookup on the LAB image that only changes L,
+            # without splitting and merging the channels
             lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
-            l, a, b = cv2.split(lab)
+            lab_table = np.dstack([curve, IDENTITY_CURVE, IDENTITY_CURVE])
+            result = cv2.cvtColor(cv2.LUT(lab, lab_table), cv2.COLOR_LAB2BGR)
         else:  # Grayscale image
-            l = image.copy()
-        
-        # Create shadow and highlight masks
-        shadow_mask = (1.0 - l / 255.0) ** 2  # Stronger for darker pixels
-        highlight_mask = (l / 255.0) ** 2  # Stronger for brighter pixels
-        
-        # Apply adjustments
-        l = l.astype(np.float32)
-        l += shadow_mask * shadows * 100  # Lighten shadows
-        l -= highlight_mask * highlights * 100  # Darken highlights
-        l = np.clip(l, 0, 255).astype(np.uint8)
-        
-        # Merge channels if color image
-        if len(image.shape) > 2:
-            lab = cv2.merge([l, a, b])
-            result = cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
-        else:
-            result = l
+            result = cv2.LUT(image, curve)
         
         # Clean up to free memory
         gc.collect()
@@ -257,9 +270,23 @@ def apply_shadows_highlights(image, params=None):
         print(f"Error in shadows/highlights adjustment: {str(e)}")
         return image
 
+# Images with more pixels than this are processed in bands of rows, so the
+# temporary arrays stay bounded whatever the image size
+HDR_TILING_MIN_PIXELS = 8000000
+
+# Approximate number of pixels per band
+HDR_BAND_PIXELS = 1 << 21
+
+# Band boundaries and halos are multiples of this many rows, which is a
+# multiple of the blur's reduction factor, so the reduced-resolution blurs of
+# all bands sample the same grid as a whole-image blur
+HDR_BAND_ALIGN = 64
+
 def apply_hdr_effect(image, params=None):
     """
     Apply HDR-like effect to an image.
+    The luminance is tone mapped with the Drago operator, blended with the
+    original, and local contrast is boosted with a large-scale unsharp mask.
     
     Args:
         image: Input image
@@ -277,50 +304,67 @@ def apply_hdr_effect(image, params=None):
     strength = params.get('strength', 50) / 100.0
     radius = params.get('radius', 20)
     
+    # Standard deviation of the Gaussian of size radius * 2 + 1
+    sigma = 0.3 * (radius - 1) + 0.8
+    
     # Convert image to appropriate type
     if image.dtype != np.uint8:
         image = np.clip(image, 0, 255).astype(np.uint8)
     
     # Apply HDR effect
     try:
-        # Convert to 32-bit float
-        img_float = image.astype(np.float32) / 255.0
+        h, w = image.shape[:2]
+        if h * w > HDR_TILING_MIN_PIXELS:
+            rows = max(HDR_BAND_ALIGN, HDR_BAND_PIXELS // w // HDR_BAND_ALIGN * HDR_BAND_ALIGN)
+        else:
+            rows = h
+        bands = [(start, min(start + rows, h)) for start in range(0, h, rows)]
         
-        # Create tonemapped version
-        if len(image.shape) > 2:  # Color image
-            # Convert to LAB for better processing
-            lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
-            l, a, b = cv2.split(lab)
-            
-            # Apply local tone mapping to L channel
-            tonemap = cv2.createTonemapDrago(gamma=1.0, saturation=1.0, bias=0.85)
-            l_mapped = tonemap.process(l.astype(np.float32) / 255.0) * 255.0
-            
-            # Blend original and tonemapped version
-            l_result = cv2.addWeighted(l.astype(np.float32), 1 - strength, l_mapped.astype(np.float32), strength, 0)
-            
-            # Merge channels
-            result_lab = cv2.merge([l_result.astype(np.uint8), a, b])
-            result = cv2.cvtColor(result_lab, cv2.COLOR_LAB2BGR)
-            
-            # Enhance local contrast
-            kernel_size = radius * 2 + 1
-            blurred = cv2.GaussianBlur(result, (kernel_size, kernel_size), 0)
-            result = cv2.addWeighted(result, 1 + strength * 0.5, blurred, -strength * 0.5, 0)
-        else:  # Grayscale image
-            tonemap = cv2.createTonemapDrago(gamma=1.0, saturation=1.0, bias=0.85)
-            mapped = tonemap.process(img_float) * 255.0
-            result = cv2.addWeighted(image.astype(np.float32), 1 - strength, mapped.astype(np.float32), strength, 0)
-            
-            # Enhance local contrast
-            kernel_size = radius * 2 + 1
-            blurred = cv2.GaussianBlur(result, (kernel_size, kernel_size), 0)
-            result = cv2.addWeighted(result, 1 + strength * 0.5, blurred, -strength * 0.5, 0)
+        # The tone mapping is global: gather the luminance histogram first
+        histogram = np.zeros(256, dtype=np.float64)
+        for start, end in bands:
+            histogram += cv2.calcHist([_hdr_luminance(image[start:end])], [0], None, [256], [0, 256]).ravel()
+        
+        # Blend the (cached) tone curve with the identity
+        curve = drago_curve(histogram)
+        table = cv2.addWeighted(IDENTITY_CURVE, 1 - strength, curve, strength, 0).ravel()
+        
+        # Rows of context each band needs for the local contrast blur: its
+        # support, plus the resampling of a reduced-resolution blur (at most
+        # two reduced pixels, with a reduction factor of at most sigma / 4)
+        halo = -(-int(np.ceil(3.5 * sigma)) // HDR_BAND_ALIGN) * HDR_BAND_ALIGN
+        
+        result = np.empty_like(image)
+        for start, end in bands:
+            top = max(0, start - halo)
+            bottom = min(h, end + halo)
+            band = _hdr_band(image[top:bottom], table, sigma, strength)
+            result[start:end] = band[start - top:end - top]
         
         # Clean up to free memory
         gc.collect()
         
-        return np.clip(result, 0, 255).astype(np.uint8)
+        return result
     except Exception as e:
         print(f"Error in HDR effect: {str(e)}")
         return image
+
+def _hdr_luminance(image):
+    """L channel of a color image, or the image itself for grayscale images."""
+    if len(image.shape) > 2:
+        return cv2.cvtColor(image, cv2.COLOR_BGR2LAB)[:, :, 0]
+    return image
+
+def _hdr_band(image, table, sigma, strength):
+    """Tone map a band of rows and boost its local contrast."""
+    if len(image.shape) > 2:
+        # Per-channel table that only changes L
+        lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
+        lab_table = np.dstack([table, IDENTITY_CURVE, IDENTITY_CURVE])
+        toned = cv2.cvtColor(cv2.LUT(lab, lab_table), cv2.COLOR_LAB2BGR)
+    else:
+        toned = cv2.LUT(image, table)
+    
+    # Enhance local contrast, with a blur whose cost does not depend on the radius
+    blurred = fast_gaussian_blur(toned, sigma)
+    return cv2.addWeighted(toned, 1 + strength * 0.5, blurred, -strength * 0.5, 0)
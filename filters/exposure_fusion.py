@@ -0,0 +1,186 @@
+"""
+Exposure fusion filter for image processing.
+This module synthesizes virtual exposures with gamma lookup tables and fuses
+them in a Laplacian pyramid (Mertens et al.) with bounded memory.
+"""
+
+import cv2
+import numpy as np
+import gc
+
+from filters.tone_curves import exposure_curve
+
+# Spread of the well-exposedness curve around mid-gray
+WELL_EXPOSED_SIGMA = 0.2
+
+def apply_exposure_fusion(image, params=None):
+    """
+    Apply exposure fusion of synthetic exposures to an image.
+
+    Args:
+        image: Input image
+        params: Dictionary of parameters
+            - num_exposures: Number of virtual exposures (2 to 7, default: 3)
+            - exposure_range: Largest exposure offset, in apply_exposure units (0 to 100, default: 60)
+            - pyramid_levels: Depth of the blending pyramid (default: 6)
+            - contrast_weight: Exponent of the contrast measure (default: 1.0)
+            - saturation_weight: Exponent of the saturation measure (default: 1.0)
+            - exposure_weight: Exponent of the well-exposedness measure (default: 1.0)
+
+    Returns:
+        Fused image
+    """
+    if params is None:
+        params = {}
+
+    # Get parameters with defaults
+    num_exposures = max(2, int(params.get('num_exposures', 3)))
+    exposure_range = params.get('exposure_range', 60)
+    pyramid_levels = max(1, int(params.get('pyramid_levels', 6)))
+    weight_exponents = (
+        params.get('contrast_weight', 1.0),
+        params.get('saturation_weight', 1.0),
+        params.get('exposure_weight', 1.0)
+    )
+
+    # Convert image to appropriate type
+    if image.dtype != np.uint8:
+        image = np.clip(image, 0, 255).astype(np.uint8)
+
+    # Apply exposure fusion
+    try:
+        h, w = image.shape[:2]
+        levels = min(pyramid_levels, max(1, int(np.log2(min(h, w))) - 2))
+
+        # Accumulated weighted Laplacian pyramid and weight pyramid; these are
+        # the only full pyramids kept, whatever the number of exposures
+        blended = [None] * levels
+        weight_sums = [None] * levels
+
+        for exposure in np.linspace(-exposure_range, exposure_range, num_exposures):
+            table = exposure_table(exposure)
+            exposed = cv2.LUT(image, table)
+            weight = fusion_weight(exposed, weight_exponents)
+
+            _accumulate_pyramid(exposed, weight, blended, weight_sums)
+
+            del exposed, weight
+
+        # Normalize each level and collapse the pyramid from coarse to fine
+        result = None
+        for level in range(levels - 1, -1, -1):
+            weights = weight_sums[level]
+            if blended[level].ndim == 3:
+                weights = weights[:, :, np.newaxis]
+            band = blended[level] / weights
+
+            if result is None:
+                result = band
+            else:
+                size = (band.shape[1], band.shape[0])
+                result = cv2.pyrUp(result, dstsize=size) + band
+
+            blended[level] = None
+            weight_sums[level] = None
+
+        # Clean up to free memory
+        gc.collect()
+
+        return np.clip(result, 0, 255).astype(np.uint8)
+    except Exception as e:
+        print(f"Error in exposure fusion: {str(e)}")
+        return image
+
+def exposure_table(exposure):
+    """
+    Get the (cached) gamma lookup table used by apply_exposure for an exposure value.
+
+    Args:
+        exposure: Exposure adjustment (-100 to 100)
+
+    Returns:
+        256-entry uint8 lookup table
+    """
+    # Exposures from 99.9 up all reach the smallest gamma, 0.001
+    return exposure_curve({'exposure': min(exposure, 99.9)})
+
+def fusion_weight(image, exponents=(1.0, 1.0, 1.0)):
+    """
+    Compute the Mertens fusion weight of one exposure.
+
+    Args:
+        image: Exposure image (uint8)
+        exponents: Exponents of the contrast, saturation and well-exposedness measures
+
+    Returns:
+        Float32 weight map
+    """
+    contrast_exp, saturation_exp, exposure_exp = exponents
+
+    # Well-exposedness depends on the value only, so it is a lookup table
+    ramp = np.arange(256, dtype=np.float32) / 255.0
+    well_exposed = np.exp(-((ramp - 0.5) ** 2) / (2 * WELL_EXPOSED_SIGMA ** 2)).astype(np.float32)
+
+    if len(image.shape) > 2:
+        channels = cv2.split(image)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+        exposedness = np.ones(gray.shape, dtype=np.float32)
+        mean = np.zeros(gray.shape, dtype=np.float32)
+        mean_sq = np.zeros(gray.shape, dtype=np.float32)
+        for channel in channels:
+            exposedness *= well_exposed[channel]
+            value = channel.astype(np.float32) / 255.0
+            mean += value
+            mean_sq += value * value
+        mean /= len(channels)
+        mean_sq /= len(channels)
+        saturation = cv2.sqrt(np.maximum(mean_sq - mean * mean, 0))
+    else:
+        gray = image
+        exposedness = well_exposed[image]
+        saturation = None
+
+    contrast = np.abs(cv2.Laplacian(gray.astype(np.float32) / 255.0, cv2.CV_32F))
+
+    weight = np.power(contrast, contrast_exp) if contrast_exp != 1.0 else contrast
+    if saturation is not None and saturation_exp != 0:
+        weight *= np.power(saturation, saturation_exp) if saturation_exp != 1.0 else saturation
+    weight *= np.power(exposedness, exposure_exp) if exposure_exp != 1.0 else exposedness
+
+    return weight + 1e-12
+
+def _accumulate_pyramid(image, weight, blended, weight_sums):
+    """
+    Add one exposure to the blended pyramids, one level at a time.
+    Only the current and the next level of this exposure are alive at any point.
+    """
+    levels = len(blended)
+    current = image.astype(np.float32)
+    current_weight = weight
+
+    for level in range(levels):
+        if level < levels - 1:
+            smaller = cv2.pyrDown(current)
+            size = (current.shape[1], current.shape[0])
+            band = cv2.pyrUp(smaller, dstsize=size)
+            np.subtract(current, band, out=band)
+        else:
+            smaller = None
+            band = current
+
+        if band.ndim == 3:
+            band *= current_weight[:, :, np.newaxis]
+        else:
+            band *= current_weight
+
+        if blended[level] is None:
+            blended[level] = band
+            weight_sums[level] = current_weight.copy()
+        else:
+            blended[level] += band
+            weight_sums[level] += current_weight
+
+        if smaller is not None:
+            current_weight = cv2.pyrDown(current_weight)
+        current = smaller
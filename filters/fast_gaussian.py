@@ -0,0 +1,110 @@
+"""
+Fast large-radius Gaussian approximations for image processing.
+This module provides blurs whose cost per pixel does not grow with sigma.
+"""
+
+import math
+
+import cv2
+
+# Below this sigma the stacked box blur runs directly at full resolution
+DOWNSAMPLE_MIN_SIGMA = 16.0
+
+# Sigma that is kept at the reduced resolution when downsampling
+DOWNSAMPLED_SIGMA = 4.0
+
+def box_sizes_for_gaussian(sigma, passes=3):
+    """
+    Compute box widths whose repeated application approximates a Gaussian.
+
+    Args:
+        sigma: Standard deviation of the target Gaussian
+        passes: Number of box passes (3 is within a few percent of a Gaussian)
+
+    Returns:
+        List of odd box widths, one per pass
+    """
+    variance = 12.0 * sigma * sigma
+    ideal_width = math.sqrt(variance / passes + 1)
+
+    lower = int(math.floor(ideal_width))
+    if lower % 2 == 0:
+        lower -= 1
+    lower = max(lower, 1)
+    upper = lower + 2
+
+    # Number of passes that use the lower width so the total variance matches
+    ideal_count = (variance - passes * lower * lower - 4 * passes * lower - 3 * passes) / (-4 * lower - 4)
+    count = int(round(ideal_count))
+    count = min(max(count, 0), passes)
+
+    return [lower if i < count else upper for i in range(passes)]
+
+def stacked_box_blur(image, sigma, passes=3):
+    """
+    Approximate a Gaussian blur with repeated box filters.
+    OpenCV box filters use running sums, so the cost is independent of the box width.
+
+    Args:
+        image: Input image (any depth, 1 or more channels)
+        sigma: Standard deviation of the target Gaussian
+        passes: Number of box passes
+
+    Returns:
+        Blurred image with the same depth as the input
+    """
+    if sigma <= 0:
+        return image.copy()
+
+    result = image
+    for width in box_sizes_for_gaussian(sigma, passes):
+        if width > 1:
+            result = cv2.blur(result, (width, width), borderType=cv2.BORDER_REFLECT)
+
+    if result is image:
+        result = image.copy()
+
+    return result
+
+def fast_gaussian_blur(image, sigma, passes=3, downsample=True):
+    """
+    Blur an image with a Gaussian of arbitrary sigma in constant time per pixel.
+    Large sigmas are evaluated on a reduced-resolution copy, where the blur is
+    band-limited anyway, and then upsampled back to the input size.
+
+    Args:
+        image: Input image
+        sigma: Standard deviation of the Gaussian in full-resolution pixels
+        passes: Number of box passes used for the approximation
+        downsample: Whether large sigmas may be evaluated at reduced resolution
+
+    Returns:
+        Blurred image with the same shape and depth as the input
+    """
+    h, w = image.shape[:2]
+
+    factor = 1
+    if downsample and sigma >= DOWNSAMPLE_MIN_SIGMA:
+        factor = 2 ** int(math.floor(math.log2(sigma / DOWNSAMPLED_SIGMA)))
+        # Keep at least a few pixels in each direction
+        while factor > 1 and min(h, w) // factor < 8:
+            factor //= 2
+
+    if factor == 1:
+        return stacked_box_blur(image, sigma, passes)
+
+    # Pad to a multiple of the factor, so the reduced grid is exactly factor
+    # times coarser and anchored at the first row and column: any band of
+    # rows starting at a multiple of the factor then samples the same grid
+    # as the whole image
+    pad_h = -h % factor
+    pad_w = -w % factor
+    if pad_h or pad_w:
+        image = cv2.copyMakeBorder(image, 0, pad_h, 0, pad_w, cv2.BORDER_REFLECT)
+
+    small_size = ((w + pad_w) // factor, (h + pad_h) // factor)
+    small = cv2.resize(image, small_size, interpolation=cv2.INTER_AREA)
+    small = stacked_box_blur(small, sigma / factor, passes)
+
+    blurred = cv2.resize(small, (w + pad_w, h + pad_h), interpolation=cv2.INTER_LINEAR)
+    return blurred[:h, :w]
@@ -0,0 +1,77 @@
+"""
+Granulometry analysis for image processing.
+This module measures the size distribution of bright (or dark) structures with
+openings (or closings) by squares of increasing size, to help choose the
+kernel size of the opening, closing and top-hat filters.
+"""
+
+import cv2
+import numpy as np
+
+from filters.morphology_ops import structuring_element, erode, dilate
+
+def compute_granulometry(image, max_size=31, dark=False):
+    """
+    Compute the pattern spectrum of an image for every odd kernel size up to max_size.
+
+    Openings by squares form a granulometry: the square of side 2k + 3 is the
+    square of side 2k + 1 dilated by a 3x3 square. So each erosion is the
+    previous one eroded by 3x3, and each opening costs one 3x3 erosion plus one
+    rectangular dilation. Below VHGW_MIN_KERNEL the dilation runs through
+    OpenCV, whose cost grows with the size; only larger squares get the
+    separable backend, whose cost does not.
+
+    Args:
+        image: Input image (color images are analyzed on their luminance)
+        max_size: Largest kernel size to analyze (odd, default: 31)
+        dark: Analyze dark structures with closings instead of bright ones (default: False)
+
+    Returns:
+        Dictionary with:
+            - sizes: Analyzed kernel sizes (3, 5, ..., max_size)
+            - volumes: Sum of the opened image at each size, as a fraction of the image sum
+            - spectrum: Fraction of the image sum removed between each size and the previous one
+            - recommended_kernel_size: Size at the peak of the spectrum (the dominant structure size)
+            - dark: Whether dark structures were analyzed
+    """
+    # Analyze the luminance
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) > 2 else image
+    if gray.dtype != np.uint8:
+        gray = np.clip(gray, 0, 255).astype(np.uint8)
+
+    # Closings of the image are openings of its inverse
+    if dark:
+        gray = cv2.bitwise_not(gray)
+
+    # Ensure the largest size is odd and at least 3
+    max_size = max(3, int(max_size))
+    if max_size % 2 == 0:
+        max_size += 1
+
+    step = structuring_element('rect', 3)
+    total = float(cv2.sumElems(gray)[0])
+
+    sizes = []
+    volumes = []
+    eroded = gray
+    for size in range(3, max_size + 1, 2):
+        # Erosion by the square of this size, from the previous erosion
+        eroded = erode(eroded, step)
+        opened = dilate(eroded, structuring_element('rect', size))
+
+        sizes.append(size)
+        volumes.append(float(cv2.sumElems(opened)[0]) / total if total else 0.0)
+
+    # Fraction of the image removed between successive sizes (size 1 is the image itself)
+    previous = [1.0 if total else 0.0] + volumes[:-1]
+    spectrum = [before - after for before, after in zip(previous, volumes)]
+
+    recommended = sizes[int(np.argmax(spectrum))] if total else 3
+
+    return {
+        'sizes': sizes,
+        'volumes': [round(volume, 6) for volume in volumes],
+        'spectrum': [round(value, 6) for value in spectrum],
+        'recommended_kernel_size': recommended,
+        'dark': bool(dark)
+    }
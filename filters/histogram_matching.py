@@ -0,0 +1,162 @@
+"""
+Histogram matching filter for image processing.
+This module gives an image the tonality of a reference image: each channel
+(or the L channel of LAB) is remapped with a 256-entry lookup table built
+from the two cumulative histograms, so applying it is a single cv2.LUT.
+Reference histograms are cached by a hash of the reference pixels, so a whole
+shoot matched to one reference only measures the reference once.
+"""
+
+from collections import OrderedDict
+import hashlib
+import threading
+
+import cv2
+import numpy as np
+import gc
+
+from filters.tone_curves import IDENTITY_CURVE
+
+# Number of reference histograms kept in the cache
+REFERENCE_CACHE_SIZE = 32
+
+_reference_cache = OrderedDict()
+# Tasks run in worker threads, so cache reads and updates hold this lock
+_reference_lock = threading.Lock()
+
+def apply_histogram_matching(image, params=None):
+    """
+    Match the histogram of an image to the histogram of a reference image.
+
+    Args:
+        image: Input image
+        params: Dictionary of parameters
+            - reference: Reference image (required)
+            - mode: 'luminance' to match the L channel of LAB, which keeps the
+                colors of the image, or 'channels' to match B, G and R
+                separately, which also transfers the color balance (default: 'luminance')
+            - strength: Blend between the original and the matched image (0 to 100, default: 100)
+
+    Returns:
+        Matched image
+    """
+    if params is None:
+        params = {}
+
+    # Get parameters with defaults
+    reference = params.get('reference')
+    mode = params.get('mode', 'luminance')
+    strength = params.get('strength', 100) / 100.0
+
+    # Convert image to appropriate type
+    if image.dtype != np.uint8:
+        image = np.clip(image, 0, 255).astype(np.uint8)
+
+    # Apply histogram matching
+    try:
+        if reference is None:
+            raise ValueError("A reference image is required")
+        if mode not in ('luminance', 'channels'):
+            raise ValueError(f"Unknown histogram matching mode: {mode}")
+
+        if len(image.shape) < 3:
+            # Grayscale images match the gray levels of the reference
+            table = _blend(matching_curve(_histograms(image)[0], reference_histograms(reference, 'gray')[0]), strength)
+            result = cv2.LUT(image, table)
+        elif mode == 'luminance':
+            lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
+            table = _blend(matching_curve(_histograms(lab[:, :, 0])[0], reference_histograms(reference, 'luminance')[0]), strength)
+
+            # Per-channel table that only changes L
+            lab_table = np.dstack([table, IDENTITY_CURVE, IDENTITY_CURVE])
+            result = cv2.cvtColor(cv2.LUT(lab, lab_table), cv2.COLOR_LAB2BGR)
+        else:
+            tables = [
+                _blend(matching_curve(source, target), strength)
+                for source, target in zip(_histograms(image), reference_histograms(reference, 'channels'))
+            ]
+            result = cv2.LUT(image, np.dstack(tables))
+
+        # Clean up to free memory
+        gc.collect()
+
+        return result
+    except Exception as e:
+        print(f"Error in histogram matching: {str(e)}")
+        return image
+
+def matching_curve(source_histogram, reference_histogram):
+    """
+    Lookup table that maps a source histogram onto a reference histogram:
+    each level goes to the first reference level whose cumulative frequency
+    reaches the level's own.
+
+    Args:
+        source_histogram: 256-bin histogram of the channel to remap
+        reference_histogram: 256-bin histogram to match
+
+    Returns:
+        256-entry uint8 lookup table
+    """
+    source_cdf = np.cumsum(np.asarray(source_histogram, dtype=np.float64).ravel())
+    reference_cdf = np.cumsum(np.asarray(reference_histogram, dtype=np.float64).ravel())
+    if source_cdf[-1] == 0 or reference_cdf[-1] == 0:
+        return IDENTITY_CURVE
+
+    source_cdf /= source_cdf[-1]
+    reference_cdf /= reference_cdf[-1]
+    return np.clip(np.searchsorted(reference_cdf, source_cdf - 1e-9), 0, 255).astype(np.uint8)
+
+def reference_histograms(reference, space='luminance'):
+    """
+    Histograms of a reference image, cached by a hash of its pixels.
+
+    Args:
+        reference: Reference image
+        space: 'luminance' (L channel of LAB), 'gray' (gray levels) or
+            'channels' (B, G and R)
+
+    Returns:
+        Tuple of read-only 256-bin histograms (one, or three for 'channels')
+    """
+    if reference.dtype != np.uint8:
+        reference = np.clip(reference, 0, 255).astype(np.uint8)
+    reference = np.ascontiguousarray(reference)
+
+    key = (hashlib.sha1(reference).hexdigest(), reference.shape, space)
+    with _reference_lock:
+        if key in _reference_cache:
+            _reference_cache.move_to_end(key)
+            return _reference_cache[key]
+
+    color = len(reference.shape) > 2
+    if space == 'luminance':
+        channel = cv2.cvtColor(reference, cv2.COLOR_BGR2LAB)[:, :, 0] if color else reference
+        histograms = _histograms(channel)
+    elif space == 'gray':
+        histograms = _histograms(cv2.cvtColor(reference, cv2.COLOR_BGR2GRAY) if color else reference)
+    elif space == 'channels':
+        histograms = _histograms(reference) if color else _histograms(reference) * 3
+    else:
+        raise ValueError(f"Unknown histogram space: {space}")
+
+    for histogram in histograms:
+        histogram.setflags(write=False)
+
+    with _reference_lock:
+        _reference_cache[key] = histograms
+        if len(_reference_cache) > REFERENCE_CACHE_SIZE:
+            _reference_cache.popitem(last=False)
+
+    return histograms
+
+def _histograms(image):
+    """256-bin histogram of each channel of an image, as a tuple."""
+    channels = cv2.split(image) if len(image.shape) > 2 else [image]
+    return tuple(cv2.calcHist([channel], [0], None, [256], [0, 256]).ravel() for channel in channels)
+
+def _blend(table, strength):
+    """Blend a lookup table with the identity."""
+    if strength >= 1:
+        return table
+    return cv2.addWeighted(IDENTITY_CURVE, 1 - strength, table, strength, 0).ravel()
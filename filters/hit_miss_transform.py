@@ -7,6 +7,10 @@ import cv2
 import numpy as np
 import gc
 
+from filters.binary_engine import (
+    pack_mask, unpack_mask, to_binary_image, count_bits, hit_or_miss, multi_hit_or_miss
+)
+
 def apply_hit_miss_transform(image, params=None):
     """
     Apply hit-or-miss transform to an image.
@@ -16,12 +20,19 @@ def apply_hit_miss_transform(image, params=None):
         image: Input image
         params: Dictionary of parameters
             - kernel_size: Size of the structuring element (default: 3)
-            - iterations: Number of times operation is applied (default: 1)
+            - iterations: Number of times operation is applied (default: 1, single pattern only)
             - pattern: Pattern type for the structuring element (default: 'cross')
                 Options: 'cross', 'horizontal', 'vertical', 'diagonal'
+            - patterns: List of patterns to detect in one pass (default: None).
+                Each entry is a pattern name or a template in OpenCV's convention
+                (1: foreground, -1: background, 0: don't care)
+            - rotations: Also detect the 90, 180 and 270 degree rotations (default: False)
     
     Returns:
-        Hit-or-miss transformed image
+        Hit-or-miss transformed image. With several patterns, params['pattern_counts']
+        receives the number of matches of each pattern, which the task status
+        reports under 'statistics' (on grayscale images the result is a 0/255
+        mask, so the counts are the only per-pattern output).
     """
     if params is None:
         params = {}
@@ -30,45 +41,33 @@ def apply_hit_miss_transform(image, params=None):
     kernel_size = params.get('kernel_size', 3)
     iterations = params.get('iterations', 1)
     pattern = params.get('pattern', 'cross')
+    patterns = params.get('patterns')
+    rotations = params.get('rotations', False)
     
     # Ensure kernel size is odd
     if kernel_size % 2 == 0:
         kernel_size += 1
     
-    # Create structuring elements based on pattern
-    if pattern == 'horizontal':
-        kernel1 = np.zeros((kernel_size, kernel_size), np.uint8)
-        kernel1[kernel_size//2, :] = 1
-        kernel2 = np.zeros((kernel_size, kernel_size), np.uint8)
-        kernel2[0, :] = 1
-        kernel2[-1, :] = 1
-    elif pattern == 'vertical':
-        kernel1 = np.zeros((kernel_size, kernel_size), np.uint8)
-        kernel1[:, kernel_size//2] = 1
-        kernel2 = np.zeros((kernel_size, kernel_size), np.uint8)
-        kernel2[:, 0] = 1
-        kernel2[:, -1] = 1
-    elif pattern == 'diagonal':
-        kernel1 = np.zeros((kernel_size, kernel_size), np.uint8)
-        np.fill_diagonal(kernel1, 1)
-        kernel2 = np.zeros((kernel_size, kernel_size), np.uint8)
-        np.fill_diagonal(np.fliplr(kernel2), 1)
-    else:  # Default to cross pattern
-        kernel1 = np.zeros((kernel_size, kernel_size), np.uint8)
-        kernel1[kernel_size//2, :] = 1
-        kernel1[:, kernel_size//2] = 1
-        kernel2 = np.zeros((kernel_size, kernel_size), np.uint8)
-        kernel2[0, 0] = 1
-        kernel2[0, -1] = 1
-        kernel2[-1, 0] = 1
-        kernel2[-1, -1] = 1
-    
     # Convert image to appropriate type
     if image.dtype != np.uint8:
         image = np.clip(image, 0, 255).astype(np.uint8)
     
     # Apply hit-or-miss transform
     try:
+        # Batched detection of several patterns (or of the rotations of one)
+        if patterns or rotations:
+            names, templates = pattern_templates(patterns or [pattern], kernel_size, rotations)
+            result, counts = _apply_multi_pattern(image, names, templates)
+            params['pattern_counts'] = counts
+            
+            # Clean up to free memory
+            gc.collect()
+            
+            return result
+        
+        # Create structuring element based on pattern
+        kernel = pattern_template(pattern, kernel_size)
+        
         # Process color and grayscale images appropriately
         if len(image.shape) > 2:  # Color image
             # Convert to grayscale for hit-miss transform
@@ -77,8 +76,8 @@ def apply_hit_miss_transform(image, params=None):
             # Binarize the image for hit-miss transform
             _, binary = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
             
-            # Apply hit-miss transform
-            hit_miss = cv2.morphologyEx(binary, cv2.MORPH_HITMISS, kernel1, iterations=iterations)
+            # Apply hit-miss transform on the bit-packed image
+            hit_miss = packed_hit_miss(binary, kernel, iterations)
             
             # For visualization, create a color result
             result = np.zeros_like(image)
@@ -93,11 +92,8 @@ def apply_hit_miss_transform(image, params=None):
             # Binarize the image for hit-miss transform
             _, binary = cv2.threshold(image, 127, 255, cv2.THRESH_BINARY)
             
-            # Apply hit-miss transform
-            hit_miss = cv2.morphologyEx(binary, cv2.MORPH_HITMISS, kernel1, iterations=iterations)
-            
-            # Scale result to visible range
-            result = hit_miss * 255
+            # Apply hit-miss transform on the bit-packed image (0/255 result)
+            result = packed_hit_miss(binary, kernel, iterations)
         
         # Clean up to free memory
         gc.collect()
@@ -106,3 +102,163 @@ def apply_hit_miss_transform(image, params=None):
     except Exception as e:
         print(f"Error in hit-miss transform: {str(e)}")
         return image
+
+def _apply_multi_pattern(image, names, templates):
+    """
+    Detect several templates and render the labelled matches like the single-pattern filter.
+    
+    Returns:
+        (result image, dictionary of match counts per pattern name)
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) > 2 else image
+    
+    # Binarize once for all patterns
+    _, binary = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
+    labels, counts = detect_patterns(binary, templates)
+    
+    if len(image.shape) == 2:
+        # Grayscale image: every match in white (0/255 result)
+        return cv2.compare(labels, 0, cv2.CMP_GT), dict(zip(names, counts))
+    
+    # Color image: one color per pattern, blended with the original
+    palette = np.zeros((256, 3), np.uint8)
+    palette[:len(templates) + 1] = pattern_palette(len(templates))
+    overlay = cv2.merge([cv2.LUT(labels, palette[:, channel].copy()) for channel in range(3)])
+    result = cv2.addWeighted(image, 0.7, overlay, 0.3, 0)
+    
+    return result, dict(zip(names, counts))
+
+def detect_patterns(binary, templates):
+    """
+    Detect several hit-or-miss templates in a binary image in one pass.
+    The image is packed once and the shifted foreground and background planes
+    are shared by all templates.
+    
+    Args:
+        binary: Binary image (0 and 255)
+        templates: Kernels in OpenCV's MORPH_HITMISS convention
+            (1: foreground, -1: background, 0: don't care), at most 255
+    
+    Returns:
+        (labels, counts): uint8 image holding at each match the 1-based index of
+        the first matching template (0 elsewhere), and the number of matches of
+        each template
+    """
+    if len(templates) > 255:
+        raise ValueError("At most 255 patterns can be detected at once")
+    
+    width = binary.shape[1]
+    matches = multi_hit_or_miss(pack_mask(binary), width, templates)
+    
+    counts = [count_bits(packed) for packed in matches]
+    
+    # Bit-sliced labels: plane k holds bit k of the label of every pixel, and
+    # each template only claims the pixels no earlier template matched
+    planes = [np.zeros_like(matches[0]) for _ in range(len(matches).bit_length())]
+    claimed = np.zeros_like(matches[0]) if matches else None
+    for label, packed in enumerate(matches, start=1):
+        first = packed & np.invert(claimed)
+        claimed |= packed
+        for bit, plane in enumerate(planes):
+            if label >> bit & 1:
+                plane |= first
+    
+    labels = np.zeros(binary.shape, np.uint8)
+    for bit, plane in enumerate(planes):
+        layer = unpack_mask(plane, width)
+        np.left_shift(layer, bit, out=layer)
+        np.bitwise_or(labels, layer, out=labels)
+    
+    return labels, counts
+
+def pattern_template(pattern, kernel_size=3):
+    """
+    Build the hit-or-miss template of a named pattern.
+    
+    Args:
+        pattern: 'cross', 'horizontal', 'vertical' or 'diagonal'
+        kernel_size: Size of the template (odd)
+    
+    Returns:
+        Template with 1 for the elements that must be foreground
+    """
+    kernel = np.zeros((kernel_size, kernel_size), np.int8)
+    
+    if pattern == 'horizontal':
+        kernel[kernel_size//2, :] = 1
+    elif pattern == 'vertical':
+        kernel[:, kernel_size//2] = 1
+    elif pattern == 'diagonal':
+        np.fill_diagonal(kernel, 1)
+    else:  # Default to cross pattern
+        kernel[kernel_size//2, :] = 1
+        kernel[:, kernel_size//2] = 1
+    
+    return kernel
+
+def pattern_templates(patterns, kernel_size=3, rotations=False):
+    """
+    Build the templates of a list of patterns, optionally with their rotations.
+    Rotations identical to a template already in the list are skipped.
+    
+    Args:
+        patterns: Pattern names or templates (1: foreground, -1: background, 0: don't care)
+        kernel_size: Size of the named patterns' templates
+        rotations: Whether to add the 90, 180 and 270 degree rotations
+    
+    Returns:
+        (names, templates) lists
+    """
+    names = []
+    templates = []
+    seen = set()
+    
+    for index, pattern in enumerate(patterns):
+        if isinstance(pattern, str):
+            name, template = pattern, pattern_template(pattern, kernel_size)
+        else:
+            name, template = f"pattern_{index}", np.asarray(pattern, dtype=np.int8)
+            if template.ndim != 2 or template.shape[0] % 2 == 0 or template.shape[1] % 2 == 0:
+                raise ValueError(f"Template {index} must be a 2-D array with odd sides")
+        
+        for quarter_turns in range(4 if rotations else 1):
+            rotated = np.ascontiguousarray(np.rot90(template, quarter_turns))
+            key = (rotated.shape, rotated.tobytes())
+            if key in seen:
+                continue
+            seen.add(key)
+            
+            names.append(f"{name}_r{90 * quarter_turns}" if quarter_turns else name)
+            templates.append(rotated)
+    
+    return names, templates
+
+def pattern_palette(count):
+    """
+    Distinct BGR colors for labelled pattern matches.
+    
+    Returns:
+        (count + 1, 3) uint8 array; row 0 (no match) is black
+    """
+    hues = np.arange(count, dtype=np.float32) * (180.0 / max(count, 1))
+    hsv = np.stack([hues, np.full(count, 255), np.full(count, 255)], axis=1).astype(np.uint8)
+    colors = cv2.cvtColor(hsv[np.newaxis], cv2.COLOR_HSV2BGR)[0]
+    
+    return np.vstack([np.zeros((1, 3), np.uint8), colors])
+
+def packed_hit_miss(binary, kernel, iterations=1):
+    """
+    Apply the hit-or-miss transform to a binary image on the bit-packed engine.
+    Equivalent to cv2.morphologyEx with cv2.MORPH_HITMISS.
+    
+    Args:
+        binary: Binary image (0 and 255)
+        kernel: Structuring element; non-zero elements must be foreground
+        iterations: Number of times the erosion by the kernel is applied
+    
+    Returns:
+        Binary image (0 and 255) of the matching positions
+    """
+    width = binary.shape[1]
+    matches = hit_or_miss(pack_mask(binary), width, kernel, iterations=iterations)
+    return to_binary_image(matches, width)
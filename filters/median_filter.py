@@ -0,0 +1,28 @@
+"""
+Median filter for image processing.
+This module provides a square median of any radius on 8-bit images, through
+OpenCV's medianBlur.
+"""
+
+import cv2
+import numpy as np
+
+def median_filter(image, radius):
+    """
+    Apply a square median filter of the given radius.
+
+    Args:
+        image: Input image (grayscale or color), converted to 8 bits
+        radius: Kernel radius; the kernel is (2 * radius + 1) pixels wide
+
+    Returns:
+        Median-filtered uint8 image (borders replicated)
+    """
+    if image.dtype != np.uint8:
+        image = np.clip(image, 0, 255).astype(np.uint8)
+
+    radius = int(radius)
+    if radius <= 0:
+        return image.copy()
+
+    return cv2.medianBlur(image, 2 * radius + 1)
@@ -11,6 +11,11 @@ from filters.hit_miss_transform import apply_hit_miss_transform
 from filters.thinning import apply_thinning
 from filters.thickening import apply_thickening
 from filters.skeletonization import apply_skeletonization
+from filters.morphology_bundle import apply_morphology_bundle
+from filters.reconstruction import (
+    apply_opening_by_reconstruction, apply_closing_by_reconstruction,
+    apply_fill_holes, apply_h_maxima
+)
 
 # Import tophat from morphological_filters
 from filters.morphological_filters import apply_tophat
@@ -27,5 +32,10 @@ __all__ = [
     'apply_hit_miss_transform',
     'apply_thinning',
     'apply_thickening',
-    'apply_skeletonization'
+    'apply_skeletonization',
+    'apply_morphology_bundle',
+    'apply_opening_by_reconstruction',
+    'apply_closing_by_reconstruction',
+    'apply_fill_holes',
+    'apply_h_maxima'
 ]
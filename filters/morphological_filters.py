@@ -7,6 +7,10 @@ import cv2
 import numpy as np
 import gc
 
+from filters.morphology_ops import (
+    structuring_element, scale_saturated, erode, dilate, morphology_ex
+)
+
 def apply_dilation(image, params=None):
     """
     Apply dilation morphological operation to an image.
@@ -31,8 +35,8 @@ def apply_dilation(image, params=None):
     if kernel_size % 2 == 0:
         kernel_size += 1
     
-    # Create structuring element
-    kernel = np.ones((kernel_size, kernel_size), np.uint8)
+    # Get the (cached) structuring element
+    kernel = structuring_element('rect', kernel_size)
     
     # Convert image to appropriate type
     if image.dtype != np.uint8:
@@ -40,19 +44,8 @@ def apply_dilation(image, params=None):
     
     # Apply dilation
     try:
-        # Process color and grayscale images appropriately
-        if len(image.shape) > 2:  # Color image
-            # Process each channel separately for better control
-            channels = cv2.split(image)
-            dilated_channels = []
-            
-            for channel in channels:
-                dilated = cv2.dilate(channel, kernel, iterations=iterations)
-                dilated_channels.append(dilated)
-            
-            result = cv2.merge(dilated_channels)
-        else:  # Grayscale image
-            result = cv2.dilate(image, kernel, iterations=iterations)
+        # Color images are processed in a single call over all channels
+        result = dilate(image, kernel, iterations=iterations)
         
         # Clean up to free memory
         gc.collect()
@@ -86,8 +79,8 @@ def apply_erosion(image, params=None):
     if kernel_size % 2 == 0:
         kernel_size += 1
     
-    # Create structuring element
-    kernel = np.ones((kernel_size, kernel_size), np.uint8)
+    # Get the (cached) structuring element
+    kernel = structuring_element('rect', kernel_size)
     
     # Convert image to appropriate type
     if image.dtype != np.uint8:
@@ -95,19 +88,8 @@ def apply_erosion(image, params=None):
     
     # Apply erosion
     try:
-        # Process color and grayscale images appropriately
-        if len(image.shape) > 2:  # Color image
-            # Process each channel separately for better control
-            channels = cv2.split(image)
-            eroded_channels = []
-            
-            for channel in channels:
-                eroded = cv2.erode(channel, kernel, iterations=iterations)
-                eroded_channels.append(eroded)
-            
-            result = cv2.merge(eroded_channels)
-        else:  # Grayscale image
-            result = cv2.erode(image, kernel, iterations=iterations)
+        # Color images are processed in a single call over all channels
+        result = erode(image, kernel, iterations=iterations)
         
         # Clean up to free memory
         gc.collect()
@@ -142,8 +124,8 @@ def apply_opening(image, params=None):
     if kernel_size % 2 == 0:
         kernel_size += 1
     
-    # Create structuring element
-    kernel = np.ones((kernel_size, kernel_size), np.uint8)
+    # Get the (cached) structuring element
+    kernel = structuring_element('rect', kernel_size)
     
     # Convert image to appropriate type
     if image.dtype != np.uint8:
@@ -151,19 +133,8 @@ def apply_opening(image, params=None):
     
     # Apply opening
     try:
-        # Process color and grayscale images appropriately
-        if len(image.shape) > 2:  # Color image
-            # Process each channel separately for better control
-            channels = cv2.split(image)
-            opened_channels = []
-            
-            for channel in channels:
-                opened = cv2.morphologyEx(channel, cv2.MORPH_OPEN, kernel, iterations=iterations)
-                opened_channels.append(opened)
-            
-            result = cv2.merge(opened_channels)
-        else:  # Grayscale image
-            result = cv2.morphologyEx(image, cv2.MORPH_OPEN, kernel, iterations=iterations)
+        # Color images are processed in a single call over all channels
+        result = morphology_ex(image, cv2.MORPH_OPEN, kernel, iterations=iterations)
         
         # Clean up to free memory
         gc.collect()
@@ -198,8 +169,8 @@ def apply_closing(image, params=None):
     if kernel_size % 2 == 0:
         kernel_size += 1
     
-    # Create structuring element
-    kernel = np.ones((kernel_size, kernel_size), np.uint8)
+    # Get the (cached) structuring element
+    kernel = structuring_element('rect', kernel_size)
     
     # Convert image to appropriate type
     if image.dtype != np.uint8:
@@ -207,19 +178,8 @@ def apply_closing(image, params=None):
     
     # Apply closing
     try:
-        # Process color and grayscale images appropriately
-        if len(image.shape) > 2:  # Color image
-            # Process each channel separately for better control
-            channels = cv2.split(image)
-            closed_channels = []
-            
-            for channel in channels:
-                closed = cv2.morphologyEx(channel, cv2.MORPH_CLOSE, kernel, iterations=iterations)
-                closed_channels.append(closed)
-            
-            result = cv2.merge(closed_channels)
-        else:  # Grayscale image
-            result = cv2.morphologyEx(image, cv2.MORPH_CLOSE, kernel, iterations=iterations)
+        # Color images are processed in a single call over all channels
+        result = morphology_ex(image, cv2.MORPH_CLOSE, kernel, iterations=iterations)
         
         # Clean up to free memory
         gc.collect()
@@ -256,8 +216,8 @@ def apply_tophat(image, params=None):
     if kernel_size % 2 == 0:
         kernel_size += 1
     
-    # Create structuring element
-    kernel = np.ones((kernel_size, kernel_size), np.uint8)
+    # Get the (cached) structuring element
+    kernel = structuring_element('rect', kernel_size)
     
     # Convert image to appropriate type
     if image.dtype != np.uint8:
@@ -265,29 +225,13 @@ def apply_tophat(image, params=None):
     
     # Apply top-hat
     try:
-        # Process color and grayscale images appropriately
-        if len(image.shape) > 2:  # Color image
-            # Process each channel separately for better control
-            channels = cv2.split(image)
-            tophat_channels = []
-            
-            for channel in channels:
-                tophat = cv2.morphologyEx(channel, cv2.MORPH_TOPHAT, kernel, iterations=iterations)
-                # Apply strength factor
-                if strength < 1.0:
-                    tophat = cv2.multiply(tophat, strength)
-                # Add top-hat to original for enhancement
-                enhanced = cv2.add(channel, tophat)
-                tophat_channels.append(enhanced)
-            
-            result = cv2.merge(tophat_channels)
-        else:  # Grayscale image
-            tophat = cv2.morphologyEx(image, cv2.MORPH_TOPHAT, kernel, iterations=iterations)
-            # Apply strength factor
-            if strength < 1.0:
-                tophat = cv2.multiply(tophat, strength)
-            # Add top-hat to original for enhancement
-            result = cv2.add(image, tophat)
+        # Color images are processed in a single call over all channels
+        tophat = morphology_ex(image, cv2.MORPH_TOPHAT, kernel, iterations=iterations)
+        # Apply strength factor
+        if strength < 1.0:
+            tophat = scale_saturated(tophat, strength)
+        # Add top-hat to original for enhancement
+        result = cv2.add(image, tophat)
         
         # Clean up to free memory
         gc.collect()
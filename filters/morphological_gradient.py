@@ -7,6 +7,8 @@ import cv2
 import numpy as np
 import gc
 
+from filters.morphology_ops import structuring_element, scale_saturated, morphology_ex
+
 def apply_morphological_gradient(image, params=None):
     """
     Apply morphological gradient operation to an image.
@@ -35,7 +37,7 @@ def apply_morphological_gradient(image, params=None):
         kernel_size += 1
     
     # Create structuring element
-    kernel = np.ones((kernel_size, kernel_size), np.uint8)
+    kernel = structuring_element('rect', kernel_size)
     
     # Convert image to appropriate type
     if image.dtype != np.uint8:
@@ -43,36 +45,15 @@ def apply_morphological_gradient(image, params=None):
     
     # Apply morphological gradient
     try:
-        # Process color and grayscale images appropriately
-        if len(image.shape) > 2:  # Color image
-            # Process each channel separately for better control
-            channels = cv2.split(image)
-            result_channels = []
-            
-            for channel in channels:
-                # Morphological gradient is dilation minus erosion
-                morph_gradient = cv2.morphologyEx(channel, cv2.MORPH_GRADIENT, kernel, iterations=iterations)
-                
-                # Apply strength parameter
-                if strength != 1.0:
-                    morph_gradient = cv2.multiply(morph_gradient, strength)
-                    morph_gradient = np.clip(morph_gradient, 0, 255).astype(np.uint8)
-                
-                # For visualization, we can blend the gradient with the original
-                # or just return the gradient itself
-                result_channels.append(morph_gradient)
-            
-            result = cv2.merge(result_channels)
-        else:  # Grayscale image
-            # Morphological gradient is dilation minus erosion
-            morph_gradient = cv2.morphologyEx(image, cv2.MORPH_GRADIENT, kernel, iterations=iterations)
-            
-            # Apply strength parameter
-            if strength != 1.0:
-                morph_gradient = cv2.multiply(morph_gradient, strength)
-                morph_gradient = np.clip(morph_gradient, 0, 255).astype(np.uint8)
-            
-            result = morph_gradient
+        # Color images are processed in a single call over all channels
+        # Morphological gradient is dilation minus erosion
+        morph_gradient = morphology_ex(image, cv2.MORPH_GRADIENT, kernel, iterations=iterations)
+        
+        # Apply strength parameter (the multiplication saturates to 0-255)
+        if strength != 1.0:
+            morph_gradient = scale_saturated(morph_gradient, strength)
+        
+        result = morph_gradient
         
         # Clean up to free memory
         gc.collect()
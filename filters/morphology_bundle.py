@@ -0,0 +1,90 @@
+"""
+Morphology bundle filter for image processing.
+This module derives several morphological filter results from a single
+erosion and dilation of the image, for side-by-side comparison.
+"""
+
+import cv2
+import numpy as np
+import gc
+
+from filters.morphology_ops import (
+    BUNDLE_OUTPUTS, structuring_element, scale_saturated, morphology_bundle
+)
+
+# Outputs returned when none are requested
+DEFAULT_BUNDLE_OUTPUTS = ('gradient', 'tophat', 'blackhat')
+
+# Size of the structuring element shared by all outputs when none is requested
+DEFAULT_BUNDLE_KERNEL_SIZE = 5
+
+def apply_morphology_bundle(image, params=None):
+    """
+    Apply several morphological filters at the cost of one erosion and one dilation.
+    All outputs share one kernel size, which is what lets them share the erosion
+    and dilation. Each output matches the corresponding single filter applied
+    with the same kernel size, iterations and strength; the single filters'
+    own default kernel sizes differ (9 for top-hat, 3 for gradient), so they
+    only match the bundle's defaults when the size is given explicitly.
+    
+    Args:
+        image: Input image
+        params: Dictionary of parameters
+            - outputs: Filters to compute (default: gradient, tophat, blackhat)
+                Options: 'erosion', 'dilation', 'opening', 'closing', 'tophat', 'blackhat', 'gradient'
+            - kernel_size: Size of the structuring element shared by all outputs (default: 5)
+            - iterations: Number of times each operation is applied (default: 1)
+            - strength: Strength of the top-hat, black top-hat and gradient effects (default: 1.0)
+    
+    Returns:
+        Dictionary mapping each requested filter to its result image (raises
+        ValueError if an output is not one of BUNDLE_OUTPUTS)
+    """
+    if params is None:
+        params = {}
+    
+    # Get parameters with defaults
+    outputs = list(params.get('outputs') or DEFAULT_BUNDLE_OUTPUTS)
+    kernel_size = params.get('kernel_size', DEFAULT_BUNDLE_KERNEL_SIZE)
+    iterations = params.get('iterations', 1)
+    strength = params.get('strength', 1.0)
+    
+    # Unknown outputs are an error rather than a copy of the input
+    unknown = [name for name in outputs if name not in BUNDLE_OUTPUTS]
+    if unknown:
+        raise ValueError(f"Unknown morphology outputs: {', '.join(map(str, unknown))}")
+    
+    # Ensure kernel size is odd
+    if kernel_size % 2 == 0:
+        kernel_size += 1
+    
+    # Get the (cached) structuring element
+    kernel = structuring_element('rect', kernel_size)
+    
+    # Convert image to appropriate type
+    if image.dtype != np.uint8:
+        image = np.clip(image, 0, 255).astype(np.uint8)
+    
+    # Apply the bundle
+    try:
+        results = morphology_bundle(image, kernel, outputs, iterations)
+        
+        # Turn the raw operations into the single filters' results
+        for name in ('tophat', 'blackhat'):
+            if name in results:
+                hat = results[name]
+                if strength < 1.0:
+                    hat = scale_saturated(hat, strength)
+                # Add the top-hat to the original for enhancement
+                results[name] = cv2.add(image, hat)
+        
+        if 'gradient' in results and strength != 1.0:
+            results['gradient'] = scale_saturated(results['gradient'], strength)
+        
+        # Clean up to free memory
+        gc.collect()
+        
+        return results
+    except Exception as e:
+        print(f"Error in morphology bundle: {str(e)}")
+        return {name: image for name in outputs}
@@ -0,0 +1,225 @@
+"""
+Shared morphology backend for image processing.
+This module provides a memoized structuring-element factory and runs erosion,
+dilation and the derived operations on all channels of an image in one call.
+Large rectangular elements use the van Herk/Gil-Werman running min/max, so
+their cost per pixel does not depend on the kernel size; everything else
+falls back to OpenCV.
+"""
+
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+from filters.running_extrema import rect_min_filter, rect_max_filter
+
+# Effective kernel side from which the separable van Herk/Gil-Werman passes beat
+# OpenCV's SIMD rectangle filters: on a 12 megapixel image the top-hats cross
+# over between 161 and 191 (gray and color), so this is just above. The
+# tophat_vhgw_crossover parity case checks it
+VHGW_MIN_KERNEL = 201
+
+# OpenCV shapes of the structuring-element factory
+_CV2_SHAPES = {
+    'rect': cv2.MORPH_RECT,
+    'cross': cv2.MORPH_CROSS,
+    'ellipse': cv2.MORPH_ELLIPSE
+}
+
+@lru_cache(maxsize=128)
+def structuring_element(shape='rect', size=3, pattern=None):
+    """
+    Build (or reuse) a structuring element.
+    Elements are cached and returned read-only, so callers must not modify them.
+
+    Args:
+        shape: 'rect', 'cross', 'ellipse' or 'line'
+        size: Side length, or a (width, height) tuple
+        pattern: Orientation of a 'line' element: 'horizontal', 'vertical',
+            'diagonal' (top-left to bottom-right) or 'antidiagonal'
+
+    Returns:
+        uint8 kernel of 0 and 1
+    """
+    width, height = (size, size) if np.isscalar(size) else size
+
+    if shape == 'line':
+        kernel = np.zeros((height, width), np.uint8)
+        if pattern == 'vertical':
+            kernel[:, width // 2] = 1
+        elif pattern == 'diagonal':
+            np.fill_diagonal(kernel, 1)
+        elif pattern == 'antidiagonal':
+            np.fill_diagonal(np.fliplr(kernel), 1)
+        else:  # Default to a horizontal line
+            kernel[height // 2, :] = 1
+    elif shape in _CV2_SHAPES:
+        kernel = cv2.getStructuringElement(_CV2_SHAPES[shape], (width, height))
+    else:
+        raise ValueError(f"Unknown structuring element shape: {shape}")
+
+    kernel.setflags(write=False)
+    return kernel
+
+def scale_saturated(image, factor):
+    """
+    Multiply every channel of an image by a factor with saturation.
+    The factor is passed as a full scalar so OpenCV scales all channels, not only the first.
+
+    Args:
+        image: Input image
+        factor: Scale factor
+
+    Returns:
+        Scaled image of the same type
+    """
+    return cv2.multiply(image, (factor, factor, factor, factor))
+
+def rect_kernel_size(kernel):
+    """
+    Size of a rectangular structuring element.
+
+    Args:
+        kernel: Structuring element
+
+    Returns:
+        (width, height) if every element is set, None otherwise
+    """
+    kernel = np.asarray(kernel)
+    if kernel.ndim != 2 or kernel.size == 0 or not np.all(kernel):
+        return None
+    return kernel.shape[1], kernel.shape[0]
+
+def _folded_rect_size(kernel, iterations):
+    """
+    Rectangle equivalent to repeating a rectangular element, when the separable
+    backend should handle it. Repeated min/max over a k-wide window is a single
+    min/max over a ((k - 1) * iterations + 1)-wide window, borders included.
+
+    Returns:
+        (width, height) of the folded rectangle, or None to use OpenCV
+    """
+    size = rect_kernel_size(kernel)
+    if size is None or iterations < 1:
+        return None
+
+    width, height = ((side - 1) * iterations + 1 for side in size)
+    if max(width, height) < VHGW_MIN_KERNEL:
+        return None
+    return width, height
+
+def erode(image, kernel, iterations=1):
+    """
+    Erode an image, with OpenCV semantics (pixels outside the image are ignored).
+
+    Args:
+        image: Input image (any number of channels)
+        kernel: Structuring element
+        iterations: Number of times the erosion is applied
+
+    Returns:
+        Eroded image
+    """
+    size = _folded_rect_size(kernel, iterations)
+    if size is None:
+        return cv2.erode(image, kernel, iterations=iterations)
+    return rect_min_filter(image, size)
+
+def dilate(image, kernel, iterations=1):
+    """
+    Dilate an image, with OpenCV semantics (pixels outside the image are ignored).
+
+    Args:
+        image: Input image (any number of channels)
+        kernel: Structuring element
+        iterations: Number of times the dilation is applied
+
+    Returns:
+        Dilated image
+    """
+    size = _folded_rect_size(kernel, iterations)
+    if size is None:
+        return cv2.dilate(image, kernel, iterations=iterations)
+    return rect_max_filter(image, size)
+
+def morphology_ex(image, op, kernel, iterations=1):
+    """
+    Drop-in replacement for cv2.morphologyEx for the erosion/dilation based operations.
+    Large rectangular elements are composed from the separable backend; any
+    other element or operation is passed to OpenCV.
+
+    Args:
+        image: Input image (any number of channels)
+        op: OpenCV operation code (cv2.MORPH_OPEN, MORPH_CLOSE, MORPH_TOPHAT,
+            MORPH_BLACKHAT, MORPH_GRADIENT, MORPH_ERODE or MORPH_DILATE)
+        kernel: Structuring element
+        iterations: Number of times each erosion/dilation is applied
+
+    Returns:
+        Result of the operation, as cv2.morphologyEx would return it
+    """
+    if _folded_rect_size(kernel, iterations) is None:
+        return cv2.morphologyEx(image, op, kernel, iterations=iterations)
+
+    if op == cv2.MORPH_ERODE:
+        return erode(image, kernel, iterations)
+    if op == cv2.MORPH_DILATE:
+        return dilate(image, kernel, iterations)
+    if op == cv2.MORPH_OPEN:
+        return dilate(erode(image, kernel, iterations), kernel, iterations)
+    if op == cv2.MORPH_CLOSE:
+        return erode(dilate(image, kernel, iterations), kernel, iterations)
+    if op == cv2.MORPH_TOPHAT:
+        return cv2.subtract(image, morphology_ex(image, cv2.MORPH_OPEN, kernel, iterations))
+    if op == cv2.MORPH_BLACKHAT:
+        return cv2.subtract(morphology_ex(image, cv2.MORPH_CLOSE, kernel, iterations), image)
+    if op == cv2.MORPH_GRADIENT:
+        return cv2.subtract(dilate(image, kernel, iterations), erode(image, kernel, iterations))
+
+    return cv2.morphologyEx(image, op, kernel, iterations=iterations)
+
+# Outputs a morphology bundle can derive from one erosion and one dilation
+BUNDLE_OUTPUTS = ('erosion', 'dilation', 'opening', 'closing', 'tophat', 'blackhat', 'gradient')
+
+def morphology_bundle(image, kernel, outputs, iterations=1):
+    """
+    Compute several morphological operations that share one erosion and one dilation.
+    Opening and closing add one more dilation/erosion each; top-hat, black top-hat
+    and gradient are differences of images that are already computed.
+
+    Args:
+        image: Input image (any number of channels)
+        kernel: Structuring element
+        outputs: Names of the requested operations, from BUNDLE_OUTPUTS
+        iterations: Number of times each erosion/dilation is applied
+
+    Returns:
+        Dictionary mapping each requested name to its result
+    """
+    unknown = [name for name in outputs if name not in BUNDLE_OUTPUTS]
+    if unknown:
+        raise ValueError(f"Unknown morphology outputs: {', '.join(unknown)}")
+
+    requested = set(outputs)
+    needs_opening = bool(requested & {'opening', 'tophat'})
+    needs_closing = bool(requested & {'closing', 'blackhat'})
+    needs_erosion = needs_opening or bool(requested & {'erosion', 'gradient'})
+    needs_dilation = needs_closing or bool(requested & {'dilation', 'gradient'})
+
+    eroded = erode(image, kernel, iterations) if needs_erosion else None
+    dilated = dilate(image, kernel, iterations) if needs_dilation else None
+    opened = dilate(eroded, kernel, iterations) if needs_opening else None
+    closed = erode(dilated, kernel, iterations) if needs_closing else None
+
+    derived = {
+        'erosion': lambda: eroded,
+        'dilation': lambda: dilated,
+        'opening': lambda: opened,
+        'closing': lambda: closed,
+        'tophat': lambda: cv2.subtract(image, opened),
+        'blackhat': lambda: cv2.subtract(closed, image),
+        'gradient': lambda: cv2.subtract(dilated, eroded)
+    }
+
+    return {name: derived[name]() for name in outputs}
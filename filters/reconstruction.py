@@ -0,0 +1,332 @@
+"""
+Morphological reconstruction filters for image processing.
+This module provides grayscale reconstruction by dilation and by erosion, and
+the filters built on it: opening and closing by reconstruction, hole filling
+and the h-maxima transform.
+
+Reconstruction uses a hybrid algorithm. A few whole-image geodesic dilations
+settle short propagation, vectorized raster and anti-raster sweeps in both
+directions carry values along long monotone paths, and the few pixels that
+can still change are finished with a FIFO queue, so each pixel is only
+touched a bounded number of times.
+"""
+
+from collections import deque
+
+import cv2
+import numpy as np
+import gc
+
+from filters.morphology_ops import structuring_element, erode, dilate
+
+# Whole-image geodesic dilations continue while each one shrinks the set of
+# unstable pixels to less than this fraction; otherwise a round of sweeps follows
+FRONT_SHRINK = 0.7
+
+# Number of still-unstable pixels below which propagation switches from sweeps to the FIFO queue
+QUEUE_MAX_PIXELS = 500
+
+def apply_opening_by_reconstruction(image, params=None):
+    """
+    Apply opening by reconstruction to an image.
+    The image is eroded, then the erosion is dilated back under the original.
+    Bright details smaller than the structuring element disappear, and every
+    structure that survives the erosion recovers its exact shape.
+    
+    Args:
+        image: Input image
+        params: Dictionary of parameters
+            - kernel_size: Size of the structuring element (default: 5)
+            - iterations: Number of times the erosion is applied (default: 1)
+    
+    Returns:
+        Opened image
+    """
+    if params is None:
+        params = {}
+    
+    # Get parameters with defaults
+    kernel_size = params.get('kernel_size', 5)
+    iterations = params.get('iterations', 1)
+    
+    # Ensure kernel size is odd
+    if kernel_size % 2 == 0:
+        kernel_size += 1
+    
+    # Get the (cached) structuring element
+    kernel = structuring_element('rect', kernel_size)
+    
+    # Convert image to appropriate type
+    if image.dtype != np.uint8:
+        image = np.clip(image, 0, 255).astype(np.uint8)
+    
+    # Apply opening by reconstruction
+    try:
+        marker = erode(image, kernel, iterations)
+        result = reconstruct_by_dilation(marker, image)
+        
+        # Clean up to free memory
+        gc.collect()
+        
+        return result
+    except Exception as e:
+        print(f"Error in opening by reconstruction: {str(e)}")
+        return image
+
+def apply_closing_by_reconstruction(image, params=None):
+    """
+    Apply closing by reconstruction to an image.
+    The image is dilated, then the dilation is eroded back above the original.
+    Dark details smaller than the structuring element are filled, and every
+    other dark structure keeps its exact shape.
+    
+    Args:
+        image: Input image
+        params: Dictionary of parameters
+            - kernel_size: Size of the structuring element (default: 5)
+            - iterations: Number of times the dilation is applied (default: 1)
+    
+    Returns:
+        Closed image
+    """
+    if params is None:
+        params = {}
+    
+    # Get parameters with defaults
+    kernel_size = params.get('kernel_size', 5)
+    iterations = params.get('iterations', 1)
+    
+    # Ensure kernel size is odd
+    if kernel_size % 2 == 0:
+        kernel_size += 1
+    
+    # Get the (cached) structuring element
+    kernel = structuring_element('rect', kernel_size)
+    
+    # Convert image to appropriate type
+    if image.dtype != np.uint8:
+        image = np.clip(image, 0, 255).astype(np.uint8)
+    
+    # Apply closing by reconstruction
+    try:
+        marker = dilate(image, kernel, iterations)
+        result = reconstruct_by_erosion(marker, image)
+        
+        # Clean up to free memory
+        gc.collect()
+        
+        return result
+    except Exception as e:
+        print(f"Error in closing by reconstruction: {str(e)}")
+        return image
+
+def apply_fill_holes(image, params=None):
+    """
+    Fill the holes of an image.
+    A hole is a dark region that cannot be reached from the image border; it is
+    raised to the lowest level surrounding it. On binary images this fills
+    every enclosed background region.
+    
+    Args:
+        image: Input image
+        params: Dictionary of parameters (none used)
+    
+    Returns:
+        Image with filled holes
+    """
+    if params is None:
+        params = {}
+    
+    # Convert image to appropriate type
+    if image.dtype != np.uint8:
+        image = np.clip(image, 0, 255).astype(np.uint8)
+    
+    # Apply hole filling
+    try:
+        # Start from the border values with everything inside at the maximum,
+        # and erode the marker back above the image
+        marker = np.full_like(image, 255)
+        marker[0] = image[0]
+        marker[-1] = image[-1]
+        marker[:, 0] = image[:, 0]
+        marker[:, -1] = image[:, -1]
+        
+        result = reconstruct_by_erosion(marker, image)
+        
+        # Clean up to free memory
+        gc.collect()
+        
+        return result
+    except Exception as e:
+        print(f"Error in fill holes: {str(e)}")
+        return image
+
+def apply_h_maxima(image, params=None):
+    """
+    Apply the h-maxima transform to an image.
+    Suppresses every regional maximum whose height above its surroundings is
+    at most h, and lowers the remaining ones by h.
+    
+    Args:
+        image: Input image
+        params: Dictionary of parameters
+            - h: Minimum height of the maxima to keep (0-255, default: 20)
+    
+    Returns:
+        Transformed image
+    """
+    if params is None:
+        params = {}
+    
+    # Get parameters with defaults
+    h = int(params.get('h', 20))
+    
+    # Convert image to appropriate type
+    if image.dtype != np.uint8:
+        image = np.clip(image, 0, 255).astype(np.uint8)
+    
+    # Apply h-maxima transform
+    try:
+        marker = cv2.subtract(image, np.full_like(image, np.clip(h, 0, 255)))
+        result = reconstruct_by_dilation(marker, image)
+        
+        # Clean up to free memory
+        gc.collect()
+        
+        return result
+    except Exception as e:
+        print(f"Error in h-maxima: {str(e)}")
+        return image
+
+def reconstruct_by_dilation(marker, mask):
+    """
+    Grayscale morphological reconstruction by dilation (8-connected).
+    Dilates the marker under the mask until stability.
+    
+    Args:
+        marker: uint8 marker image (clipped to the mask)
+        mask: uint8 mask image of the same shape
+    
+    Returns:
+        Reconstructed image
+    """
+    if marker.shape != mask.shape:
+        raise ValueError(f"Shape mismatch: marker {marker.shape}, mask {mask.shape}")
+    
+    # Color images are processed in a single pass over all channels
+    values = np.minimum(marker, mask)
+    mask = np.ascontiguousarray(mask)
+    mask_transposed = cv2.transpose(mask)
+    kernel = structuring_element('rect', 3)
+    
+    previous = None
+    while True:
+        # Short propagation: whole-image geodesic dilation
+        grown = cv2.min(cv2.dilate(values, kernel), mask)
+        
+        # Pixels that the geodesic dilation raises
+        unstable = cv2.compare(grown, values, cv2.CMP_GT)
+        remaining = cv2.countNonZero(unstable.reshape(unstable.shape[0], -1))
+        
+        if remaining == 0:
+            return values
+        if remaining <= QUEUE_MAX_PIXELS:
+            # Finish from the neighbours of the unstable pixels, which can raise them
+            sources = np.flatnonzero(cv2.dilate(unstable, kernel))
+            return _propagate_queue(values, mask, sources)
+        
+        values = grown
+        
+        # Keep dilating while the unstable front shrinks quickly; a front that
+        # persists is travelling along long paths, which sweeps cover at once
+        if previous is None or remaining < previous * FRONT_SHRINK:
+            previous = remaining
+            continue
+        previous = None
+        
+        # Long propagation: raster and anti-raster sweeps, over rows and then over columns
+        _sweep(values, mask)
+        _sweep(values, mask, reverse=True)
+        values = cv2.transpose(values)
+        _sweep(values, mask_transposed)
+        _sweep(values, mask_transposed, reverse=True)
+        values = cv2.transpose(values)
+
+def reconstruct_by_erosion(marker, mask):
+    """
+    Grayscale morphological reconstruction by erosion (8-connected).
+    Erodes the marker above the mask until stability; the dual of reconstruct_by_dilation.
+    
+    Args:
+        marker: uint8 marker image (clipped to the mask)
+        mask: uint8 mask image of the same shape
+    
+    Returns:
+        Reconstructed image
+    """
+    inverted = reconstruct_by_dilation(cv2.bitwise_not(marker), cv2.bitwise_not(mask))
+    return cv2.bitwise_not(inverted)
+
+def _sweep(values, mask, reverse=False):
+    """
+    One raster (top to bottom) or anti-raster pass of geodesic dilation, in place.
+    Each row takes the maximum of the three pixels above it (below it when
+    reversed), so values travel any distance along monotone paths in one pass.
+    Works on any number of channels.
+    """
+    rows = values.shape[0]
+    if rows < 2:
+        return
+    
+    previous_offset = 1 if reverse else -1
+    neighbourhood = np.empty_like(values[0])
+    
+    for y in (range(rows - 2, -1, -1) if reverse else range(1, rows)):
+        previous = values[y + previous_offset]
+        
+        # Maximum over the 3 neighbours in the previous row
+        neighbourhood[:] = previous
+        np.maximum(neighbourhood[1:], previous[:-1], out=neighbourhood[1:])
+        np.maximum(neighbourhood[:-1], previous[1:], out=neighbourhood[:-1])
+        
+        row = values[y]
+        np.maximum(row, neighbourhood, out=row)
+        np.minimum(row, mask[y], out=row)
+
+def _propagate_queue(values, mask, sources):
+    """
+    Finish a reconstruction by dilation with a FIFO queue (Vincent's algorithm):
+    each dequeued pixel raises its lower neighbours up to the mask and enqueues them.
+    
+    Args:
+        values: Partially reconstructed uint8 image
+        mask: uint8 mask image
+        sources: Flat indices (into the values array) of the pixels to start from
+    
+    Returns:
+        Reconstructed image
+    """
+    rows, cols = values.shape[:2]
+    channels = values.size // (rows * cols)
+    current = bytearray(values.tobytes())
+    limit = mask.tobytes()
+    queue = deque(sources.tolist())
+    
+    while queue:
+        p = queue.popleft()
+        value = current[p]
+        pixel, channel = divmod(p, channels)
+        y, x = divmod(pixel, cols)
+        
+        for ny in (y - 1, y, y + 1):
+            if ny < 0 or ny >= rows:
+                continue
+            for nx in (x - 1, x, x + 1):
+                if nx < 0 or nx >= cols:
+                    continue
+                q = (ny * cols + nx) * channels + channel
+                if current[q] < value and current[q] != limit[q]:
+                    current[q] = min(value, limit[q])
+                    queue.append(q)
+    
+    return np.frombuffer(current, dtype=np.uint8).reshape(values.shape).copy()
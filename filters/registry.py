@@ -0,0 +1,467 @@
+"""
+Filter registry for image processing.
+This module declares every filter the task processor can run: its task group,
+the parameters it reads from a request (and from a filter chain), its class
+(pointwise / local / global / binary), the halo of neighbouring pixels each
+output pixel depends on, how it can be fused with its neighbours in a chain,
+and a cost model measured in pixels per second. Dispatch, parameter extraction
+and chain planning are driven by these declarations instead of per-filter
+branches, and the same metadata is available to schedulers that tile or
+order work.
+"""
+
+import math
+
+from filters.enhancement import (
+    apply_brightness_contrast, apply_exposure, apply_vibrance,
+    apply_clarity, apply_shadows_highlights, apply_hdr_effect, apply_retinex,
+    apply_dehaze, apply_exposure_fusion, apply_histogram_matching
+)
+from filters.morphological import (
+    apply_dilation, apply_erosion, apply_opening, apply_closing,
+    apply_tophat, apply_black_tophat, apply_morphological_gradient,
+    apply_hit_miss_transform, apply_thinning, apply_thickening,
+    apply_skeletonization, apply_opening_by_reconstruction,
+    apply_closing_by_reconstruction, apply_fill_holes, apply_h_maxima
+)
+
+# Task groups
+ENHANCEMENT = 'enhancement'
+MORPHOLOGICAL = 'morphological'
+
+# Filter classes
+POINTWISE = 'pointwise'  # Each output pixel depends only on the same input pixel
+LOCAL = 'local'          # Each output pixel depends on the input pixels within the halo
+GLOBAL = 'global'        # Output also depends on image-wide statistics or propagation
+BINARY = 'binary'        # Works on the thresholded image, within the halo
+
+# Fusion kinds
+TONE_CURVE = 'tone_curve'  # Compiles into a 256-entry table (filters/tone_curves.py)
+COLOR_LUT = 'color_lut'    # Compiles into a 3D color LUT (filters/color_lut.py)
+
+# Marks a parameter that is only passed when the request sets it
+OPTIONAL = object()
+
+_SAME = object()
+
+class FilterParam:
+    """A parameter of a filter, and where it is read from in a request and in a chain"""
+
+    def __init__(self, name, default=OPTIONAL, key=None, chain_key=_SAME, chain_default=_SAME):
+        """
+        Declare a filter parameter.
+
+        Args:
+            name: Name of the parameter passed to the filter function
+            default: Value used when the request does not set it, or OPTIONAL
+                to leave it out (the filter then uses its own default)
+            key: Request key the value is read from (default: name)
+            chain_key: Key the value is read from in a filter_types chain,
+                where several filters share one set of parameters (default:
+                key), or None if the parameter is not passed in chains
+            chain_default: Value used in chains when the key is not set (default: default)
+        """
+        self.name = name
+        self.default = default
+        self.key = key or name
+        self.chain_key = self.key if chain_key is _SAME else chain_key
+        self.chain_default = default if chain_default is _SAME else chain_default
+
+class FilterSpec:
+    """A registered filter with its parameter schema, class, halo, fusion and cost metadata"""
+
+    def __init__(self, name, function, group, filter_class, params=(), halo=0,
+                 fusion=None, pixels_per_second=None, chainable=False,
+                 large_image_params=None, reference_key=None, statistics=()):
+        """
+        Declare a filter.
+
+        Args:
+            name: Filter type used in requests
+            function: Filter function, called as function(image, params)
+            group: ENHANCEMENT or MORPHOLOGICAL
+            filter_class: POINTWISE, LOCAL, GLOBAL or BINARY
+            params: FilterParam declarations
+            halo: Radius in pixels of the neighbourhood each output pixel
+                depends on, a function of the filter parameters returning it,
+                or None if it is unbounded (as for filters that read
+                image-wide statistics, which no overlap makes tileable)
+            fusion: TONE_CURVE or COLOR_LUT if consecutive filters of the
+                kind can run as one lookup, None otherwise
+            pixels_per_second: Measured throughput at the default parameters
+            chainable: Whether the filter can appear in a filter_types chain
+            large_image_params: Parameters set on large images when the request
+                does not set them, trading a little quality for speed
+            reference_key: Request key naming an uploaded image the filter
+                receives as its 'reference' parameter, if any
+            statistics: Keys the filter writes into its parameters while it
+                runs (match counts, iterations used, ...), reported with the
+                task result
+        """
+        self.name = name
+        self.function = function
+        self.group = group
+        self.filter_class = filter_class
+        self.params = tuple(params)
+        self.halo = halo
+        self.fusion = fusion
+        self.pixels_per_second = pixels_per_second
+        self.chainable = chainable
+        self.large_image_params = large_image_params or {}
+        self.reference_key = reference_key
+        self.statistics = tuple(statistics)
+
+    def request_params(self, data):
+        """Parameters of the filter from request data."""
+        params = {}
+        for param in self.params:
+            if param.key in data:
+                params[param.name] = data[param.key]
+            elif param.default is not OPTIONAL:
+                params[param.name] = param.default
+        return params
+
+    def chain_params(self, data):
+        """Parameters of the filter in a filter_types chain, from the shared chain parameters."""
+        params = {}
+        for param in self.params:
+            if param.chain_key is None:
+                continue
+            if param.chain_key in data:
+                params[param.name] = data[param.chain_key]
+            elif param.chain_default is not OPTIONAL:
+                params[param.name] = param.chain_default
+        return params
+
+    def run_statistics(self, params):
+        """Statistics the filter recorded in its parameters during a run, or None."""
+        statistics = {key: params[key] for key in self.statistics if key in params}
+        return statistics or None
+
+    def halo_radius(self, params=None):
+        """Halo in pixels for the given filter parameters, or None if unbounded."""
+        if callable(self.halo):
+            return self.halo(params or {})
+        return self.halo
+
+    def estimate_seconds(self, pixel_count):
+        """Estimated running time on an image of pixel_count pixels."""
+        if not self.pixels_per_second:
+            return 0.0
+        return pixel_count / float(self.pixels_per_second)
+
+    def __call__(self, image, params=None):
+        return self.function(image, params)
+
+def _gaussian_halo(sigma):
+    return int(math.ceil(3 * sigma))
+
+def _clarity_halo(params):
+    radius = params.get('radius')
+    if radius:
+        # Stacked box blur, or two box passes of the guided filter
+        if params.get('edge_aware', False):
+            return 2 * max(1, int(round(radius)))
+        return _gaussian_halo(radius)
+    return int(10 * params.get('clarity', 50) / 100.0)
+
+def _pyramid_halo(params):
+    # Each pyramid level doubles the reach of the 5-tap reduce and expand kernels
+    return 4 << max(1, int(params.get('pyramid_levels', 6)))
+
+def _kernel_halo(passes):
+    def halo(params):
+        return passes * (int(params.get('kernel_size', 3)) // 2) * int(params.get('iterations', 1))
+    return halo
+
+def _thickening_halo(params):
+    # Each of the eight elements of a pass can add one pixel; at convergence
+    # objects reach their convex hull, whose extent depends on the objects
+    if params.get('converge', False):
+        return None
+    return 8 * int(params.get('iterations', 3))
+
+# Parameters shared by the kernel-based morphological filters, with the
+# defaults of the morphological route
+_KERNEL_PARAMS = (FilterParam('kernel_size', 3), FilterParam('iterations', 1))
+_STRENGTH_PARAM = FilterParam('strength', 1.0)
+_BINARY_PARAMS = (FilterParam('threshold', 128), FilterParam('preserve_original', False))
+_KERNEL_LARGE_IMAGE_PARAMS = {'kernel_size': 3, 'iterations': 1}
+
+# Throughputs were measured at the default parameters on a 1600x1200 color image
+FILTERS = {spec.name: spec for spec in [
+    # Enhancement filters
+    FilterSpec(
+        'brightness_contrast', apply_brightness_contrast, ENHANCEMENT, POINTWISE,
+        params=[FilterParam('brightness', 0.0), FilterParam('contrast', 1.0)],
+        fusion=TONE_CURVE, pixels_per_second=125e6, chainable=True
+    ),
+    FilterSpec(
+        'exposure', apply_exposure, ENHANCEMENT, POINTWISE,
+        params=[FilterParam('exposure', 0.0), FilterParam('highlights', 0.0), FilterParam('shadows', 0.0)],
+        fusion=TONE_CURVE, pixels_per_second=140e6, chainable=True
+    ),
+    FilterSpec(
+        'vibrance', apply_vibrance, ENHANCEMENT, POINTWISE,
+        params=[FilterParam('vibrance', 0.0, chain_default=0.5), FilterParam('saturation', 0.0)],
+        fusion=COLOR_LUT, pixels_per_second=70e6, chainable=True
+    ),
+    FilterSpec(
+        'clarity', apply_clarity, ENHANCEMENT, LOCAL,
+        params=[
+            FilterParam('clarity', 0.0, chain_default=0.5),
+            FilterParam('edge_kernel', 3),
+            FilterParam('edge_scale', 1.0),
+            FilterParam('apply_clahe', True, chain_key=None),
+            FilterParam('clahe_clip', 2.0, chain_key=None),
+            FilterParam('clahe_grid', 8, chain_key=None),
+            FilterParam('radius', chain_key='clarity_radius', chain_default=None),
+            FilterParam('edge_aware', chain_key='clarity_edge_aware', chain_default=False),
+            FilterParam('edge_eps', chain_key=None),
+            FilterParam('luminance_only', chain_key=None)
+        ],
+        halo=_clarity_halo, pixels_per_second=75e6, chainable=True,
+        large_image_params={'edge_kernel': 3}
+    ),
+    FilterSpec(
+        'shadows_highlights', apply_shadows_highlights, ENHANCEMENT, POINTWISE,
+        params=[
+            FilterParam('shadows', key='shadows_recovery'),
+            FilterParam('highlights', key='highlights_recovery'),
+            FilterParam('mid_tone_contrast', 0.0),
+            FilterParam('fast_mode', False, chain_key=None)
+        ],
+        fusion=TONE_CURVE, pixels_per_second=43e6, chainable=True
+    ),
+    FilterSpec(
+        'hdr', apply_hdr_effect, ENHANCEMENT, GLOBAL,
+        params=[FilterParam('strength', 50, key='hdr_strength'), FilterParam('radius', 20, key='hdr_radius')],
+        halo=None, pixels_per_second=28e6, chainable=True
+    ),
+    FilterSpec(
+        'retinex', apply_retinex, ENHANCEMENT, GLOBAL,
+        params=[
+            FilterParam('strength', 100, chain_key='retinex_strength'),
+            FilterParam('luminance_only', True),
+            FilterParam('sigmas', [15, 80, 250], chain_key='retinex_sigmas', chain_default=(15, 80, 250))
+        ],
+        halo=None, pixels_per_second=15e6, chainable=True
+    ),
+    FilterSpec(
+        'dehaze', apply_dehaze, ENHANCEMENT, GLOBAL,
+        params=[
+            FilterParam('strength', 95, chain_key='dehaze_strength'),
+            FilterParam('patch_size', 15),
+            FilterParam('low_res_transmission', True)
+        ],
+        halo=None, pixels_per_second=16e6, chainable=True
+    ),
+    FilterSpec(
+        'exposure_fusion', apply_exposure_fusion, ENHANCEMENT, LOCAL,
+        params=[
+            FilterParam('num_exposures', 3),
+            FilterParam('exposure_range', 60),
+            FilterParam('pyramid_levels', chain_default=6)
+        ],
+        halo=_pyramid_halo, pixels_per_second=6e6, chainable=True,
+        large_image_params={'pyramid_levels': 4}
+    ),
+    FilterSpec(
+        'histogram_match', apply_histogram_matching, ENHANCEMENT, GLOBAL,
+        params=[
+            FilterParam('reference_filename', ''),
+            FilterParam('mode', 'luminance', key='match_mode'),
+            FilterParam('strength', 100)
+        ],
+        halo=None, pixels_per_second=30e6, reference_key='reference_filename'
+    ),
+
+    # Morphological filters
+    FilterSpec(
+        'dilation', apply_dilation, MORPHOLOGICAL, LOCAL, params=_KERNEL_PARAMS,
+        halo=_kernel_halo(1), pixels_per_second=120e6, large_image_params=_KERNEL_LARGE_IMAGE_PARAMS
+    ),
+    FilterSpec(
+        'erosion', apply_erosion, MORPHOLOGICAL, LOCAL, params=_KERNEL_PARAMS,
+        halo=_kernel_halo(1), pixels_per_second=120e6, large_image_params=_KERNEL_LARGE_IMAGE_PARAMS
+    ),
+    FilterSpec(
+        'opening', apply_opening, MORPHOLOGICAL, LOCAL, params=_KERNEL_PARAMS,
+        halo=_kernel_halo(2), pixels_per_second=90e6, large_image_params=_KERNEL_LARGE_IMAGE_PARAMS
+    ),
+    FilterSpec(
+        'closing', apply_closing, MORPHOLOGICAL, LOCAL, params=_KERNEL_PARAMS,
+        halo=_kernel_halo(2), pixels_per_second=100e6, large_image_params=_KERNEL_LARGE_IMAGE_PARAMS
+    ),
+    FilterSpec(
+        'tophat', apply_tophat, MORPHOLOGICAL, LOCAL, params=_KERNEL_PARAMS + (_STRENGTH_PARAM,),
+        halo=_kernel_halo(2), pixels_per_second=95e6, large_image_params=_KERNEL_LARGE_IMAGE_PARAMS
+    ),
+    FilterSpec(
+        'blackhat', apply_black_tophat, MORPHOLOGICAL, LOCAL, params=_KERNEL_PARAMS + (_STRENGTH_PARAM,),
+        halo=_kernel_halo(2), pixels_per_second=95e6, large_image_params=_KERNEL_LARGE_IMAGE_PARAMS
+    ),
+    FilterSpec(
+        'gradient', apply_morphological_gradient, MORPHOLOGICAL, LOCAL, params=_KERNEL_PARAMS + (_STRENGTH_PARAM,),
+        halo=_kernel_halo(1), pixels_per_second=95e6, large_image_params=_KERNEL_LARGE_IMAGE_PARAMS
+    ),
+    FilterSpec(
+        'hitmiss', apply_hit_miss_transform, MORPHOLOGICAL, BINARY,
+        params=_KERNEL_PARAMS + (
+            FilterParam('pattern', 'cross'), FilterParam('patterns', None), FilterParam('rotations', False)
+        ),
+        halo=_kernel_halo(1), pixels_per_second=48e6, large_image_params=_KERNEL_LARGE_IMAGE_PARAMS,
+        statistics=('pattern_counts',)
+    ),
+    FilterSpec(
+        'thinning', apply_thinning, MORPHOLOGICAL, BINARY, params=_BINARY_PARAMS,
+        halo=None, pixels_per_second=11e6
+    ),
+    FilterSpec(
+        'thickening', apply_thickening, MORPHOLOGICAL, BINARY,
+        params=(FilterParam('iterations', 1), FilterParam('converge', False)) + _BINARY_PARAMS,
+        halo=_thickening_halo, pixels_per_second=60e6, statistics=('iterations_used',)
+    ),
+    FilterSpec(
+        'skeleton', apply_skeletonization, MORPHOLOGICAL, BINARY,
+        params=(FilterParam('method', 'distance'), FilterParam('max_iterations', 10)) + _BINARY_PARAMS,
+        halo=None, pixels_per_second=48e6
+    ),
+    FilterSpec(
+        'opening_reconstruction', apply_opening_by_reconstruction, MORPHOLOGICAL, GLOBAL, params=_KERNEL_PARAMS,
+        halo=None, pixels_per_second=14e6, large_image_params=_KERNEL_LARGE_IMAGE_PARAMS
+    ),
+    FilterSpec(
+        'closing_reconstruction', apply_closing_by_reconstruction, MORPHOLOGICAL, GLOBAL, params=_KERNEL_PARAMS,
+        halo=None, pixels_per_second=15e6, large_image_params=_KERNEL_LARGE_IMAGE_PARAMS
+    ),
+    FilterSpec(
+        'fill_holes', apply_fill_holes, MORPHOLOGICAL, GLOBAL,
+        halo=None, pixels_per_second=7e6
+    ),
+    FilterSpec(
+        'hmaxima', apply_h_maxima, MORPHOLOGICAL, GLOBAL, params=[FilterParam('h', 20)],
+        halo=None, pixels_per_second=15e6
+    )
+]}
+
+def get_filter(filter_type, group=None):
+    """
+    Look up a registered filter.
+
+    Args:
+        filter_type: Filter type used in requests
+        group: Task group the filter must belong to (default: any)
+
+    Returns:
+        FilterSpec of the filter, or None if no such filter is registered
+    """
+    spec = FILTERS.get(filter_type)
+    if spec is None or (group is not None and spec.group != group):
+        return None
+    return spec
+
+def chain_filter_params(filter_type, params):
+    """
+    Build the parameters of one filter of a filter_types chain from the request parameters.
+
+    Args:
+        filter_type: Name of the filter in the chain
+        params: Request parameters
+
+    Returns:
+        Dictionary of parameters for the filter
+    """
+    spec = FILTERS.get(filter_type)
+    if spec is None or not spec.chainable:
+        return {}
+    return spec.chain_params(params)
+
+def fusion_kind(filter_type):
+    """TONE_CURVE or COLOR_LUT if a filter type can be fused with its neighbours, None otherwise."""
+    spec = FILTERS.get(filter_type)
+    return spec.fusion if spec is not None else None
+
+def plan_chain(filter_types, params, color_lut=False):
+    """
+    Split a filter_types chain into stages. Runs of consecutive tone-curve
+    filters become one 'tone_curve' stage; with color_lut, runs that also
+    contain color-LUT filters become one 'color_lut' stage (tone curves are
+    exact, so runs of tone curves alone keep using them). Every other chainable
+    filter is a 'filter' stage of its own, and unknown filter types are skipped.
+
+    Args:
+        filter_types: Filter types, in order
+        params: Request parameters shared by the chain
+        color_lut: Whether color-LUT fusion is allowed
+
+    Returns:
+        List of (stage kind, [(filter_type, params), ...]) pairs
+    """
+    fusable = (TONE_CURVE, COLOR_LUT) if color_lut else (TONE_CURVE,)
+
+    stages = []
+    for filter_type in filter_types:
+        spec = FILTERS.get(filter_type)
+        if spec is None or not spec.chainable:
+            continue
+
+        step = (filter_type, spec.chain_params(params))
+        if spec.fusion not in fusable:
+            stages.append(('filter', [step]))
+            continue
+
+        kind = TONE_CURVE if spec.fusion == TONE_CURVE else COLOR_LUT
+        if stages and stages[-1][0] in (TONE_CURVE, COLOR_LUT):
+            # Extend the current run; one color-LUT filter makes the whole run a color LUT
+            previous_kind, steps = stages[-1]
+            steps.append(step)
+            if previous_kind == COLOR_LUT:
+                kind = COLOR_LUT
+            stages[-1] = (kind, steps)
+        else:
+            stages.append((kind, [step]))
+
+    return stages
+
+def chain_halo(filter_types, params):
+    """
+    Halo of a whole filter_types chain: the sum of the halos of its filters,
+    which is how many rows a band must share with its neighbours for a tiled
+    run of the chain to match an untiled one.
+
+    Args:
+        filter_types: Filter types, in order
+        params: Request parameters shared by the chain
+
+    Returns:
+        Halo in pixels, or None if any filter in the chain has an unbounded halo
+    """
+    total = 0
+    for filter_type in filter_types:
+        spec = FILTERS.get(filter_type)
+        if spec is None or not spec.chainable:
+            continue
+        halo = spec.halo_radius(spec.chain_params(params))
+        if halo is None:
+            return None
+        total += halo
+    return total
+
+def estimate_chain_seconds(filter_types, pixel_count):
+    """
+    Estimated running time of a sequence of filters from their cost models.
+    Fused runs cost at most the sum of their filters, so this is an upper bound
+    for chains with fusable runs.
+
+    Args:
+        filter_types: Filter types, in order
+        pixel_count: Number of pixels of the image
+
+    Returns:
+        Estimated time in seconds
+    """
+    return sum(
+        FILTERS[filter_type].estimate_seconds(pixel_count)
+        for filter_type in filter_types if filter_type in FILTERS
+    )
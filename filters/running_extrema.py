@@ -0,0 +1,139 @@
+"""
+Running minimum and maximum filters for image processing.
+This module provides van Herk/Gil-Werman implementations whose cost per pixel
+is independent of the window size.
+"""
+
+import cv2
+import numpy as np
+
+# Element types cv2.transpose accepts, for up to four channels
+_TRANSPOSABLE_TYPES = (np.uint8, np.int8, np.uint16, np.int16, np.int32, np.float32, np.float64)
+
+def _border_value(dtype, for_min):
+    """Value that never wins a min (or max) comparison for the given dtype."""
+    if np.issubdtype(dtype, np.integer):
+        info = np.iinfo(dtype)
+        return info.max if for_min else info.min
+    return np.inf if for_min else -np.inf
+
+def _cv2_transposable(image):
+    """Whether cv2.transpose can swap the two spatial axes of an image."""
+    channels_ok = image.ndim == 2 or (image.ndim == 3 and image.shape[2] <= 4)
+    return channels_ok and image.dtype.type in _TRANSPOSABLE_TYPES
+
+def _running_extremum(image, size, axis, for_min):
+    """
+    Centered running min/max along one axis using the van Herk/Gil-Werman scheme.
+    The signal is cut into blocks of the window size; a prefix and a suffix
+    extremum inside each block give any window as the combination of two values.
+    """
+    if size <= 1:
+        return image.copy()
+
+    op = np.minimum if for_min else np.maximum
+    radius = size // 2
+
+    # Work along the first axis on a contiguous copy so every step is a row-wide operation;
+    # OpenCV transposes images with interleaved channels much faster than NumPy
+    use_cv2 = axis == 1 and _cv2_transposable(image)
+    if axis == 0:
+        moved = image
+    elif use_cv2:
+        moved = cv2.transpose(image)
+    else:
+        moved = np.ascontiguousarray(np.swapaxes(image, 0, axis))
+    length = moved.shape[0]
+
+    # Pad so the centered windows are complete and the signal splits into whole blocks
+    padded_length = length + 2 * radius
+    extra = -padded_length % size
+    pad_width = [(radius, radius + extra)] + [(0, 0)] * (moved.ndim - 1)
+    padded = np.pad(moved, pad_width, mode='constant',
+                    constant_values=_border_value(image.dtype, for_min))
+
+    shaped = padded.reshape((-1, size) + padded.shape[1:])
+    prefix = np.empty_like(shaped)
+    suffix = np.empty_like(shaped)
+
+    # Prefix extremum from the start of each block, suffix extremum to its end
+    prefix[:, 0] = shaped[:, 0]
+    for j in range(1, size):
+        op(prefix[:, j - 1], shaped[:, j], out=prefix[:, j])
+
+    suffix[:, size - 1] = shaped[:, size - 1]
+    for j in range(size - 2, -1, -1):
+        op(suffix[:, j + 1], shaped[:, j], out=suffix[:, j])
+
+    prefix = prefix.reshape(padded.shape)
+    suffix = suffix.reshape(padded.shape)
+
+    # The window starting at i ends at i + size - 1, which lies in the same or the next block
+    result = op(suffix[:length], prefix[size - 1:size - 1 + length])
+
+    if use_cv2:
+        result = cv2.transpose(np.ascontiguousarray(result))
+    elif axis != 0:
+        result = np.ascontiguousarray(np.swapaxes(result, 0, axis))
+
+    return result
+
+def running_min(image, size, axis=0):
+    """
+    Compute a centered running minimum along one axis.
+
+    Args:
+        image: Input array
+        size: Window length (odd sizes are centered exactly)
+        axis: Axis along which the window slides
+
+    Returns:
+        Array of the same shape and dtype with the windowed minimum
+    """
+    return _running_extremum(image, size, axis, for_min=True)
+
+def running_max(image, size, axis=0):
+    """
+    Compute a centered running maximum along one axis.
+
+    Args:
+        image: Input array
+        size: Window length (odd sizes are centered exactly)
+        axis: Axis along which the window slides
+
+    Returns:
+        Array of the same shape and dtype with the windowed maximum
+    """
+    return _running_extremum(image, size, axis, for_min=False)
+
+def rect_min_filter(image, ksize):
+    """
+    Minimum over a rectangular window, computed as two separable 1-D passes.
+    Pixels outside the image are ignored, matching OpenCV's default erosion border.
+
+    Args:
+        image: Input image (2-D, or 3-D with channels last)
+        ksize: Window size as an int or a (width, height) tuple
+
+    Returns:
+        Filtered image
+    """
+    width, height = (ksize, ksize) if np.isscalar(ksize) else ksize
+    result = running_min(image, height, axis=0)
+    return running_min(result, width, axis=1)
+
+def rect_max_filter(image, ksize):
+    """
+    Maximum over a rectangular window, computed as two separable 1-D passes.
+    Pixels outside the image are ignored, matching OpenCV's default dilation border.
+
+    Args:
+        image: Input image (2-D, or 3-D with channels last)
+        ksize: Window size as an int or a (width, height) tuple
+
+    Returns:
+        Filtered image
+    """
+    width, height = (ksize, ksize) if np.isscalar(ksize) else ksize
+    result = running_max(image, height, axis=0)
+    return running_max(result, width, axis=1)
@@ -7,6 +7,9 @@ import cv2
 import numpy as np
 import gc
 
+from filters.binary_engine import pack_mask, to_binary_image, skeletonize
+from filters.morphology_ops import structuring_element
+
 def apply_skeletonization(image, params=None):
     """
     Apply skeletonization morphological operation to an image.
@@ -15,6 +18,8 @@ def apply_skeletonization(image, params=None):
     Args:
         image: Input image
         params: Dictionary of parameters
+            - method: 'distance' (distance-transform ridges, default) or
+                'iterative' (successive erosions and openings, the reference)
             - max_iterations: Maximum number of iterations (default: 100)
             - threshold: Threshold for binarization (0-255, default: 127)
             - preserve_original: Whether to overlay the result on the original (default: True)
@@ -26,10 +31,17 @@ def apply_skeletonization(image, params=None):
         params = {}
     
     # Get parameters with defaults
+    method = params.get('method', 'distance')
     max_iterations = params.get('max_iterations', 100)
     threshold_value = params.get('threshold', 127)
     preserve_original = params.get('preserve_original', True)
     
+    # Select the skeleton backend
+    if method == 'iterative':
+        skeleton_function = morphological_skeleton
+    else:
+        skeleton_function = distance_skeleton
+    
     # Convert image to appropriate type
     if image.dtype != np.uint8:
         image = np.clip(image, 0, 255).astype(np.uint8)
@@ -45,7 +57,7 @@ def apply_skeletonization(image, params=None):
             _, binary = cv2.threshold(gray, threshold_value, 255, cv2.THRESH_BINARY)
             
             # Apply skeletonization
-            skeleton = morphological_skeleton(binary, max_iterations)
+            skeleton = skeleton_function(binary, max_iterations)
             
             if preserve_original:
                 # For better visualization, overlay the skeleton on the original
@@ -62,7 +74,7 @@ def apply_skeletonization(image, params=None):
             _, binary = cv2.threshold(image, threshold_value, 255, cv2.THRESH_BINARY)
             
             # Apply skeletonization
-            result = morphological_skeleton(binary, max_iterations)
+            result = skeleton_function(binary, max_iterations)
         
         # Clean up to free memory
         gc.collect()
@@ -75,6 +87,7 @@ def apply_skeletonization(image, params=None):
 def morphological_skeleton(image, max_iterations=100):
     """
     Implements morphological skeletonization using the algorithm of successive erosions and openings.
+    Runs on the bit-packed binary engine.
     
     Args:
         image: Binary image
@@ -83,40 +96,40 @@ def morphological_skeleton(image, max_iterations=100):
     Returns:
         Skeletonized binary image
     """
-    # Create a structuring element
-    kernel = cv2.getStructuringElement(cv2.MORPH_CROSS, (3, 3))
+    # Get the (cached) structuring element
+    kernel = structuring_element('cross', 3)
     
-    # Make a copy of the image
-    img = image.copy()
+    width = image.shape[1]
     
-    # Initialize skeleton
-    skeleton = np.zeros(img.shape, np.uint8)
+    # Pack 64 pixels per word and skeletonize with word-wide bitwise operations
+    words = pack_mask(image)
+    skeleton = skeletonize(words, width, kernel, max_iterations)
     
-    # Initialize a flag to track changes
-    done = False
-    iteration = 0
+    return to_binary_image(skeleton, width)
+
+def distance_skeleton(image, max_iterations=100):
+    """
+    Computes the same skeleton as morphological_skeleton in a constant number of passes.
+    With a 3x3 cross, a pixel survives exactly d - 1 erosions, where d is its city-block
+    distance to the background, and it belongs to the skeleton when d is a local maximum
+    over the cross. So the skeleton is the set of ridges of the L1 distance transform.
     
-    # Repeat until the image is eroded to nothing or max iterations reached
-    while not done and iteration < max_iterations:
-        # Erode the image
-        eroded = cv2.erode(img, kernel)
-        
-        # Open the eroded image
-        opened = cv2.morphologyEx(eroded, cv2.MORPH_OPEN, kernel)
-        
-        # Subtract the opened image from the eroded image
-        temp = cv2.subtract(eroded, opened)
-        
-        # Add the temporary image to the skeleton
-        skeleton = cv2.bitwise_or(skeleton, temp)
-        
-        # Set the eroded image for the next iteration
-        img = eroded.copy()
-        
-        # Check if the eroded image has any white pixels left
-        done = cv2.countNonZero(img) == 0
-        
-        # Increment iteration counter
-        iteration += 1
+    Args:
+        image: Binary image
+        max_iterations: Maximum number of iterations of the equivalent iterative skeleton
+    
+    Returns:
+        Skeletonized binary image
+    """
+    # Get the (cached) structuring element
+    kernel = structuring_element('cross', 3)
+    
+    # City-block distance to the nearest background pixel (exact with a 3x3 mask)
+    distance = cv2.distanceTransform(image, cv2.DIST_L1, cv2.DIST_MASK_3)
+    
+    # Ridges: local maxima over the cross, skipping the outline (d == 1), which
+    # the iterative skeleton never visits, and anything beyond max_iterations erosions
+    ridges = cv2.compare(distance, cv2.dilate(distance, kernel), cv2.CMP_EQ)
+    in_range = cv2.inRange(distance, 2, max_iterations + 1)
     
-    return skeleton
+    return cv2.bitwise_and(ridges, in_range)
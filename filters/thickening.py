@@ -7,29 +7,40 @@ import cv2
 import numpy as np
 import gc
 
+from filters.binary_engine import pack_mask, to_binary_image, thicken
+
 def apply_thickening(image, params=None):
     """
     Apply thickening morphological operation to an image.
-    Thickening adds pixels to the boundaries of objects in a binary image.
+    Thickening adds pixels to the boundaries of objects in a binary image,
+    filling their concavities; until convergence, it yields their convex hull.
     
     Args:
         image: Input image
         params: Dictionary of parameters
-            - iterations: Number of iterations (default: 3)
+            - iterations: Maximum number of iterations (default: 3)
+            - converge: Thicken until an iteration adds no pixels (the convex hull), ignoring iterations (default: False)
             - threshold: Threshold for binarization (0-255, default: 127)
             - preserve_original: Whether to overlay the result on the original (default: True)
     
     Returns:
-        Thickened image
+        Thickened image. params['iterations_used'] receives the number of
+        iterations that added pixels, which the task status reports under
+        'statistics'.
     """
     if params is None:
         params = {}
     
     # Get parameters with defaults
     iterations = params.get('iterations', 3)
+    converge = params.get('converge', False)
     threshold_value = params.get('threshold', 127)
     preserve_original = params.get('preserve_original', True)
     
+    # Iterate until convergence when requested (always terminates, at the convex hull)
+    if converge:
+        iterations = None
+    
     # Convert image to appropriate type
     if image.dtype != np.uint8:
         image = np.clip(image, 0, 255).astype(np.uint8)
@@ -45,7 +56,7 @@ def apply_thickening(image, params=None):
             _, binary = cv2.threshold(gray, threshold_value, 255, cv2.THRESH_BINARY)
             
             # Apply thickening
-            thickened = morphological_thickening(binary, iterations)
+            thickened, params['iterations_used'] = morphological_thickening(binary, iterations)
             
             if preserve_original:
                 # For better visualization, overlay the thickening result on the original
@@ -63,7 +74,7 @@ def apply_thickening(image, params=None):
             _, binary = cv2.threshold(image, threshold_value, 255, cv2.THRESH_BINARY)
             
             # Apply thickening
-            result = morphological_thickening(binary, iterations)
+            result, params['iterations_used'] = morphological_thickening(binary, iterations)
         
         # Clean up to free memory
         gc.collect()
@@ -79,90 +90,34 @@ def morphological_thickening(image, iterations=3):
     
     Args:
         image: Binary image
-        iterations: Number of iterations
+        iterations: Maximum number of iterations (None: until convergence)
     
     Returns:
-        Thickened binary image
+        Tuple of (thickened binary image, number of iterations that added pixels)
     """
-    # Create structuring elements for thickening
-    # Thickening uses hit-or-miss transform with specific structuring elements
-    
-    # Define a list of structuring element pairs for different directions
-    # Each direction contributes to thickening from that side
-    se_pairs = []
-    
-    # North direction
-    se_north_hit = np.array([
-        [0, 0, 0],
-        [0, 1, 0],
-        [1, 1, 1]
-    ], dtype=np.uint8)
-    se_north_miss = np.array([
-        [1, 1, 1],
-        [0, 0, 0],
-        [0, 0, 0]
-    ], dtype=np.uint8)
-    se_pairs.append((se_north_hit, se_north_miss))
-    
-    # South direction
-    se_south_hit = np.array([
-        [1, 1, 1],
-        [0, 1, 0],
-        [0, 0, 0]
-    ], dtype=np.uint8)
-    se_south_miss = np.array([
-        [0, 0, 0],
-        [0, 0, 0],
-        [1, 1, 1]
-    ], dtype=np.uint8)
-    se_pairs.append((se_south_hit, se_south_miss))
-    
-    # East direction
-    se_east_hit = np.array([
-        [1, 0, 0],
+    # Convex-hull thickening elements: each adds a background pixel (center)
+    # lying in a concave corner of an object, so thickening fills concavities
+    # and stops at the object's convex hull (with 45-degree sides) instead of
+    # growing without bound. The eight elements are the rotations of the
+    # element below and of its mirror image
+    # (1: foreground, -1: background, 0: don't care)
+    se_corner = np.array([
         [1, 1, 0],
-        [1, 0, 0]
-    ], dtype=np.uint8)
-    se_east_miss = np.array([
-        [0, 0, 1],
-        [0, 0, 1],
-        [0, 0, 1]
-    ], dtype=np.uint8)
-    se_pairs.append((se_east_hit, se_east_miss))
+        [1, -1, 0],
+        [1, 0, -1]
+    ], dtype=np.int8)
     
-    # West direction
-    se_west_hit = np.array([
-        [0, 0, 1],
-        [0, 1, 1],
-        [0, 0, 1]
-    ], dtype=np.uint8)
-    se_west_miss = np.array([
-        [1, 0, 0],
-        [1, 0, 0],
-        [1, 0, 0]
-    ], dtype=np.uint8)
-    se_pairs.append((se_west_hit, se_west_miss))
+    elements = [
+        np.rot90(element, turns).copy()
+        for turns in range(4)
+        for element in (se_corner, np.fliplr(se_corner))
+    ]
     
-    # Make a copy of the image
-    result = image.copy()
+    width = image.shape[1]
     
-    # Apply thickening for the specified number of iterations
-    for _ in range(iterations):
-        for hit_kernel, miss_kernel in se_pairs:
-            # Create a kernel for hit-or-miss transform
-            # OpenCV doesn't directly support the hit-miss with two kernels
-            # So we'll implement it manually
-            
-            # Erode with hit kernel
-            hit = cv2.erode(result, hit_kernel)
-            
-            # Erode inverted image with miss kernel
-            miss = cv2.erode(255 - result, miss_kernel)
-            
-            # Combine hit and miss
-            hitmiss = cv2.bitwise_and(hit, miss)
-            
-            # Add the hit-miss result to the original image for thickening
-            result = cv2.bitwise_or(result, hitmiss)
+    # Pack 64 pixels per word and thicken in preallocated buffers until
+    # convergence or the iteration limit
+    words = pack_mask(image)
+    result, iterations_used = thicken(words, width, elements, iterations)
     
-    return result
+    return to_binary_image(result, width), iterations_used
@@ -0,0 +1,348 @@
+"""
+Tone-curve compiler for image processing.
+This module turns the pointwise enhancement filters (brightness/contrast,
+exposure and shadows/highlights) into 256-entry lookup tables, composes
+consecutive tables into one, and applies each composed table with a single
+cv2.LUT. Every table reproduces its filter exactly, so a fused chain gives the
+same result as running the filters one after the other. Tables are cached by
+quantized parameters and shared with the filters themselves, and the common
+slider positions can be prebuilt at startup.
+"""
+
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+# Every uint8 value, in order: the identity curve
+IDENTITY_CURVE = np.arange(256, dtype=np.uint8)
+
+# Curve parameters are rounded to this many decimals, so equal slider
+# positions always share one cached table
+CURVE_PARAM_DECIMALS = 2
+
+# Number of tables kept by the curve cache (the warm-up presets use about 800)
+CURVE_CACHE_SIZE = 1024
+
+def _brightness_contrast_table(brightness, contrast):
+    if contrast > 0:
+        alpha = 1 + contrast / 100.0
+    else:
+        alpha = 1 + contrast / 127.0
+
+    # Run the filter's own conversion on every value
+    return cv2.convertScaleAbs(IDENTITY_CURVE, alpha=alpha, beta=brightness).reshape(256)
+
+def _exposure_table(exposure):
+    if exposure > 0:
+        gamma = 1 - exposure / 100.0  # Increase exposure (lower gamma)
+    else:
+        gamma = 1 + abs(exposure) / 50.0  # Decrease exposure (higher gamma)
+
+    if gamma <= 0:
+        raise ValueError(f"Exposure must be below 100, got {exposure}")
+
+    return (np.power(IDENTITY_CURVE / 255.0, 1.0 / gamma) * 255).astype(np.uint8)
+
+def _shadows_highlights_table(shadows, highlights):
+    shadows = shadows / 100.0
+    highlights = highlights / 100.0
+
+    # Same arithmetic as the filter, on every value of L
+    l = IDENTITY_CURVE
+    shadow_mask = (1.0 - l / 255.0) ** 2
+    highlight_mask = (l / 255.0) ** 2
+
+    l = l.astype(np.float32)
+    l += shadow_mask * shadows * 100
+    l -= highlight_mask * highlights * 100
+    return np.clip(l, 0, 255).astype(np.uint8)
+
+def _vibrance_table(vibrance):
+    vibrance = vibrance / 100.0
+
+    # Same float32 arithmetic as the filter, on every value of S
+    s = IDENTITY_CURVE.astype(np.float32)
+    mask = (255 - s) / 255.0
+    s = s + mask * s * vibrance
+    return np.clip(s, 0, 255).astype(np.uint8)
+
+def _drago_table(min_level, max_level, log_mean, bias):
+    # Drago et al. adaptive logarithmic mapping, as OpenCV's TonemapDrago computes it:
+    # luminance stretched to [0, 1], then divided by its log-average
+    levels = np.clip((np.arange(256) - min_level) / float(max_level - min_level), 0, 1)
+    world = levels / np.exp(log_mean)
+    max_world = 1.0 / np.exp(log_mean)
+
+    mapped = np.log1p(world) / np.log(2.0 + 8.0 * (world / max_world) ** (np.log(bias) / np.log(0.5)))
+    mapped /= mapped.max()
+    return np.clip(np.rint(mapped * 255), 0, 255).astype(np.uint8)
+
+@lru_cache(maxsize=1)
+def _gray_lightness():
+    """LAB lightness of every gray level, as OpenCV computes it (non-decreasing)."""
+    ramp = np.dstack([IDENTITY_CURVE, IDENTITY_CURVE, IDENTITY_CURVE])
+    return cv2.cvtColor(ramp, cv2.COLOR_BGR2LAB)[0, :, 0].astype(np.int16)
+
+def _shadows_highlights_gray_table(shadows, highlights):
+    # Gray level whose lightness is closest to the adjusted lightness of each gray level
+    lightness = _gray_lightness()
+    target = _shadows_highlights_table(shadows, highlights)[lightness].astype(np.int16)
+
+    upper = np.clip(np.searchsorted(lightness, target), 0, 255)
+    lower = np.clip(upper - 1, 0, 255)
+    closer_lower = np.abs(lightness[lower] - target) <= np.abs(lightness[upper] - target)
+    adjusted = np.where(closer_lower, lower, upper)
+
+    # Signed change of each gray level
+    return (adjusted - IDENTITY_CURVE).astype(np.int16)
+
+# Table builders of each curve family, from quantized parameter values
+_CURVE_FAMILIES = {
+    'brightness_contrast': _brightness_contrast_table,
+    'exposure': _exposure_table,
+    'shadows_highlights': _shadows_highlights_table,
+    'shadows_highlights_gray': _shadows_highlights_gray_table,
+    'vibrance': _vibrance_table,
+    'drago': _drago_table
+}
+
+def _quantize(value):
+    return round(float(value), CURVE_PARAM_DECIMALS)
+
+@lru_cache(maxsize=CURVE_CACHE_SIZE)
+def cached_curve(family, *values):
+    """
+    Build (or reuse) the table of a curve family.
+    Tables are cached by family and quantized parameters, and returned
+    read-only, so callers must not modify them.
+
+    Args:
+        family: 'brightness_contrast', 'exposure', 'shadows_highlights',
+            'shadows_highlights_gray', 'vibrance' or 'drago'
+        values: Quantized parameter values of the family
+
+    Returns:
+        256-entry lookup table (uint8, or int16 for 'shadows_highlights_gray')
+    """
+    table = _CURVE_FAMILIES[family](*values)
+    table.setflags(write=False)
+    return table
+
+def brightness_contrast_curve(params=None):
+    """
+    Tone curve of apply_brightness_contrast.
+
+    Args:
+        params: Dictionary of parameters (brightness, contrast), as for the filter
+
+    Returns:
+        256-entry uint8 lookup table
+    """
+    if params is None:
+        params = {}
+
+    brightness = _quantize(params.get('brightness', 0))
+    contrast = _quantize(params.get('contrast', 0))
+    return cached_curve('brightness_contrast', brightness, contrast)
+
+def exposure_curve(params=None):
+    """
+    Tone curve of apply_exposure (a gamma correction).
+
+    Args:
+        params: Dictionary of parameters (exposure), as for the filter
+
+    Returns:
+        256-entry uint8 lookup table
+    """
+    if params is None:
+        params = {}
+
+    return cached_curve('exposure', _quantize(params.get('exposure', 0)))
+
+def shadows_highlights_curve(params=None):
+    """
+    Tone curve of apply_shadows_highlights, applied to the L channel of color
+    images and to the image itself for grayscale images.
+
+    Args:
+        params: Dictionary of parameters (shadows, highlights), as for the filter
+
+    Returns:
+        256-entry uint8 lookup table
+    """
+    if params is None:
+        params = {}
+
+    shadows = _quantize(params.get('shadows', 50))
+    highlights = _quantize(params.get('highlights', 50))
+    return cached_curve('shadows_highlights', shadows, highlights)
+
+def shadows_highlights_gray_delta(params=None):
+    """
+    Shadows/highlights adjustment measured on gray levels, for the fast mode of
+    apply_shadows_highlights: the signed change of each gray level when its
+    LAB lightness goes through the shadows/highlights curve.
+
+    Args:
+        params: Dictionary of parameters (shadows, highlights), as for the filter
+
+    Returns:
+        256-entry int16 lookup table
+    """
+    if params is None:
+        params = {}
+
+    shadows = _quantize(params.get('shadows', 50))
+    highlights = _quantize(params.get('highlights', 50))
+    return cached_curve('shadows_highlights_gray', shadows, highlights)
+
+def vibrance_curve(params=None):
+    """
+    Saturation curve of apply_vibrance, applied to the S channel of HSV.
+
+    Args:
+        params: Dictionary of parameters (vibrance), as for the filter
+
+    Returns:
+        256-entry uint8 lookup table
+    """
+    if params is None:
+        params = {}
+
+    return cached_curve('vibrance', _quantize(params.get('vibrance', 50)))
+
+# Bias of the Drago tone mapping (0.85 is the value recommended by its authors)
+DRAGO_BIAS = 0.85
+
+def drago_curve(histogram, bias=DRAGO_BIAS):
+    """
+    Drago tone mapping of a luminance channel as a lookup table.
+    The mapping is global, so it only depends on the darkest and brightest
+    levels and the log-average luminance, all read from the channel's
+    histogram; tables are cached by these statistics.
+
+    Args:
+        histogram: 256-bin histogram of the luminance channel
+        bias: Drago bias, controlling how strongly highlights are compressed
+
+    Returns:
+        256-entry uint8 lookup table (the identity for a flat channel)
+    """
+    histogram = np.asarray(histogram, dtype=np.float64).ravel()
+    levels = np.flatnonzero(histogram)
+    if len(levels) < 2:
+        return IDENTITY_CURVE
+
+    # Log-average of the stretched luminance, with logs floored at 1e-4 as OpenCV does
+    min_level, max_level = int(levels[0]), int(levels[-1])
+    stretched = np.clip((np.arange(256) - min_level) / float(max_level - min_level), 0, 1)
+    log_mean = float(np.dot(histogram, np.log(np.maximum(stretched, 1e-4))) / histogram.sum())
+
+    return cached_curve('drago', min_level, max_level, _quantize(log_mean), _quantize(bias))
+
+# Pointwise filters: curve builder and the channels the curve applies to
+# ('channels': every channel, 'luminance': the L channel of LAB)
+POINTWISE_CURVES = {
+    'brightness_contrast': (brightness_contrast_curve, 'channels'),
+    'exposure': (exposure_curve, 'channels'),
+    'shadows_highlights': (shadows_highlights_curve, 'luminance')
+}
+
+def is_pointwise(filter_type):
+    """Whether a filter type can be compiled into a tone curve."""
+    return filter_type in POINTWISE_CURVES
+
+def compile_tone_curves(steps, color=True):
+    """
+    Compile a chain of pointwise filters into as few lookup tables as possible.
+    Consecutive curves on the same channels compose into one table. On color
+    images, a luminance curve needs its own pass through LAB, since LAB
+    conversions do not commute with curves on the BGR channels.
+
+    Args:
+        steps: List of (filter_type, params) pairs, all pointwise
+        color: Whether the chain will run on a color image
+
+    Returns:
+        List of (domain, table) stages, domain being 'channels' or 'luminance'
+    """
+    stages = []
+    for filter_type, params in steps:
+        builder, domain = POINTWISE_CURVES[filter_type]
+
+        # A filter that fails leaves the image unchanged, as the filter itself does
+        try:
+            table = builder(params)
+        except Exception as e:
+            print(f"Error in {filter_type} tone curve: {str(e)}")
+            continue
+
+        # The luminance of a grayscale image is the image itself
+        if not color:
+            domain = 'channels'
+
+        if domain == 'channels' and stages and stages[-1][0] == 'channels':
+            # Applying the previous table, then this one
+            stages[-1] = ('channels', table[stages[-1][1]])
+        else:
+            stages.append((domain, table))
+
+    return stages
+
+def apply_tone_curves(image, steps):
+    """
+    Apply a chain of pointwise filters with one lookup per compiled stage.
+
+    Args:
+        image: Input image
+        steps: List of (filter_type, params) pairs, all pointwise
+
+    Returns:
+        Image identical to applying the filters in sequence
+    """
+    if image.dtype != np.uint8:
+        image = np.clip(image, 0, 255).astype(np.uint8)
+
+    color = len(image.shape) > 2
+    for domain, table in compile_tone_curves(steps, color):
+        if domain == 'channels':
+            image = cv2.LUT(image, table)
+        else:
+            # Per-channel table that only changes L
+            lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
+            lab_table = np.dstack([table, IDENTITY_CURVE, IDENTITY_CURVE])
+            image = cv2.cvtColor(cv2.LUT(lab, lab_table), cv2.COLOR_LAB2BGR)
+
+    return image
+
+# Parameter values whose curves are prebuilt at startup: every position of the
+# enhancement sliders (each moved from its default) and the filter chain defaults
+CURVE_PRESETS = {
+    'brightness_contrast': (
+        [{'brightness': value} for value in range(-100, 101)] +
+        [{'contrast': value} for value in range(-100, 101)] +
+        [{'brightness': 0.0, 'contrast': 1.0}]
+    ),
+    'exposure': [{'exposure': value} for value in range(-100, 100)],
+    'shadows_highlights': (
+        [{'shadows': value} for value in range(0, 101)] +
+        [{'highlights': value} for value in range(0, 101)]
+    )
+}
+
+def warm_curve_cache():
+    """
+    Prebuild the curves of every preset parameter value, so the first requests
+    do not pay for building their tables.
+
+    Returns:
+        Number of curves in the cache
+    """
+    for filter_type, presets in CURVE_PRESETS.items():
+        builder = POINTWISE_CURVES[filter_type][0]
+        for params in presets:
+            builder(params)
+
+    return cached_curve.cache_info().currsize
@@ -14,25 +14,32 @@ class ProcessingTask:
         self.result_filename = None
         self.error = None
         self.start_time = time.time()
+        self.end_time = None
         self.estimated_time = 0
         self.history_id = None
+        self.results = None  # Named result files of multi-output tasks
+        self.statistics = None  # Values the filter measured while running
     
     def update_progress(self, progress, message=None):
         """Update the progress of the task"""
         self.progress = progress
         return self
     
-    def mark_completed(self, result_filename, history_id=None):
+    def mark_completed(self, result_filename, history_id=None, results=None, statistics=None):
         """Mark the task as completed"""
         self.status = 'completed'
+        self.end_time = time.time()
         self.result_filename = result_filename
         self.progress = 100
         self.history_id = history_id
+        self.results = results
+        self.statistics = statistics
         return self
     
     def mark_failed(self, error):
         """Mark the task as failed"""
         self.status = 'failed'
+        self.end_time = time.time()
         self.error = error
         return self
     
@@ -46,8 +53,13 @@ class ProcessingTask:
         
         if self.status == 'completed':
             response['result'] = self.result_filename
+            response['processing_time'] = self.end_time - self.start_time
             if self.history_id:
                 response['history_id'] = self.history_id
+            if self.results:
+                response['results'] = self.results
+            if self.statistics:
+                response['statistics'] = self.statistics
         elif self.status == 'failed':
             response['error'] = self.error
         elif self.status == 'processing':
@@ -0,0 +1,538 @@
+"""
+Parity harness for the fast execution paths of the image processing pipeline.
+Runs every accuracy/speed trade-off against its full-quality reference on a
+corpus of synthetic (and optionally real) images, and reports the max absolute
+error, PSNR and SSIM next to the measured speedup.
+"""
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import contextlib
+
+import cv2
+import numpy as np
+
+from filters.adaptive_enhancement import AdaptiveContrastEnhancement
+from filters.retinex import apply_retinex
+from filters.dehaze import apply_dehaze
+from filters.exposure_fusion import apply_exposure_fusion
+from filters.fast_gaussian import fast_gaussian_blur
+from filters.hit_miss_transform import packed_hit_miss, pattern_templates, detect_patterns
+from filters.morphology_ops import morphology_ex, VHGW_MIN_KERNEL
+from filters.skeletonization import morphological_skeleton, distance_skeleton
+from filters.reconstruction import reconstruct_by_dilation
+from filters.enhancement_filters import (
+    apply_brightness_contrast, apply_exposure, apply_shadows_highlights, apply_clarity, apply_hdr_effect
+)
+from filters.tone_curves import IDENTITY_CURVE, apply_tone_curves, drago_curve
+from filters.color_lut import COLOR_POINTWISE_FILTERS, apply_color_chain
+from utils.quality_metrics import compare_images
+
+# Size of the synthetic corpus images
+CORPUS_SIZE = (384, 512)
+
+def build_synthetic_corpus(size=CORPUS_SIZE, seed=0):
+    """
+    Build a deterministic corpus of synthetic test images.
+
+    Args:
+        size: (height, width) of each image
+        seed: Random seed for the noise-based images
+
+    Returns:
+        Dictionary mapping image name to BGR uint8 image
+    """
+    h, w = size
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:h, 0:w].astype(np.float32)
+
+    corpus = {}
+
+    # Smooth colour gradients: exposes banding and bias
+    gradient = np.dstack([xx / w * 255, yy / h * 255, (xx + yy) / (w + h) * 255])
+    corpus['gradient'] = gradient.astype(np.uint8)
+
+    # Band-limited noise texture: exposes loss of fine detail
+    noise = rng.normal(128, 60, (h, w, 3)).astype(np.float32)
+    noise = cv2.GaussianBlur(noise, (0, 0), 2.0)
+    corpus['texture'] = np.clip(noise, 0, 255).astype(np.uint8)
+
+    # Checkerboard with text: exposes ringing and halos at hard edges
+    checker = (((xx // 32) + (yy // 32)) % 2 * 160 + 40).astype(np.uint8)
+    text = cv2.cvtColor(checker, cv2.COLOR_GRAY2BGR)
+    for row in range(6):
+        cv2.putText(text, 'Parity 0123456789', (10, 40 + row * 60),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (20, 200, 240), 2, cv2.LINE_AA)
+    corpus['text'] = text
+
+    # Dark, low-contrast scene: the typical enhancement input
+    dark = 20 + 30 * np.sin(xx / 60.0) * np.cos(yy / 45.0) + rng.normal(0, 4, (h, w))
+    dark = np.dstack([dark, dark * 1.1, dark * 0.9]) + 25
+    corpus['dark'] = np.clip(dark, 0, 255).astype(np.uint8)
+
+    # High-key, hazy scene
+    bright = 200 + 40 * np.sin(xx / 90.0 + yy / 70.0) + rng.normal(0, 3, (h, w))
+    corpus['bright'] = cv2.cvtColor(np.clip(bright, 0, 255).astype(np.uint8), cv2.COLOR_GRAY2BGR)
+
+    # Binary shapes: exposes differences on step edges
+    shapes = np.zeros((h, w), dtype=np.uint8)
+    cv2.circle(shapes, (w // 3, h // 2), min(h, w) // 5, 255, -1)
+    cv2.rectangle(shapes, (w // 2, h // 5), (w - 60, h - 80), 255, -1)
+    cv2.line(shapes, (0, h - 1), (w - 1, 0), 0, 9)
+    corpus['shapes'] = cv2.cvtColor(shapes, cv2.COLOR_GRAY2BGR)
+
+    return corpus
+
+def build_timing_image(size, seed=0):
+    """
+    Build one large textured color image for cases whose speed depends on the image size.
+
+    Args:
+        size: (height, width) of the image
+        seed: Random seed
+
+    Returns:
+        BGR uint8 image
+    """
+    rng = np.random.default_rng(seed)
+    noise = rng.integers(0, 256, (size[0], size[1], 3), dtype=np.uint8)
+    return cv2.GaussianBlur(noise, (0, 0), 3.0)
+
+def load_image_directory(directory, max_dimension=1600):
+    """
+    Load the images of a directory, downscaled to a maximum dimension.
+
+    Args:
+        directory: Directory with image files
+        max_dimension: Largest allowed side in pixels
+
+    Returns:
+        Dictionary mapping file name to BGR uint8 image
+    """
+    images = {}
+    for name in sorted(os.listdir(directory)):
+        image = cv2.imread(os.path.join(directory, name))
+        if image is None:
+            continue
+        h, w = image.shape[:2]
+        if max(h, w) > max_dimension:
+            scale = max_dimension / max(h, w)
+            image = cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        images[name] = image
+    return images
+
+def _ace(window_size=15, disable_entropy=False, simplified=False, max_dimension=100000):
+    """Build an ACE runner; the pipeline prints progress, which is silenced here."""
+    ace = AdaptiveContrastEnhancement(
+        window_size=window_size,
+        disable_entropy=disable_entropy,
+        use_simplified_processing=simplified,
+        max_processing_dimension=max_dimension
+    )
+
+    def run(image):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return ace.enhance(image)
+
+    return run
+
+# Hit-or-miss pattern: horizontal run of three foreground pixels
+_HIT_MISS_KERNEL = np.array([[0, 0, 0], [1, 1, 1], [0, 0, 0]], dtype=np.uint8)
+
+def _binarize(image):
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) > 2 else image
+    return cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)[1]
+
+def _hit_miss_reference(image):
+    return cv2.morphologyEx(_binarize(image), cv2.MORPH_HITMISS, _HIT_MISS_KERNEL, iterations=2)
+
+def _hit_miss_fast(image):
+    return packed_hit_miss(_binarize(image), _HIT_MISS_KERNEL, 2)
+
+def _skeleton_reference(image):
+    return morphological_skeleton(_binarize(image))
+
+def _skeleton_fast(image):
+    return distance_skeleton(_binarize(image))
+
+# Line ends and corners in all four orientations, detected in one batch
+_, _PATTERN_TEMPLATES = pattern_templates([
+    [[-1, -1, -1], [-1, 1, -1], [0, 1, 0]],
+    [[0, 1, 0], [-1, 1, 1], [-1, -1, 0]]
+], rotations=True)
+
+def _multi_pattern_reference(image):
+    labels = np.zeros(image.shape[:2], np.uint8)
+    for label, template in reversed(list(enumerate(_PATTERN_TEMPLATES, start=1))):
+        matches = cv2.morphologyEx(_binarize(image), cv2.MORPH_HITMISS, template.astype(np.int32))
+        labels[matches > 0] = label
+    return labels
+
+def _multi_pattern_fast(image):
+    return detect_patterns(_binarize(image), _PATTERN_TEMPLATES)[0]
+
+def _reconstruction_marker(image):
+    return cv2.erode(image, np.ones((9, 9), np.uint8))
+
+def _reconstruction_reference(image):
+    # Geodesic dilation repeated until stability
+    values = _reconstruction_marker(image)
+    while True:
+        grown = np.minimum(cv2.dilate(values, np.ones((3, 3), np.uint8)), image)
+        if np.array_equal(grown, values):
+            return values
+        values = grown
+
+def _reconstruction_fast(image):
+    return reconstruct_by_dilation(_reconstruction_marker(image), image)
+
+# Pointwise chain for the tone-curve fusion case
+_TONE_CHAIN = [
+    ('brightness_contrast', {'brightness': 12, 'contrast': 25}),
+    ('exposure', {'exposure': 30}),
+    ('brightness_contrast', {'brightness': -8, 'contrast': -10}),
+    ('exposure', {'exposure': -15}),
+    ('shadows_highlights', {'shadows': 40, 'highlights': 30})
+]
+
+_TONE_FILTERS = {
+    'brightness_contrast': apply_brightness_contrast,
+    'exposure': apply_exposure,
+    'shadows_highlights': apply_shadows_highlights
+}
+
+def _tone_chain_reference(image):
+    for filter_type, params in _TONE_CHAIN:
+        image = _TONE_FILTERS[filter_type](image, params)
+    return image
+
+def _tone_chain_fast(image):
+    return apply_tone_curves(image, _TONE_CHAIN)
+
+# Color-mixing chain for the 3D color LUT case
+_COLOR_CHAIN = [
+    ('brightness_contrast', {'brightness': 10, 'contrast': 20}),
+    ('vibrance', {'vibrance': 60}),
+    ('exposure', {'exposure': 25}),
+    ('shadows_highlights', {'shadows': 40, 'highlights': 30})
+]
+
+def _color_chain_reference(image):
+    for filter_type, params in _COLOR_CHAIN:
+        image = COLOR_POINTWISE_FILTERS[filter_type](image, params)
+    return image
+
+def _color_chain_fast(image):
+    return apply_color_chain(image, _COLOR_CHAIN)
+
+# Rectangular element large enough for the separable morphology backend
+_LARGE_RECT_KERNEL = np.ones((201, 201), np.uint8)
+
+def _tophat_reference(image):
+    return cv2.morphologyEx(image, cv2.MORPH_TOPHAT, _LARGE_RECT_KERNEL)
+
+def _tophat_fast(image):
+    return morphology_ex(image, cv2.MORPH_TOPHAT, _LARGE_RECT_KERNEL)
+
+# Rectangular element at the separable backend's threshold
+_THRESHOLD_RECT_KERNEL = np.ones((VHGW_MIN_KERNEL, VHGW_MIN_KERNEL), np.uint8)
+
+def _gaussian_reference(image):
+    return cv2.GaussianBlur(image, (0, 0), 40, borderType=cv2.BORDER_REFLECT)
+
+def _gaussian_fast(image):
+    return fast_gaussian_blur(image, 40)
+
+def _clarity_reference(image):
+    # Same luminance detail, with an exact Gaussian base
+    source = image.astype(np.float32)
+    if len(image.shape) > 2:
+        source = cv2.transform(source, np.full((1, 3), 1.0 / 3.0, dtype=np.float32))
+    detail = (source - cv2.GaussianBlur(source, (0, 0), 100, borderType=cv2.BORDER_REFLECT)) * 0.6
+    if len(image.shape) > 2:
+        detail = cv2.merge([detail, detail, detail])
+    return cv2.add(image, detail, dtype=cv2.CV_8U)
+
+def _clarity_fast(image):
+    return apply_clarity(image, {'clarity': 60, 'radius': 100})
+
+def _hdr_reference(image):
+    # Same tone curve on the whole image, with the exact Gaussian of size radius * 2 + 1
+    lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB) if len(image.shape) > 2 else None
+    luminance = lab[:, :, 0] if lab is not None else image
+    curve = drago_curve(cv2.calcHist([luminance], [0], None, [256], [0, 256]))
+    table = cv2.addWeighted(IDENTITY_CURVE, 0.4, curve, 0.6, 0).ravel()
+    if lab is not None:
+        lab[:, :, 0] = cv2.LUT(luminance, table)
+        toned = cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
+    else:
+        toned = cv2.LUT(image, table)
+    blurred = cv2.GaussianBlur(toned, (201, 201), 0, borderType=cv2.BORDER_REFLECT)
+    return cv2.addWeighted(toned, 1.3, blurred, -0.3, 0)
+
+def _hdr_fast(image):
+    return apply_hdr_effect(image, {'strength': 60, 'radius': 100})
+
+# Full-quality ACE path shared by all ACE cases, so its result is computed once per image
+_ACE_REFERENCE = _ace()
+
+# Each case runs a fast path against its reference; budgets are the minimum
+# quality the fast path must keep on every image of the synthetic corpus,
+# calibrated from measured values with a safety margin. Cases with an
+# image_size run on one timing image of that size instead of the corpus
+PARITY_CASES = [
+    {
+        'name': 'ace_downscaled',
+        'reference': _ACE_REFERENCE,
+        'fast': _ace(max_dimension=256),
+        'budget': {'min_psnr': 14.0, 'min_ssim': 0.50}
+    },
+    {
+        'name': 'ace_simplified',
+        'reference': _ACE_REFERENCE,
+        'fast': _ace(simplified=True),
+        'budget': {'min_psnr': 8.0, 'min_ssim': 0.08}
+    },
+    {
+        'name': 'ace_window_21',
+        'reference': _ACE_REFERENCE,
+        'fast': _ace(window_size=21),
+        'budget': {'min_psnr': 19.0, 'min_ssim': 0.72}
+    },
+    {
+        'name': 'ace_window_7',
+        'reference': _ACE_REFERENCE,
+        'fast': _ace(window_size=7),
+        'budget': {'min_psnr': 15.5, 'min_ssim': 0.46}
+    },
+    {
+        'name': 'ace_no_entropy',
+        'reference': _ACE_REFERENCE,
+        'fast': _ace(disable_entropy=True),
+        'budget': {'min_psnr': 25.0, 'min_ssim': 0.96}
+    },
+    {
+        'name': 'ace_production_large',
+        'reference': _ACE_REFERENCE,
+        'fast': _ace(window_size=7, disable_entropy=True, simplified=True, max_dimension=400),
+        'budget': {'min_psnr': 11.0, 'min_ssim': 0.15}
+    },
+    {
+        'name': 'retinex_fast_surround',
+        'reference': lambda image: apply_retinex(image, {'exact_surround': True}),
+        'fast': lambda image: apply_retinex(image, {'exact_surround': False}),
+        'budget': {'min_psnr': 45.0, 'min_ssim': 0.99}
+    },
+    {
+        'name': 'dehaze_low_res_transmission',
+        'reference': lambda image: apply_dehaze(image, {'low_res_transmission': False}),
+        'fast': lambda image: apply_dehaze(image, {'low_res_transmission': True,
+                                                     'transmission_max_dimension': 256}),
+        'budget': {'min_psnr': 27.0, 'min_ssim': 0.88}
+    },
+    {
+        'name': 'exposure_fusion_shallow_pyramid',
+        'reference': lambda image: apply_exposure_fusion(image, {'pyramid_levels': 6}),
+        'fast': lambda image: apply_exposure_fusion(image, {'pyramid_levels': 4}),
+        'budget': {'min_psnr': 23.0, 'min_ssim': 0.94}
+    },
+    {
+        'name': 'hit_miss_bit_packed',
+        'reference': _hit_miss_reference,
+        'fast': _hit_miss_fast,
+        'budget': {'max_abs_error': 0}
+    },
+    {
+        'name': 'hit_miss_multi_pattern',
+        'reference': _multi_pattern_reference,
+        'fast': _multi_pattern_fast,
+        'budget': {'max_abs_error': 0}
+    },
+    {
+        'name': 'skeleton_distance_transform',
+        'reference': _skeleton_reference,
+        'fast': _skeleton_fast,
+        'budget': {'max_abs_error': 0}
+    },
+    {
+        'name': 'opening_by_reconstruction',
+        'reference': _reconstruction_reference,
+        'fast': _reconstruction_fast,
+        'budget': {'max_abs_error': 0}
+    },
+    {
+        'name': 'shadows_highlights_fast_mode',
+        'reference': lambda image: apply_shadows_highlights(image, {'fast_mode': False}),
+        'fast': lambda image: apply_shadows_highlights(image, {'fast_mode': True}),
+        'budget': {'min_psnr': 30.0, 'min_ssim': 0.95}
+    },
+    {
+        'name': 'tone_curve_fusion',
+        'reference': _tone_chain_reference,
+        'fast': _tone_chain_fast,
+        'budget': {'max_abs_error': 0}
+    },
+    {
+        'name': 'color_lut_tetrahedral',
+        'reference': _color_chain_reference,
+        'fast': _color_chain_fast,
+        'budget': {'min_psnr': 42.0, 'min_ssim': 0.97}
+    },
+    {
+        'name': 'tophat_separable_rect',
+        'reference': _tophat_reference,
+        'fast': _tophat_fast,
+        'budget': {'max_abs_error': 0}
+    },
+    {
+        # The separable backend must already win at its threshold on a large image
+        'name': 'tophat_vhgw_crossover',
+        'reference': lambda image: cv2.morphologyEx(image, cv2.MORPH_TOPHAT, _THRESHOLD_RECT_KERNEL),
+        'fast': lambda image: morphology_ex(image, cv2.MORPH_TOPHAT, _THRESHOLD_RECT_KERNEL),
+        'image_size': (3000, 4000),
+        'budget': {'max_abs_error': 0, 'min_speedup': 1.0}
+    },
+    {
+        'name': 'gaussian_stacked_box',
+        'reference': _gaussian_reference,
+        'fast': _gaussian_fast,
+        'budget': {'min_psnr': 45.0, 'min_ssim': 0.98}
+    },
+    {
+        'name': 'clarity_large_radius',
+        'reference': _clarity_reference,
+        'fast': _clarity_fast,
+        'budget': {'min_psnr': 50.0, 'min_ssim': 0.99}
+    },
+    {
+        'name': 'hdr_box_blur',
+        'reference': _hdr_reference,
+        'fast': _hdr_fast,
+        'budget': {'min_psnr': 55.0, 'min_ssim': 0.99}
+    }
+]
+
+def _best_time(function, image, repeats):
+    """Run a function repeatedly and return its last result and best wall time."""
+    best = float('inf')
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function(image)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+def check_budget(metrics, budget, speedup=None):
+    """
+    Check a set of metrics against a quality budget.
+
+    Args:
+        metrics: Dictionary from compare_images
+        budget: Dictionary with optional min_psnr, min_ssim, max_abs_error and min_speedup
+        speedup: Measured speedup of the fast path, checked against min_speedup
+
+    Returns:
+        List of violation messages (empty when the budget holds)
+    """
+    violations = []
+    if 'min_psnr' in budget and metrics['psnr'] < budget['min_psnr']:
+        violations.append(f"PSNR {metrics['psnr']:.2f} < {budget['min_psnr']}")
+    if 'min_ssim' in budget and metrics['ssim'] < budget['min_ssim']:
+        violations.append(f"SSIM {metrics['ssim']:.4f} < {budget['min_ssim']}")
+    if 'max_abs_error' in budget and metrics['max_abs_error'] > budget['max_abs_error']:
+        violations.append(f"max error {metrics['max_abs_error']:.0f} > {budget['max_abs_error']}")
+    if 'min_speedup' in budget and speedup is not None and speedup < budget['min_speedup']:
+        violations.append(f"speedup {speedup:.2f}x < {budget['min_speedup']}x")
+    return violations
+
+def run_parity(images, cases=None, repeats=3):
+    """
+    Run parity cases over a set of images.
+
+    Args:
+        images: Dictionary mapping image name to image
+        cases: Parity cases to run (default: all of PARITY_CASES)
+        repeats: Number of timed runs per path; the best time is kept
+
+    Returns:
+        List of result dictionaries, one per (case, image)
+    """
+    if cases is None:
+        cases = PARITY_CASES
+
+    # Reference outputs are shared between cases that use the same reference path
+    reference_cache = {}
+
+    results = []
+    for case in cases:
+        case_images = images
+        if 'image_size' in case:
+            h, w = case['image_size']
+            case_images = {f'{w}x{h}': build_timing_image(case['image_size'])}
+
+        for image_name, image in case_images.items():
+            key = (id(case['reference']), image_name)
+            if key not in reference_cache:
+                reference_cache[key] = _best_time(case['reference'], image, repeats)
+            reference, reference_time = reference_cache[key]
+            fast, fast_time = _best_time(case['fast'], image, repeats)
+
+            metrics = compare_images(reference, fast)
+            speedup = reference_time / max(fast_time, 1e-9)
+            results.append({
+                'case': case['name'],
+                'image': image_name,
+                'max_abs_error': metrics['max_abs_error'],
+                'psnr': metrics['psnr'],
+                'ssim': metrics['ssim'],
+                'reference_time': reference_time,
+                'fast_time': fast_time,
+                'speedup': speedup,
+                'violations': check_budget(metrics, case['budget'], speedup)
+            })
+    return results
+
+def format_table(results):
+    """Format parity results as a plain-text table."""
+    header = f"{'case':<32} {'image':<14} {'max err':>8} {'PSNR':>8} {'SSIM':>7} {'ref s':>8} {'fast s':>8} {'speedup':>8}  status"
+    lines = [header, '-' * len(header)]
+    for row in results:
+        status = 'OK' if not row['violations'] else 'FAIL: ' + '; '.join(row['violations'])
+        lines.append(
+            f"{row['case']:<32} {row['image'][:14]:<14} {row['max_abs_error']:>8.0f} "
+            f"{row['psnr']:>8.2f} {row['ssim']:>7.4f} {row['reference_time']:>8.3f} "
+            f"{row['fast_time']:>8.3f} {row['speedup']:>7.2f}x  {status}"
+        )
+    return '\n'.join(lines)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure the quality cost of the fast execution paths against their references')
+    parser.add_argument('--images', help='Directory of real images to add to the synthetic corpus')
+    parser.add_argument('--max-dimension', type=int, default=1600, help='Downscale real images to this size')
+    parser.add_argument('--cases', nargs='*', help='Only run the named cases')
+    parser.add_argument('--repeats', type=int, default=3, help='Timed runs per path (best is kept)')
+    parser.add_argument('--json', help='Write the results to this JSON file')
+    parser.add_argument('--enforce', action='store_true', help='Exit with an error when a budget is violated')
+
+    args = parser.parse_args()
+
+    images = build_synthetic_corpus()
+    if args.images:
+        images.update(load_image_directory(args.images, args.max_dimension))
+
+    cases = PARITY_CASES
+    if args.cases:
+        cases = [case for case in PARITY_CASES if case['name'] in args.cases]
+
+    results = run_parity(images, cases, args.repeats)
+    print(format_table(results))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.enforce and any(row['violations'] for row in results):
+        sys.exit(1)
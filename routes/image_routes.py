@@ -5,25 +5,23 @@ import os
 import time
 import threading
 from datetime import datetime
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from werkzeug.utils import secure_filename
 
 from config.settings import UPLOAD_FOLDER, RESULT_FOLDER
 from services.task_manager import task_manager
 from services.history_manager import HistoryManager
 from services.image_processor import estimate_processing_time
-from services.task_processor import process_image_task, process_morphological_task, process_enhancement_task
-
-# Import image processing functions
-from filters.enhancement import (
-    apply_brightness_contrast, apply_exposure, apply_vibrance,
-    apply_clarity, apply_shadows_highlights
+from services.task_processor import (
+    process_image_task, process_morphological_task,
+    process_morphology_bundle_task, process_enhancement_task
 )
-from filters.morphological import (
-    apply_dilation, apply_erosion, apply_opening, apply_closing,
-    apply_tophat, apply_black_tophat, apply_morphological_gradient,
-    apply_hit_miss_transform, apply_thinning, apply_thickening,
-    apply_skeletonization
+from filters.color_lut import build_color_lut, export_cube, DEFAULT_LUT_SIZE
+from filters.morphology_ops import BUNDLE_OUTPUTS
+from filters.morphology_bundle import DEFAULT_BUNDLE_OUTPUTS, DEFAULT_BUNDLE_KERNEL_SIZE
+from filters.registry import (
+    get_filter, chain_filter_params, fusion_kind,
+    ENHANCEMENT, MORPHOLOGICAL, TONE_CURVE, COLOR_LUT
 )
 
 # Create a blueprint for image processing routes
@@ -119,30 +117,17 @@ def apply_morphological():
         
         # Get filter parameters
         filter_type = data.get('filter_type')
+        spec = get_filter(filter_type, MORPHOLOGICAL)
+        if spec is None:
+            return jsonify({'success': False, 'error': f'Unknown filter type: {filter_type}'})
         kernel_size = data.get('kernel_size', 3)
-        iterations = data.get('iterations', 1)
-        
-        # Additional parameters based on filter type
-        strength = data.get('strength', 1.0)
-        pattern = data.get('pattern', 'cross')
-        threshold = data.get('threshold', 128)
-        preserve_original = data.get('preserve_original', False)
-        max_iterations = data.get('max_iterations', 10)
         
         # Create a task ID
         task_id = f"morph_{int(time.time())}"
         
-        # Create a processing task
-        params = {
-            'filter_type': filter_type,
-            'kernel_size': kernel_size,
-            'iterations': iterations,
-            'strength': strength,
-            'pattern': pattern,
-            'threshold': threshold,
-            'preserve_original': preserve_original,
-            'max_iterations': max_iterations
-        }
+        # Create a processing task with the parameters the filter declares
+        params = {'filter_type': filter_type}
+        params.update(spec.request_params(data))
         
         # Estimate processing time
         image_path = os.path.join(UPLOAD_FOLDER, filename)
@@ -167,6 +152,65 @@ def apply_morphological():
         print(f"Error applying morphological filter: {str(e)}")
         return jsonify({'success': False, 'error': f'Server error: {str(e)}'})
 
+@image_bp.route('/apply_morphology_bundle', methods=['POST'])
+def morphology_bundle():
+    """Apply several morphological filters to an image from one erosion and dilation"""
+    try:
+        data = request.json
+        
+        # Check if an image is uploaded
+        if not os.listdir(UPLOAD_FOLDER):
+            return jsonify({'error': 'No image uploaded'})
+        
+        # Get the latest uploaded image
+        latest_file = max([os.path.join(UPLOAD_FOLDER, f) for f in os.listdir(UPLOAD_FOLDER)], key=os.path.getctime)
+        filename = os.path.basename(latest_file)
+        
+        # Get filter parameters
+        outputs = data.get('outputs') or list(DEFAULT_BUNDLE_OUTPUTS)
+        if not isinstance(outputs, list) or any(name not in BUNDLE_OUTPUTS for name in outputs):
+            return jsonify({
+                'success': False,
+                'error': f"outputs must be a list of: {', '.join(BUNDLE_OUTPUTS)}"
+            }), 400
+        kernel_size = data.get('kernel_size', DEFAULT_BUNDLE_KERNEL_SIZE)
+        
+        # Create a task ID
+        task_id = f"morph_bundle_{int(time.time())}"
+        
+        # Create a processing task; kernel_size and iterations are only passed
+        # when the request sets them, so large images can use faster settings
+        params = {
+            'outputs': outputs,
+            'strength': data.get('strength', 1.0)
+        }
+        for key in ('kernel_size', 'iterations'):
+            if key in data:
+                params[key] = data[key]
+        
+        # Estimate processing time
+        image_path = os.path.join(UPLOAD_FOLDER, filename)
+        estimated_time = estimate_processing_time(image_path, window_size=kernel_size)
+        
+        # Create a task object
+        task = task_manager.create_task(task_id, filename, params, estimated_time)
+        
+        # Start processing in a background thread
+        task_manager.run_task_in_background(
+            process_morphology_bundle_task,
+            (task_id, image_path, filename, params, False, data)
+        )
+        
+        # Return task ID for status polling
+        return jsonify({
+            'success': True,
+            'task_id': task_id,
+            'estimated_time': task.estimated_time
+        })
+    except Exception as e:
+        print(f"Error applying morphology bundle: {str(e)}")
+        return jsonify({'success': False, 'error': f'Server error: {str(e)}'})
+
 @image_bp.route('/apply_enhancement', methods=['POST'])
 def apply_enhancement():
     """Apply enhancement filter to an image"""
@@ -183,35 +227,25 @@ def apply_enhancement():
         
         # Get filter parameters
         filter_type = data.get('filter_type')
+        spec = get_filter(filter_type, ENHANCEMENT)
+        if spec is None:
+            return jsonify({'success': False, 'error': f'Unknown enhancement filter type: {filter_type}'})
         
         # Create a task ID
         task_id = f"enhance_{int(time.time())}"
         
-        # Create a processing task with filter-specific parameters
+        # Create a processing task with the parameters the filter declares
         params = {'filter_type': filter_type}
+        params.update(spec.request_params(data))
         
-        # Add parameters based on filter type
-        if filter_type == 'brightness_contrast':
-            params['brightness'] = data.get('brightness', 0.0)
-            params['contrast'] = data.get('contrast', 1.0)
-        elif filter_type == 'exposure':
-            params['exposure'] = data.get('exposure', 0.0)
-            params['highlights'] = data.get('highlights', 0.0)
-            params['shadows'] = data.get('shadows', 0.0)
-        elif filter_type == 'vibrance':
-            params['vibrance'] = data.get('vibrance', 0.0)
-            params['saturation'] = data.get('saturation', 0.0)
-        elif filter_type == 'clarity':
-            params['clarity'] = data.get('clarity', 0.0)
-            params['edge_kernel'] = data.get('edge_kernel', 3)
-            params['edge_scale'] = data.get('edge_scale', 1.0)
-            params['apply_clahe'] = data.get('apply_clahe', True)
-            params['clahe_clip'] = data.get('clahe_clip', 2.0)
-            params['clahe_grid'] = data.get('clahe_grid', 8)
-        elif filter_type == 'shadows_highlights':
-            params['shadows_recovery'] = data.get('shadows_recovery', 0.0)
-            params['highlights_recovery'] = data.get('highlights_recovery', 0.0)
-            params['mid_tone_contrast'] = data.get('mid_tone_contrast', 0.0)
+        if spec.reference_key:
+            reference_filename = params[spec.reference_key]
+            
+            # Validate the reference filename to prevent directory traversal
+            if not reference_filename or '..' in reference_filename or '/' in reference_filename or '\\' in reference_filename:
+                return jsonify({'success': False, 'error': 'Invalid reference filename'})
+            if not os.path.exists(os.path.join(UPLOAD_FOLDER, reference_filename)):
+                return jsonify({'success': False, 'error': 'Reference image not found'})
         
         # Estimate processing time
         image_path = os.path.join(UPLOAD_FOLDER, filename)
@@ -235,3 +269,36 @@ def apply_enhancement():
     except Exception as e:
         print(f"Error applying enhancement filter: {str(e)}")
         return jsonify({'success': False, 'error': f'Server error: {str(e)}'})
+
+@image_bp.route('/export_cube', methods=['POST'])
+def export_cube_lut():
+    """Export a chain of color-pointwise filters as a .cube 3D LUT file"""
+    try:
+        data = request.json
+        
+        # Get the chain, with the same parameters as the enhancement filter chain
+        filter_types = data.get('filter_types', [])
+        params = data.get('params', {})
+        size = int(data.get('size', DEFAULT_LUT_SIZE))
+        
+        if not filter_types:
+            return jsonify(success=False, error='No filters provided')
+        
+        unsupported = [filter_type for filter_type in filter_types if fusion_kind(filter_type) not in (TONE_CURVE, COLOR_LUT)]
+        if unsupported:
+            return jsonify(success=False, error=f"Filters cannot be exported as a LUT: {', '.join(unsupported)}")
+        
+        if size < 2 or size > 65:
+            return jsonify(success=False, error='LUT size must be between 2 and 65')
+        
+        steps = [(filter_type, chain_filter_params(filter_type, params)) for filter_type in filter_types]
+        cube = export_cube(build_color_lut(steps, size), title=' + '.join(filter_types))
+        
+        return Response(
+            cube,
+            mimetype='text/plain',
+            headers={'Content-Disposition': 'attachment; filename=filters.cube'}
+        )
+    except Exception as e:
+        print(f"Error exporting LUT: {str(e)}")
+        return jsonify(success=False, error=f'Error exporting LUT: {str(e)}')
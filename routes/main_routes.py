@@ -16,7 +16,8 @@ from config.settings import (
 from services.task_manager import task_manager
 from services.history_manager import HistoryManager
 from services.image_processor import (
-    analyze_image, compress_image, estimate_processing_time
+    analyze_image, analyze_granulometry, recommend_enhancement_params,
+    compress_image, estimate_processing_time
 )
 from utils.file_utils import allowed_file, secure_file_path, cleanup_all_old_files
 
@@ -98,11 +99,43 @@ def analyze_image_endpoint(filename):
         
         # Analyze the image
         analysis = analyze_image(image_path)
+        
+        # Recommend filter parameters from the image statistics
+        recommendations = recommend_enhancement_params(image_path)
+        if 'error' not in recommendations:
+            analysis['statistics'] = recommendations['statistics']
+            analysis['recommended_params'] = recommendations['filters']
         return jsonify(success=True, analysis=analysis)
     except Exception as e:
         print(f"Error analyzing image: {str(e)}")
         return jsonify(success=False, error=f'Error analyzing image: {str(e)}')
 
+@main_bp.route('/granulometry/<filename>', methods=['GET'])
+def granulometry_endpoint(filename):
+    """Compute the pattern spectrum of an image and recommend a morphological kernel size"""
+    try:
+        # Validate filename to prevent directory traversal
+        if '..' in filename or '/' in filename or '\\' in filename:
+            return jsonify(success=False, error='Invalid filename')
+        
+        # Kernel sizes apply to the full-resolution image the morphological filters process
+        image_path = os.path.join(UPLOAD_FOLDER, filename)
+        if not os.path.exists(image_path):
+            return jsonify(success=False, error='Image file not found')
+        
+        # Get analysis parameters
+        max_size = min(max(request.args.get('max_size', 31, type=int), 3), 101)
+        dark = request.args.get('dark', 'false').lower() in ('1', 'true', 'yes')
+        
+        # Compute the granulometry
+        granulometry = analyze_granulometry(image_path, max_size, dark)
+        if 'error' in granulometry:
+            return jsonify(success=False, error=granulometry['error'])
+        return jsonify(success=True, granulometry=granulometry)
+    except Exception as e:
+        print(f"Error computing granulometry: {str(e)}")
+        return jsonify(success=False, error=f'Error computing granulometry: {str(e)}')
+
 @main_bp.route('/clear_cache', methods=['POST'])
 def clear_cache():
     """Clear all caches to free up memory"""
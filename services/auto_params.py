@@ -0,0 +1,217 @@
+"""
+Automatic parameter estimation for the enhancement filters.
+This module reads a few cheap statistics (luminance percentiles, mean and
+standard deviation, saturation, noise level) from a subsampled copy of an
+image, and turns them into recommended parameters for the adaptive contrast
+enhancement and for each enhancement filter, so one informed job can replace
+several trial-and-error runs.
+"""
+
+import math
+import time
+
+import cv2
+import numpy as np
+
+# Longest side of the subsampled copy the statistics are read from
+ANALYSIS_MAX_DIMENSION = 512
+
+# Luminance percentiles reported with the statistics
+PERCENTILES = (1, 5, 50, 95, 99)
+
+# Levels below (above) which a pixel counts as shadow (highlight)
+SHADOW_LEVEL = 48
+HIGHLIGHT_LEVEL = 207
+
+# Targets of a well-exposed image
+TARGET_MEAN = 120.0
+TARGET_STD = 55.0
+TARGET_SATURATION = 0.35
+
+# Noise standard deviation (in levels) above which images are treated as noisy
+NOISE_THRESHOLD = 3.0
+
+# Fraction of impulse pixels above which noise is treated as salt-and-pepper
+IMPULSE_THRESHOLD = 0.005
+
+# Immerkaer's noise estimation kernel: the difference of two Laplacians,
+# which cancels smooth image content; on noise of deviation sigma its output
+# has deviation 6 * sigma
+_NOISE_KERNEL = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+
+def subsample(image, max_dimension=ANALYSIS_MAX_DIMENSION):
+    """
+    Subsampled view of an image whose longest side is at most max_dimension.
+    Pixels are picked with a stride rather than averaged, so the per-pixel
+    noise of the image is preserved.
+
+    Args:
+        image: Input image
+        max_dimension: Longest side of the result
+
+    Returns:
+        Strided view of the image
+    """
+    step = max(1, int(math.ceil(max(image.shape[:2]) / float(max_dimension))))
+    return image[::step, ::step]
+
+def image_statistics(image, max_dimension=ANALYSIS_MAX_DIMENSION):
+    """
+    Compute cheap statistics of an image from a subsampled copy.
+
+    Args:
+        image: Input image (grayscale or BGR)
+        max_dimension: Longest side of the subsampled copy
+
+    Returns:
+        Dictionary with:
+            - width, height: Size of the full image
+            - mean, std: Mean and standard deviation of the luminance
+            - percentiles: Luminance at each of PERCENTILES, keyed by percentile
+            - shadow_fraction, highlight_fraction: Fraction of shadow and highlight pixels
+            - saturation: Mean HSV saturation in [0, 1] (0 for grayscale images)
+            - noise_sigma: Estimated standard deviation of the luminance noise, in levels
+            - impulse_fraction: Fraction of pixels that stand out from their 3x3 median
+    """
+    if image.dtype != np.uint8:
+        image = np.clip(image, 0, 255).astype(np.uint8)
+
+    small = np.ascontiguousarray(subsample(image, max_dimension))
+    color = len(small.shape) > 2
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if color else small
+
+    # Percentiles from the cumulative histogram
+    histogram = cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel()
+    cumulative = np.cumsum(histogram)
+    total = cumulative[-1]
+    percentiles = {
+        str(p): int(np.searchsorted(cumulative, total * p / 100.0))
+        for p in PERCENTILES
+    }
+
+    mean, std = cv2.meanStdDev(gray)
+
+    saturation = 0.0
+    if color:
+        saturation = cv2.mean(cv2.cvtColor(small, cv2.COLOR_BGR2HSV))[1] / 255.0
+
+    # Robust noise level: median absolute response to the noise kernel,
+    # which textures and edges barely move
+    response = cv2.filter2D(gray.astype(np.float32), -1, _NOISE_KERNEL)[1:-1, 1:-1]
+    noise_sigma = 1.4826 * float(np.median(np.abs(response))) / 6.0
+
+    # Salt-and-pepper pixels differ strongly from their neighbourhood median
+    impulses = cv2.compare(cv2.absdiff(gray, cv2.medianBlur(gray, 3)), 60, cv2.CMP_GT)
+
+    return {
+        'width': int(image.shape[1]),
+        'height': int(image.shape[0]),
+        'mean': round(float(mean[0][0]), 2),
+        'std': round(float(std[0][0]), 2),
+        'percentiles': percentiles,
+        'shadow_fraction': round(float(cumulative[SHADOW_LEVEL - 1] / total), 4),
+        'highlight_fraction': round(float(1.0 - cumulative[HIGHLIGHT_LEVEL] / total), 4),
+        'saturation': round(float(saturation), 4),
+        'noise_sigma': round(noise_sigma, 2),
+        'impulse_fraction': round(cv2.countNonZero(impulses) / float(gray.size), 4)
+    }
+
+def recommend_params(image, max_dimension=ANALYSIS_MAX_DIMENSION):
+    """
+    Recommend enhancement parameters for an image.
+    Each filter's parameters are meant for that filter applied alone, and use
+    the request keys of /apply_enhancement, so they can be sent back as they are.
+
+    Args:
+        image: Input image (grayscale or BGR)
+        max_dimension: Longest side of the subsampled copy the statistics are read from
+
+    Returns:
+        Dictionary with:
+            - statistics: Output of image_statistics
+            - filters: Recommended parameters, keyed by filter type
+            - analysis_time_ms: Time spent on the analysis
+    """
+    start = time.time()
+    stats = image_statistics(image, max_dimension)
+
+    filters = {
+        'adaptive_enhancement': _adaptive_enhancement_params(stats),
+        'brightness_contrast': _brightness_contrast_params(stats),
+        'exposure': _exposure_params(stats),
+        'vibrance': _vibrance_params(stats),
+        'clarity': _clarity_params(stats),
+        'shadows_highlights': _shadows_highlights_params(stats),
+        'hdr': _hdr_params(stats)
+    }
+
+    return {
+        'statistics': stats,
+        'filters': filters,
+        'analysis_time_ms': round((time.time() - start) * 1000, 2)
+    }
+
+def _adaptive_enhancement_params(stats):
+    # Flat images take a higher clip limit, already contrasty ones a lower one
+    if stats['std'] < 35:
+        clip_limit = 4.0
+    elif stats['std'] < TARGET_STD:
+        clip_limit = 3.0
+    else:
+        clip_limit = 2.0
+
+    # Larger windows on larger images, so they cover a similar part of the scene
+    window_size = int(np.clip(max(stats['width'], stats['height']) // 150, 7, 25)) | 1
+
+    if stats['impulse_fraction'] > IMPULSE_THRESHOLD:
+        denoise = {'denoise_method': 'median', 'median_radius': 1 if stats['impulse_fraction'] < 0.02 else 2}
+    else:
+        denoise = {'denoise_method': 'bilateral'}
+
+    return dict({'window_size': window_size, 'clip_limit': clip_limit}, **denoise)
+
+def _brightness_contrast_params(stats):
+    # Stretch the deviation to the target (alpha = 1 + contrast / 100), then
+    # shift the stretched mean to the target
+    contrast = float(np.clip((TARGET_STD / max(stats['std'], 1.0) - 1.0) * 100, -30, 100))
+    alpha = 1 + contrast / 100.0
+    brightness = float(np.clip(TARGET_MEAN - alpha * stats['mean'], -60, 60))
+    return {'brightness': int(round(brightness)), 'contrast': int(round(contrast))}
+
+def _exposure_params(stats):
+    # Power that moves the median to the target: the filter raises values to
+    # 1 / gamma, with gamma = 1 - exposure / 100 above 0 and 1 + |exposure| / 50 below
+    median = np.clip(stats['percentiles']['50'] / 255.0, 0.02, 0.98)
+    power = math.log(TARGET_MEAN / 255.0) / math.log(median)
+    if power >= 1:
+        exposure = 100 * (1 - 1 / power)
+    else:
+        exposure = -50 * (1 / power - 1)
+    return {'exposure': int(round(np.clip(exposure, -100, 90)))}
+
+def _vibrance_params(stats):
+    # Boost dull colors, leave saturated (or gray) images alone
+    shortfall = (TARGET_SATURATION - stats['saturation']) / TARGET_SATURATION
+    vibrance = np.clip(shortfall * 100, 0, 100) if stats['saturation'] > 0 else 0
+    return {'vibrance': int(round(vibrance))}
+
+def _clarity_params(stats):
+    # Local contrast also amplifies noise, so back off on noisy images
+    clarity = 40 * np.clip(1 - stats['noise_sigma'] / (2 * NOISE_THRESHOLD), 0, 1)
+
+    # Large-radius base of about 2% of the image, edge-aware on high-contrast scenes
+    radius = int(np.clip(round(0.02 * max(stats['width'], stats['height'])), 10, 200))
+    high_contrast = stats['percentiles']['99'] - stats['percentiles']['1'] > 200
+    return {'clarity': int(round(clarity)), 'radius': radius, 'edge_aware': bool(high_contrast)}
+
+def _shadows_highlights_params(stats):
+    # Lift shadows and recover highlights in proportion to how much of the image they cover
+    shadows = np.clip(stats['shadow_fraction'] * 200, 0, 60)
+    highlights = np.clip(stats['highlight_fraction'] * 200, 0, 60)
+    return {'shadows_recovery': int(round(shadows)), 'highlights_recovery': int(round(highlights))}
+
+def _hdr_params(stats):
+    # Scenes with both deep shadows and bright highlights gain the most
+    strength = np.clip((stats['shadow_fraction'] + stats['highlight_fraction']) * 150, 0, 80)
+    radius = int(np.clip(round(0.01 * max(stats['width'], stats['height'])), 5, 100))
+    return {'hdr_strength': int(round(strength)), 'hdr_radius': radius}
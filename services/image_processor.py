@@ -12,6 +12,9 @@ from config.settings import (
     DEFAULT_MAX_PROCESSING_DIMENSION, ENABLE_PERFORMANCE_OPTIMIZATIONS
 )
 
+from filters.granulometry import compute_granulometry
+from services.auto_params import recommend_params
+
 # Import optimization utilities
 from services.image_optimization import (
     load_image as utils_load_image,
@@ -224,3 +227,21 @@ def analyze_image(image_path):
     except Exception as e:
         print(f"Error analyzing image: {str(e)}")
         return {'error': str(e)}
+
+def analyze_granulometry(image_path, max_size=31, dark=False):
+    """Compute the size distribution of the structures of an image and recommend a kernel size"""
+    try:
+        image = load_image(image_path)
+        return compute_granulometry(image, max_size, dark)
+    except Exception as e:
+        print(f"Error computing granulometry: {str(e)}")
+        return {'error': str(e)}
+
+def recommend_enhancement_params(image_path):
+    """Recommend enhancement parameters from cheap statistics of an image"""
+    try:
+        image = load_image(image_path)
+        return recommend_params(image)
+    except Exception as e:
+        print(f"Error recommending parameters: {str(e)}")
+        return {'error': str(e)}
@@ -33,11 +33,11 @@ class TaskManager:
             task.progress = progress
         return task
     
-    def mark_task_completed(self, task_id, result_filename, history_id=None):
+    def mark_task_completed(self, task_id, result_filename, history_id=None, results=None, statistics=None):
         """Mark a task as completed"""
         task = self.get_task(task_id)
         if task:
-            task.mark_completed(result_filename, history_id)
+            task.mark_completed(result_filename, history_id, results, statistics)
         return task
     
     def mark_task_failed(self, task_id, error):
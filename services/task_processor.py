@@ -6,7 +6,7 @@ import gc
 import time
 from datetime import datetime
 
-from config.settings import RESULT_FOLDER, ENABLE_PERFORMANCE_OPTIMIZATIONS
+from config.settings import UPLOAD_FOLDER, RESULT_FOLDER, ENABLE_PERFORMANCE_OPTIMIZATIONS
 from services.task_manager import task_manager
 from services.history_manager import HistoryManager
 
@@ -21,16 +21,14 @@ from services.image_optimization import (
 )
 
 # Import image processing functions
-from filters.enhancement import (
-    apply_brightness_contrast, apply_exposure, apply_vibrance,
-    apply_clarity, apply_shadows_highlights
-)
-from filters.morphological import (
-    apply_dilation, apply_erosion, apply_opening, apply_closing,
-    apply_tophat, apply_black_tophat, apply_morphological_gradient,
-    apply_hit_miss_transform, apply_thinning, apply_thickening,
-    apply_skeletonization
+from filters.registry import (
+    get_filter, plan_chain, estimate_chain_seconds,
+    ENHANCEMENT, MORPHOLOGICAL, TONE_CURVE, COLOR_LUT
 )
+from filters.tone_curves import apply_tone_curves
+from filters.color_lut import apply_color_chain, DEFAULT_LUT_SIZE
+from filters.morphological import apply_morphology_bundle
+from filters.morphology_bundle import DEFAULT_BUNDLE_OUTPUTS
 
 # Create a history manager instance
 history_manager = HistoryManager()
@@ -113,8 +111,14 @@ def process_image_task(task_id, image_path, filename, params, use_compressed, da
             # Apply enhancement with optimized functions
             ace.set_progress_callback(progress_callback)
             
+            # Forward the denoising choice to the enhancement pipeline
+            enhance_params = {
+                key: params[key] for key in ('denoise_method', 'median_radius')
+                if key in params
+            }
+            
             # Use optimized enhancement if available
-            enhanced = ace.enhance(image)
+            enhanced = ace.enhance(image, enhance_params)
             
             task_manager.update_task_progress(task_id, 80)
             
@@ -136,47 +140,31 @@ def process_image_task(task_id, image_path, filename, params, use_compressed, da
             if filter_types:
                 print(f"Applying multiple enhancement filters: {filter_types}")
                 
-                # Apply each enhancement filter in sequence
-                for filter_type in filter_types:
-                    print(f"Applying filter: {filter_type}")
+                # Optionally sample color-pointwise runs (vibrance included) into a 3D color LUT
+                use_color_lut = params.get('color_lut', False) and len(enhanced.shape) > 2
+                
+                estimated = estimate_chain_seconds(filter_types, enhanced.shape[0] * enhanced.shape[1])
+                print(f"Estimated filter time: {estimated:.2f}s")
+                
+                # Apply each stage in sequence; runs of consecutive pointwise
+                # filters are compiled into a single lookup table
+                for stage, steps in plan_chain(filter_types, params, use_color_lut):
+                    names = [step[0] for step in steps]
                     
-                    if filter_type == 'brightness_contrast':
-                        bc_params = {
-                            'brightness': params.get('brightness', 0.0),
-                            'contrast': params.get('contrast', 1.0)
-                        }
-                        enhanced = apply_brightness_contrast(enhanced, bc_params)
-                        
-                    elif filter_type == 'exposure':
-                        exposure_params = {
-                            'exposure': params.get('exposure', 0.0),
-                            'highlights': params.get('highlights', 0.0),
-                            'shadows': params.get('shadows', 0.0)
-                        }
-                        enhanced = apply_exposure(enhanced, exposure_params)
-                        
-                    elif filter_type == 'vibrance':
-                        vibrance_params = {
-                            'vibrance': params.get('vibrance', 0.5),
-                            'saturation': params.get('saturation', 0.0)
-                        }
-                        enhanced = apply_vibrance(enhanced, vibrance_params)
-                        
-                    elif filter_type == 'clarity':
-                        clarity_params = {
-                            'clarity': params.get('clarity', 0.5),
-                            'edge_kernel': params.get('edge_kernel', 3),
-                            'edge_scale': params.get('edge_scale', 1.0)
-                        }
-                        enhanced = apply_clarity(enhanced, clarity_params)
-                        
-                    elif filter_type == 'shadows_highlights':
-                        sh_params = {
-                            'shadows_recovery': params.get('shadows_recovery', 0.5),
-                            'highlights_recovery': params.get('highlights_recovery', 0.5),
-                            'mid_tone_contrast': params.get('mid_tone_contrast', 0.0)
-                        }
-                        enhanced = apply_shadows_highlights(enhanced, sh_params)
+                    if stage == TONE_CURVE:
+                        print(f"Applying fused tone curves: {names}")
+                        enhanced = apply_tone_curves(enhanced, steps)
+                    elif stage == COLOR_LUT:
+                        print(f"Applying 3D color LUT: {names}")
+                        enhanced = apply_color_chain(
+                            enhanced, steps,
+                            params.get('lut_size', DEFAULT_LUT_SIZE),
+                            params.get('lut_interpolation', 'tetrahedral')
+                        )
+                    else:
+                        filter_type, filter_params = steps[0]
+                        print(f"Applying filter: {filter_type}")
+                        enhanced = get_filter(filter_type)(enhanced, filter_params)
             
             # For backward compatibility, also handle individual filter flags
             # Apply morphological filters if specified
@@ -190,14 +178,9 @@ def process_image_task(task_id, image_path, filename, params, use_compressed, da
                     'iterations': iterations
                 }
                 
-                if morph_type == 'dilation':
-                    enhanced = apply_dilation(enhanced, morph_params)
-                elif morph_type == 'erosion':
-                    enhanced = apply_erosion(enhanced, morph_params)
-                elif morph_type == 'opening':
-                    enhanced = apply_opening(enhanced, morph_params)
-                elif morph_type == 'closing':
-                    enhanced = apply_closing(enhanced, morph_params)
+                spec = get_filter(morph_type, MORPHOLOGICAL)
+                if spec is not None:
+                    enhanced = spec(enhanced, morph_params)
             
             task_manager.update_task_progress(task_id, 85)
         except Exception as e:
@@ -261,6 +244,9 @@ def process_morphological_task(task_id, image_path, filename, params, use_compre
         # Apply morphological filter
         try:
             filter_type = params.get('filter_type')
+            spec = get_filter(filter_type, MORPHOLOGICAL)
+            if spec is None:
+                raise ValueError(f"Unknown filter type: {filter_type}")
             
             # Apply performance optimizations
             image_size = image.shape[0] * image.shape[1]
@@ -272,44 +258,19 @@ def process_morphological_task(task_id, image_path, filename, params, use_compre
                 # Clear cache to ensure maximum memory availability
                 clear_image_cache()
                 
-                # Reduce kernel size for large images if not explicitly set
-                if 'kernel_size' not in params:
-                    params['kernel_size'] = 3  # Smaller kernel for better performance
-                
-                # Limit iterations for large images if not explicitly set
-                if 'iterations' not in params:
-                    params['iterations'] = 1  # Fewer iterations for better performance
+                # Use the filter's faster settings (smaller kernel, fewer
+                # iterations) where the request does not set them
+                for key, value in spec.large_image_params.items():
+                    params.setdefault(key, value)
                 
                 # Log optimization info
                 print(f"Using performance optimizations for morphological filter on image size: {image_size} pixels")
             else:
                 print(f"Using high-quality processing for morphological filter on image size: {image_size} pixels")
             
-            # Select the appropriate filter function
-            if filter_type == 'dilation':
-                enhanced = apply_dilation(image, params)
-            elif filter_type == 'erosion':
-                enhanced = apply_erosion(image, params)
-            elif filter_type == 'opening':
-                enhanced = apply_opening(image, params)
-            elif filter_type == 'closing':
-                enhanced = apply_closing(image, params)
-            elif filter_type == 'tophat':
-                enhanced = apply_tophat(image, params)
-            elif filter_type == 'blackhat':
-                enhanced = apply_black_tophat(image, params)
-            elif filter_type == 'gradient':
-                enhanced = apply_morphological_gradient(image, params)
-            elif filter_type == 'hitmiss':
-                enhanced = apply_hit_miss_transform(image, params)
-            elif filter_type == 'thinning':
-                enhanced = apply_thinning(image, params)
-            elif filter_type == 'thickening':
-                enhanced = apply_thickening(image, params)
-            elif filter_type == 'skeleton':
-                enhanced = apply_skeletonization(image, params)
-            else:
-                raise ValueError(f"Unknown filter type: {filter_type}")
+            # Apply the filter, keeping what it measured for the task status
+            enhanced = spec(image, params)
+            statistics = spec.run_statistics(params)
             
             task_manager.update_task_progress(task_id, 80)
             
@@ -352,7 +313,7 @@ def process_morphological_task(task_id, image_path, filename, params, use_compre
             # Continue even if history fails
         
         # Update task status
-        task_manager.mark_task_completed(task_id, result_filename, history_id)
+        task_manager.mark_task_completed(task_id, result_filename, history_id, statistics=statistics)
     except Exception as e:
         print(f"Unexpected error in process_morphological_task: {str(e)}")
         task_manager.mark_task_failed(task_id, f'Server error: {str(e)}')
@@ -360,6 +321,110 @@ def process_morphological_task(task_id, image_path, filename, params, use_compre
         # Make sure to clean up memory
         gc.collect()
 
+def process_morphology_bundle_task(task_id, image_path, filename, params, use_compressed, data):
+    """Process a morphology bundle task (several morphological filters at once) in the background"""
+    task = task_manager.get_task(task_id)
+    if not task:
+        return
+    
+    try:
+        # Update progress
+        task_manager.update_task_progress(task_id, 10)
+        
+        # Load the image
+        try:
+            image = load_image(image_path)
+            task_manager.update_task_progress(task_id, 20)
+        except Exception as e:
+            print(f"Error loading image: {str(e)}")
+            task_manager.mark_task_failed(task_id, f'Error loading image: {str(e)}')
+            return
+        
+        # Apply the morphology bundle
+        try:
+            # Apply performance optimizations
+            image_size = image.shape[0] * image.shape[1]
+            
+            # Determine if we should use performance optimizations
+            use_optimizations = ENABLE_PERFORMANCE_OPTIMIZATIONS or image_size > 1000000  # 1 megapixel
+            
+            if use_optimizations:
+                # Clear cache to ensure maximum memory availability
+                clear_image_cache()
+                
+                # Use the faster settings the bundled filters declare (smaller
+                # kernel, fewer iterations) where the request does not set them
+                for filter_type in params.get('outputs') or DEFAULT_BUNDLE_OUTPUTS:
+                    spec = get_filter(filter_type, MORPHOLOGICAL)
+                    if spec is not None:
+                        for key, value in spec.large_image_params.items():
+                            params.setdefault(key, value)
+                
+                # Log optimization info
+                print(f"Using performance optimizations for morphology bundle on image size: {image_size} pixels")
+            else:
+                print(f"Using high-quality processing for morphology bundle on image size: {image_size} pixels")
+            
+            outputs = apply_morphology_bundle(image, params)
+            if not outputs:
+                raise ValueError("No morphological outputs requested")
+            
+            task_manager.update_task_progress(task_id, 70)
+            
+            # Free memory aggressively
+            del image
+            gc.collect()
+        except Exception as e:
+            print(f"Error applying morphology bundle: {str(e)}")
+            task_manager.mark_task_failed(task_id, f'Error applying filter: {str(e)}')
+            return
+        
+        # Save each result with a unique timestamp to prevent overwriting
+        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        results = {}
+        
+        try:
+            for filter_type, enhanced in outputs.items():
+                result_filename = f"morph_{filter_type}_{timestamp}_{filename}"
+                save_image(enhanced, os.path.join(RESULT_FOLDER, result_filename))
+                results[filter_type] = result_filename
+            task_manager.update_task_progress(task_id, 90)
+            
+            # Free memory
+            del outputs
+            gc.collect()
+        except Exception as e:
+            print(f"Error saving result: {str(e)}")
+            task_manager.mark_task_failed(task_id, f'Error saving result: {str(e)}')
+            return
+        
+        # Add one history entry per output, as if each filter had been applied alone
+        history_id = None
+        try:
+            for filter_type, result_filename in results.items():
+                entry_params = {key: value for key, value in params.items() if key != 'outputs'}
+                entry_params['filter_type'] = filter_type
+                entry_params['is_morphological'] = True
+                
+                entry_id = history_manager.add_entry(filename, result_filename, entry_params)
+                if history_id is None:
+                    history_id = entry_id
+            task.history_id = history_id
+            task_manager.update_task_progress(task_id, 95)
+        except Exception as e:
+            print(f"Error adding to history: {str(e)}")
+            # Continue even if history fails
+        
+        # Update task status, with the first output as the primary result
+        primary_filename = next(iter(results.values()))
+        task_manager.mark_task_completed(task_id, primary_filename, history_id, results)
+    except Exception as e:
+        print(f"Unexpected error in process_morphology_bundle_task: {str(e)}")
+        task_manager.mark_task_failed(task_id, f'Server error: {str(e)}')
+    finally:
+        # Make sure to clean up memory
+        gc.collect()
+
 def process_enhancement_task(task_id, image_path, filename, params, use_compressed, data):
     """Process an enhancement filter task in the background"""
     task = task_manager.get_task(task_id)
@@ -382,6 +447,9 @@ def process_enhancement_task(task_id, image_path, filename, params, use_compress
         # Apply enhancement filter
         try:
             filter_type = params.get('filter_type')
+            spec = get_filter(filter_type, ENHANCEMENT)
+            if spec is None:
+                raise ValueError(f"Unknown enhancement filter type: {filter_type}")
             
             # Apply performance optimizations
             image_size = image.shape[0] * image.shape[1]
@@ -393,32 +461,23 @@ def process_enhancement_task(task_id, image_path, filename, params, use_compress
                 # Clear cache to ensure maximum memory availability
                 clear_image_cache()
                 
-                # Adjust parameters for better performance
-                if filter_type == 'clarity' and 'edge_kernel' not in params:
-                    params['edge_kernel'] = 3  # Smaller kernel for better performance
-                
-                # For shadows_highlights, use faster algorithm
-                if filter_type == 'shadows_highlights':
-                    params['fast_mode'] = True
+                # Use the filter's faster settings where the request does not set them
+                for key, value in spec.large_image_params.items():
+                    params.setdefault(key, value)
                 
                 # Log optimization info
                 print(f"Using performance optimizations for enhancement filter '{filter_type}' on image size: {image_size} pixels")
             else:
                 print(f"Using high-quality processing for enhancement filter '{filter_type}' on image size: {image_size} pixels")
             
-            # Select the appropriate filter function
-            if filter_type == 'brightness_contrast':
-                enhanced = apply_brightness_contrast(image, params)
-            elif filter_type == 'exposure':
-                enhanced = apply_exposure(image, params)
-            elif filter_type == 'vibrance':
-                enhanced = apply_vibrance(image, params)
-            elif filter_type == 'clarity':
-                enhanced = apply_clarity(image, params)
-            elif filter_type == 'shadows_highlights':
-                enhanced = apply_shadows_highlights(image, params)
+            # Apply the filter
+            if spec.reference_key:
+                # The reference is loaded through the image cache, and its
+                # histograms are cached by content, so a shoot pays for them once
+                reference = load_image(os.path.join(UPLOAD_FOLDER, params[spec.reference_key]))
+                enhanced = spec(image, dict(params, reference=reference))
             else:
-                raise ValueError(f"Unknown enhancement filter type: {filter_type}")
+                enhanced = spec(image, params)
             
             task_manager.update_task_progress(task_id, 80)
             
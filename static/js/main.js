@@ -93,6 +93,8 @@ document.addEventListener('DOMContentLoaded', function() {
     setupSliderValueDisplay('shadows-recovery', 'shadows-recovery-value');
     setupSliderValueDisplay('highlights-recovery', 'highlights-recovery-value');
     setupSliderValueDisplay('mid-tone-contrast', 'mid-tone-contrast-value');
+    setupSliderValueDisplay('hdr-strength', 'hdr-strength-value');
+    setupSliderValueDisplay('hdr-radius', 'hdr-radius-value');
     setupSliderValueDisplay('clahe-clip', 'clahe-clip-value');
     setupSliderValueDisplay('clahe-grid', 'clahe-grid-value');
     
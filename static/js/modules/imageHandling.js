@@ -339,10 +339,14 @@ export function applyEnhancementFilter() {
                 }
                 break;
             case 'shadows_highlights':
-                params.shadows_recovery = parseFloat(document.getElementById('shadows-recovery')?.value || 0.5);
-                params.highlights_recovery = parseFloat(document.getElementById('highlights-recovery')?.value || 0.5);
+                params.shadows_recovery = parseFloat(document.getElementById('shadows-recovery')?.value || 50);
+                params.highlights_recovery = parseFloat(document.getElementById('highlights-recovery')?.value || 50);
                 params.mid_tone_contrast = parseFloat(document.getElementById('mid-tone-contrast')?.value || 0);
                 break;
+            case 'hdr':
+                params.hdr_strength = parseFloat(document.getElementById('hdr-strength')?.value || 50);
+                params.hdr_radius = parseInt(document.getElementById('hdr-radius')?.value || 20);
+                break;
         }
     });
     
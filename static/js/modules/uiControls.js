@@ -253,6 +253,10 @@ export function setupFilterButtons() {
                     document.getElementById('highlights-recovery-group').style.display = 'flex';
                     document.getElementById('mid-tone-contrast-group').style.display = 'flex';
                     break;
+                case 'hdr':
+                    document.getElementById('hdr-strength-group').style.display = 'flex';
+                    document.getElementById('hdr-radius-group').style.display = 'flex';
+                    break;
             }
         });
     });
@@ -0,0 +1,37 @@
+"""
+Shared fixtures for the route tests
+"""
+import cv2
+import numpy as np
+import pytest
+from flask import Flask
+
+import routes.image_routes as image_routes
+from services.task_manager import task_manager
+
+@pytest.fixture
+def post_route(tmp_path, monkeypatch):
+    """
+    POST JSON to an image route with an uploaded image, without starting the
+    background task. Returns a function of (url, data) giving the response and
+    the parameters the task would have received (None if no task was started).
+    """
+    cv2.imwrite(str(tmp_path / 'input.png'), np.zeros((8, 8, 3), dtype=np.uint8))
+    monkeypatch.setattr(image_routes, 'UPLOAD_FOLDER', str(tmp_path))
+
+    started = []
+    monkeypatch.setattr(task_manager, 'run_task_in_background', lambda target, args: started.append(args))
+
+    app = Flask(__name__)
+    app.register_blueprint(image_routes.image_bp)
+
+    def post(url, data):
+        count = len(started)
+        response = app.test_client().post(url, json=data)
+        if len(started) == count:
+            return response, None
+        task_id, _, _, params, _, _ = started[-1]
+        task_manager.processing_tasks.pop(task_id, None)
+        return response, params
+
+    return post
@@ -0,0 +1,42 @@
+"""
+Tests for the recommended enhancement parameters
+"""
+import cv2
+import numpy as np
+
+from filters.registry import get_filter, ENHANCEMENT
+from services.auto_params import recommend_params
+
+def _high_contrast_image():
+    # Deep shadows and bright highlights, so every recommendation is non-trivial
+    rng = np.random.default_rng(0)
+    image = rng.normal(128, 20, (600, 800, 3))
+    image[:, :250] = rng.normal(20, 10, (600, 250, 3))
+    image[:, -250:] = rng.normal(235, 10, (600, 250, 3))
+    return cv2.GaussianBlur(np.clip(image, 0, 255).astype(np.uint8), (5, 5), 0)
+
+def test_recommendations_survive_request_params():
+    recommended = recommend_params(_high_contrast_image())['filters']
+
+    for filter_type, values in recommended.items():
+        if filter_type == 'adaptive_enhancement':
+            continue
+        spec = get_filter(filter_type, ENHANCEMENT)
+        assert spec is not None, filter_type
+
+        names = {param.key: param.name for param in spec.params}
+        assert set(values) <= set(names), (filter_type, set(values) - set(names))
+
+        params = spec.request_params(values)
+        for key, value in values.items():
+            assert params[names[key]] == value, (filter_type, key)
+
+def test_recommendations_reach_the_filters():
+    image = _high_contrast_image()
+    recommended = recommend_params(image)['filters']
+
+    for filter_type in ('shadows_highlights', 'hdr'):
+        spec = get_filter(filter_type)
+        recommended_result = spec(image, spec.request_params(recommended[filter_type]))
+        default_result = spec(image, spec.request_params({}))
+        assert not np.array_equal(recommended_result, default_result), filter_type
@@ -0,0 +1,32 @@
+"""
+Tests for the morphology bundle filter and route
+"""
+import numpy as np
+import pytest
+
+from filters.morphology_bundle import apply_morphology_bundle, DEFAULT_BUNDLE_KERNEL_SIZE
+from filters.registry import get_filter
+
+def test_unknown_output_is_rejected_by_the_route(post_route):
+    response, params = post_route('/apply_morphology_bundle', {'outputs': ['gradient', 'top_hat']})
+    assert response.status_code == 400
+    assert params is None
+
+def test_unknown_output_raises_in_the_filter():
+    image = np.zeros((16, 16), dtype=np.uint8)
+    with pytest.raises(ValueError):
+        apply_morphology_bundle(image, {'outputs': ['gradient', 'top_hat']})
+
+def test_route_leaves_unset_kernel_settings_to_the_task(post_route):
+    _, params = post_route('/apply_morphology_bundle', {'outputs': ['gradient']})
+    assert 'kernel_size' not in params and 'iterations' not in params
+
+    _, params = post_route('/apply_morphology_bundle', {'outputs': ['gradient'], 'kernel_size': 7})
+    assert params['kernel_size'] == 7
+
+def test_outputs_match_single_filters_at_the_default_size():
+    image = np.random.default_rng(0).integers(0, 256, (48, 64, 3), dtype=np.uint8)
+    outputs = apply_morphology_bundle(image, {'outputs': ['gradient', 'tophat']})
+    for name, result in outputs.items():
+        expected = get_filter(name)(image, {'kernel_size': DEFAULT_BUNDLE_KERNEL_SIZE})
+        assert np.array_equal(result, expected), name
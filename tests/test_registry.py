@@ -0,0 +1,26 @@
+"""
+Tests for the filter registry metadata
+"""
+import numpy as np
+
+from filters.registry import FILTERS, GLOBAL, chain_halo, get_filter
+
+def test_global_filters_are_never_tiled():
+    for spec in FILTERS.values():
+        if spec.filter_class == GLOBAL:
+            assert spec.halo_radius({}) is None, spec.name
+
+def test_chain_halo_is_unbounded_with_a_global_filter():
+    assert chain_halo(['brightness_contrast', 'clarity'], {}) is not None
+    for filter_type in ('hdr', 'retinex', 'dehaze'):
+        assert chain_halo(['brightness_contrast', filter_type], {}) is None, filter_type
+
+def test_retinex_bands_differ_from_the_whole_image():
+    # The percentile stretch is image-wide, so no halo makes bands match
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (256, 128, 3), dtype=np.uint8)
+    image[128:] //= 4
+    retinex = get_filter('retinex')
+    whole = retinex(image, {})
+    top = retinex(image[:192], {})[:128]
+    assert not np.array_equal(whole[:128], top)
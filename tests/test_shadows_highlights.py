@@ -0,0 +1,24 @@
+"""
+Tests for the shadows/highlights request parameters
+"""
+import numpy as np
+
+import filters.enhancement_filters as enhancement_filters
+from filters.registry import get_filter
+
+def test_fast_mode_request_reaches_fast_branch(post_route, monkeypatch):
+    _, params = post_route('/apply_enhancement', {'filter_type': 'shadows_highlights', 'fast_mode': True})
+    assert params['fast_mode'] is True
+
+    calls = []
+    gray_delta = enhancement_filters.shadows_highlights_gray_delta
+    monkeypatch.setattr(enhancement_filters, 'shadows_highlights_gray_delta',
+                        lambda p: calls.append(p) or gray_delta(p))
+
+    image = np.random.default_rng(0).integers(0, 256, (32, 32, 3), dtype=np.uint8)
+    get_filter('shadows_highlights')(image, params)
+    assert len(calls) == 1
+
+def test_fast_mode_is_off_by_default(post_route):
+    _, params = post_route('/apply_enhancement', {'filter_type': 'shadows_highlights'})
+    assert params['fast_mode'] is False
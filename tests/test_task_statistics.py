@@ -0,0 +1,61 @@
+"""
+Tests for the statistics reported with morphological task results
+"""
+import cv2
+import numpy as np
+import pytest
+
+import services.task_processor as task_processor
+from services.task_manager import task_manager
+
+@pytest.fixture
+def run_morphological_task(tmp_path, monkeypatch):
+    """Run a morphological task on an image, without writing results or history."""
+    monkeypatch.setattr(task_processor, 'save_image', lambda image, path: None)
+    monkeypatch.setattr(task_processor.history_manager, 'add_entry', lambda *args: 'history')
+
+    def run(image, params):
+        image_path = str(tmp_path / 'input.png')
+        cv2.imwrite(image_path, image)
+        task_id = f"test_{params['filter_type']}"
+        task_manager.create_task(task_id, 'input.png', params)
+        try:
+            task_processor.process_morphological_task(task_id, image_path, 'input.png', params, False, {})
+            return task_manager.get_task(task_id).to_dict()
+        finally:
+            task_manager.processing_tasks.pop(task_id, None)
+
+    return run
+
+def _dots(shape):
+    image = np.zeros(shape, dtype=np.uint8)
+    image[10, 10:13] = 255
+    image[20:23, 30] = 255
+    image[40, 40:43] = 255
+    return image
+
+@pytest.mark.parametrize('shape', [(64, 64), (64, 64, 3)])
+def test_pattern_counts_reach_the_task_status(run_morphological_task, shape):
+    status = run_morphological_task(_dots(shape), {
+        'filter_type': 'hitmiss', 'patterns': ['horizontal', 'vertical'], 'kernel_size': 3
+    })
+    assert status['status'] == 'completed'
+    assert status['statistics']['pattern_counts'] == {'horizontal': 2, 'vertical': 1}
+
+def test_single_pattern_has_no_statistics(run_morphological_task):
+    status = run_morphological_task(_dots((64, 64)), {'filter_type': 'hitmiss', 'pattern': 'horizontal'})
+    assert status['status'] == 'completed'
+    assert 'statistics' not in status
+
+def test_thickening_iterations_reach_the_task_status(run_morphological_task):
+    image = np.zeros((64, 64), dtype=np.uint8)
+    image[20:40, 20:24] = 255
+    image[20:24, 20:40] = 255
+
+    status = run_morphological_task(image, {'filter_type': 'thickening', 'converge': True})
+    assert status['status'] == 'completed'
+    used = status['statistics']['iterations_used']
+    assert used > 0
+
+    status = run_morphological_task(image, {'filter_type': 'thickening', 'iterations': used + 5})
+    assert status['statistics']['iterations_used'] == used
@@ -0,0 +1,96 @@
+"""
+Image quality metrics for comparing a fast processing path with its reference.
+Provides max absolute error, PSNR and SSIM on 8-bit images.
+"""
+import math
+
+import cv2
+import numpy as np
+
+# SSIM constants for 8-bit images (Wang et al. 2004)
+SSIM_C1 = (0.01 * 255) ** 2
+SSIM_C2 = (0.03 * 255) ** 2
+
+def _as_float_pair(reference, test):
+    """Validate two images and return them as float64 arrays of the same shape."""
+    if reference.shape != test.shape:
+        raise ValueError(f"Shape mismatch: reference {reference.shape}, test {test.shape}")
+    return reference.astype(np.float64), test.astype(np.float64)
+
+def max_abs_error(reference, test):
+    """
+    Largest absolute per-pixel difference between two images.
+
+    Args:
+        reference: Reference image
+        test: Image to compare
+
+    Returns:
+        Maximum absolute error as a float
+    """
+    ref, tst = _as_float_pair(reference, test)
+    return float(np.max(np.abs(ref - tst))) if ref.size else 0.0
+
+def psnr(reference, test, peak=255.0):
+    """
+    Peak signal-to-noise ratio between two images.
+
+    Args:
+        reference: Reference image
+        test: Image to compare
+        peak: Maximum possible pixel value
+
+    Returns:
+        PSNR in dB (infinity for identical images)
+    """
+    ref, tst = _as_float_pair(reference, test)
+    mse = np.mean((ref - tst) ** 2)
+    if mse == 0:
+        return float('inf')
+    return float(10.0 * math.log10(peak * peak / mse))
+
+def ssim(reference, test):
+    """
+    Mean structural similarity index between two images.
+    Uses an 11x11 Gaussian window (sigma 1.5); color images are averaged over channels.
+
+    Args:
+        reference: Reference image
+        test: Image to compare
+
+    Returns:
+        SSIM in [-1, 1] (1 for identical images)
+    """
+    ref, tst = _as_float_pair(reference, test)
+
+    def blur(values):
+        return cv2.GaussianBlur(values, (11, 11), 1.5)
+
+    mu_ref = blur(ref)
+    mu_tst = blur(tst)
+
+    var_ref = blur(ref * ref) - mu_ref * mu_ref
+    var_tst = blur(tst * tst) - mu_tst * mu_tst
+    covar = blur(ref * tst) - mu_ref * mu_tst
+
+    numerator = (2 * mu_ref * mu_tst + SSIM_C1) * (2 * covar + SSIM_C2)
+    denominator = (mu_ref ** 2 + mu_tst ** 2 + SSIM_C1) * (var_ref + var_tst + SSIM_C2)
+
+    return float(np.mean(numerator / denominator))
+
+def compare_images(reference, test):
+    """
+    Compute all parity metrics between a reference and a test image.
+
+    Args:
+        reference: Reference image
+        test: Image to compare
+
+    Returns:
+        Dictionary with max_abs_error, psnr and ssim
+    """
+    return {
+        'max_abs_error': max_abs_error(reference, test),
+        'psnr': psnr(reference, test),
+        'ssim': ssim(reference, test)
+    }